@@ -0,0 +1,140 @@
+"""
+Measures the time needed to filter a synthetic must-gather tree with
+the thread workers (`filter_log_file_worker`), the process pool
+(`filter_log_files`) and the process pool with the binary search,
+checking that the three engines write the same files. The binary
+search also keeps the lines without a date within the time range,
+only the names of the files it writes are compared.
+
+    poetry run python benchmarks/log_filter.py --files 8 --lines 5000
+"""
+
+import argparse
+import datetime
+import os
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+from queue import Queue
+
+from krkn_lib.utils import filter_log_file_worker, filter_log_files
+
+PATTERNS = [r"(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d+Z).+"]
+START_TIMESTAMP = 1694777280
+
+
+def create_synthetic_must_gather(files: int, lines: int) -> str:
+    src_dir = tempfile.mkdtemp()
+    for i in range(files):
+        log_dir = os.path.join(
+            src_dir, "namespaces", f"ns-{i % 3}", "pods", f"pod-{i}", "logs"
+        )
+        os.makedirs(log_dir)
+        with open(os.path.join(log_dir, "current.log"), "w") as log:
+            for line in range(lines):
+                date = datetime.datetime.fromtimestamp(
+                    START_TIMESTAMP + line, tz=datetime.timezone.utc
+                )
+                log.write(
+                    f"{date.strftime('%Y-%m-%dT%H:%M:%S.%fZ')} "
+                    f'level=info msg="line {line} of pod-{i}"\n'
+                )
+                if line % 10 == 0:
+                    log.write("\tcontinuation line without date\n")
+    return src_dir
+
+
+def filter_with_threads(
+    src_dir: str, dst_dir: str, end_timestamp: int, threads: int
+):
+    queue = Queue()
+    for file in Path(src_dir).rglob("*.log"):
+        queue.put(file)
+    for _ in range(threads):
+        threading.Thread(
+            target=filter_log_file_worker,
+            args=(
+                START_TIMESTAMP,
+                end_timestamp,
+                src_dir,
+                dst_dir,
+                "UTC",
+                "UTC",
+                PATTERNS,
+                queue,
+            ),
+            daemon=True,
+        ).start()
+    queue.join()
+
+
+def filter_with_processes(
+    src_dir: str, dst_dir: str, end_timestamp: int, binary_search: bool
+):
+    filter_log_files(
+        list(Path(src_dir).rglob("*.log")),
+        src_dir,
+        dst_dir,
+        START_TIMESTAMP,
+        end_timestamp,
+        "UTC",
+        "UTC",
+        PATTERNS,
+        shard_size=128 * 1024,
+        binary_search=binary_search,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("--files", type=int, default=8)
+    parser.add_argument("--lines", type=int, default=5000)
+    arguments = parser.parse_args()
+    cpus = os.cpu_count()
+    end_timestamp = START_TIMESTAMP + arguments.lines // 2
+    src_dir = create_synthetic_must_gather(arguments.files, arguments.lines)
+    print(
+        f"synthetic must-gather filter ({arguments.files} files, "
+        f"{arguments.files * arguments.lines * 11 // 10} lines, "
+        f"{cpus} cpus):"
+    )
+    outputs = {}
+    for name, run in [
+        (
+            f"{cpus} threads",
+            lambda dst: filter_with_threads(src_dir, dst, end_timestamp, cpus),
+        ),
+        (
+            f"{cpus} processes",
+            lambda dst: filter_with_processes(
+                src_dir, dst, end_timestamp, False
+            ),
+        ),
+        (
+            "binary search",
+            lambda dst: filter_with_processes(
+                src_dir, dst, end_timestamp, True
+            ),
+        ),
+    ]:
+        dst_dir = tempfile.mkdtemp()
+        start = time.monotonic()
+        run(dst_dir)
+        print(f"- {name}: {time.monotonic() - start:.2f}s")
+        outputs[name] = {}
+        for filename in os.listdir(dst_dir):
+            with open(os.path.join(dst_dir, filename), "rb") as filtered:
+                outputs[name][filename] = filtered.read()
+        shutil.rmtree(dst_dir)
+    shutil.rmtree(src_dir)
+    expected = outputs[f"{cpus} threads"]
+    if outputs[f"{cpus} processes"] != expected:
+        raise Exception("the processes output differs from the threads one")
+    if outputs["binary search"].keys() != expected.keys():
+        raise Exception("the binary search files differ from the threads one")
+
+
+if __name__ == "__main__":
+    main()
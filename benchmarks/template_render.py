@@ -0,0 +1,78 @@
+"""
+Measures the per-deploy cost of the pod manifests of `hog_pod.j2`
+created by a new jinja2 Environment, by the compiled template of the
+TemplateRegistry and by the registered builder (`direct=True`).
+
+    poetry run python benchmarks/template_render.py --iterations 1000
+"""
+
+import argparse
+import timeit
+
+import yaml
+from jinja2 import Environment, PackageLoader
+
+from krkn_lib.k8s.templates import template_registry, to_yaml
+from krkn_lib.models.krkn import HogType
+
+HOG_PARAMS = {
+    "name": "benchmark-hog",
+    "namespace": "default",
+    "labels": {"krkn-pods-group": "hog-benchmark"},
+    "hog_type": HogType.cpu.value,
+    "hog_type_io": HogType.io.value,
+    "has_selector": True,
+    "node_selector_key": "kubernetes.io/hostname",
+    "node_selector_value": "worker-0",
+    "image": "quay.io/krkn-chaos/krkn-hog",
+    "duration": 30,
+    "cpu_load_percentage": 80,
+    "cpu_method": "all",
+    "io_block_size": "1m",
+    "io_write_bytes": "10m",
+    "io_target_pod_volume": {
+        "hostPath": {"path": "/tmp"},
+        "name": "node-volume",
+    },
+    "memory_vm_bytes": "10%",
+    "workers": None,
+    "target_pod_folder": "/hog-data",
+}
+
+
+def uncached_render() -> dict[str, any]:
+    environment = Environment(
+        loader=PackageLoader("krkn_lib.k8s", "templates"),
+        autoescape=True,
+    )
+    environment.filters["to_yaml"] = to_yaml
+    template = environment.get_template("hog_pod.j2")
+    return yaml.safe_load(template.render(**HOG_PARAMS))
+
+
+def compiled_render() -> dict[str, any]:
+    return template_registry.render_manifest("hog_pod.j2", **HOG_PARAMS)
+
+
+def direct_build() -> dict[str, any]:
+    return template_registry.render_manifest(
+        "hog_pod.j2", direct=True, **HOG_PARAMS
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument("--iterations", type=int, default=200)
+    iterations = parser.parse_args().iterations
+    print(f"per-deploy render cost (hog_pod.j2, {iterations} iterations):")
+    for name, function in [
+        ("new Environment + yaml", uncached_render),
+        ("compiled template + yaml", compiled_render),
+        ("direct manifest build", direct_build),
+    ]:
+        elapsed = timeit.timeit(function, number=iterations)
+        print(f"- {name}: {elapsed / iterations * 1e6:.1f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -1 +1,3 @@
 from .krkn_kubernetes import *  # NOQA
+from .krkn_kubernetes_async import *  # NOQA
+from .rate_limiter import *  # NOQA
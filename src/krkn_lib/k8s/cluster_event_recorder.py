@@ -0,0 +1,277 @@
+import json
+import logging
+import threading
+import time
+from collections import deque
+from typing import Iterable, Optional
+
+from kubernetes import client, watch
+from kubernetes.client.rest import ApiException
+
+from krkn_lib.k8s.krkn_kubernetes import KrknKubernetes, get_event_timestamp
+from krkn_lib.models.telemetry import ClusterEvent, relevant_event_reasons
+from krkn_lib.utils import TimeWindow
+
+
+class ClusterEventRecorder:
+    """
+    Records in background the cluster events while the chaos scenarios
+    are running, instead of listing them after the run
+    (see `KrknKubernetes.collect_and_parse_cluster_events`) when the
+    events older than the cluster events TTL (1h by default) are
+    already deleted. The events are watched starting from the
+    resourceVersion of the cluster when the recorder is started,
+    only the events with the selected reasons are kept in a ring buffer
+    of `max_events` events, the oldest events are dropped or, if
+    `spill_file` is set, moved in a JSON lines file. When stopped
+    the recorder returns the events of each scenario recorded.
+
+    >>> recorder = ClusterEventRecorder(lib_k8s)
+    >>> recorder.start()
+    >>> recorder.start_scenario("pod-scenario")
+    >>> run_scenario()
+    >>> recorder.stop_scenario("pod-scenario")
+    >>> events = recorder.stop()["pod-scenario"]
+    """
+
+    dropped_events: int
+    """
+    number of events dropped because the ring buffer was full
+    """
+
+    def __init__(
+        self,
+        krkn_lib: KrknKubernetes,
+        namespace: str = None,
+        reasons: Optional[Iterable[str]] = relevant_event_reasons,
+        max_events: int = 10000,
+        spill_file: str = None,
+        events_api: bool = False,
+        watch_timeout: int = 5,
+    ):
+        """
+        :param krkn_lib: the KrknKubernetes client
+        :param namespace: the namespace of the events recorded, if None
+            the events of all the namespaces are recorded
+        :param reasons: the reasons of the events recorded, if None
+            all the events are recorded
+            (optional, default `relevant_event_reasons`)
+        :param max_events: size of the ring buffer of the events
+            kept in memory (optional, default 10000)
+        :param spill_file: if set, the events removed from the full ring
+            buffer are appended to this file in JSON lines format and
+            read back when the recorder is stopped (optional)
+        :param events_api: if True the events are watched with the
+            `events.k8s.io/v1` API (optional, default False)
+        :param watch_timeout: seconds after which each watch request is
+            closed and reopened from the last resourceVersion, bounds
+            the time needed to stop the recorder (optional, default 5)
+        """
+        if max_events <= 0:
+            raise Exception("max_events must be greater than 0")
+        self.krkn_lib = krkn_lib
+        self.dropped_events = 0
+        self.__namespace = namespace
+        self.__reasons = frozenset(reasons) if reasons is not None else None
+        self.__spill_file = spill_file
+        self.__spilled_events = 0
+        self.__events_api = events_api
+        self.__watch_timeout = watch_timeout
+        # (event timestamp, ClusterEvent)
+        self.__buffer: deque[tuple[int, ClusterEvent]] = deque(
+            maxlen=max_events
+        )
+        self.__lock = threading.Lock()
+        self.__stopped = threading.Event()
+        self.__watch: Optional[watch.Watch] = None
+        self.__thread: Optional[threading.Thread] = None
+        self.__resource_version: Optional[str] = None
+        self.__start_timestamp: Optional[int] = None
+        self.__scenarios: dict[str, list[Optional[int]]] = {}
+
+    def __list_function(self):
+        api = (
+            client.EventsV1Api(self.krkn_lib.api_client)
+            if self.__events_api
+            else self.krkn_lib.cli
+        )
+        if self.__namespace:
+            return api.list_namespaced_event, [self.__namespace]
+        return api.list_event_for_all_namespaces, []
+
+    def start(self):
+        """
+        Starts recording the events created or updated
+        from now on in a background thread
+        """
+        if self.__thread is not None:
+            raise Exception("the event recorder has already been started")
+        list_function, args = self.__list_function()
+        # the watch starts from the current state of the cluster
+        self.__resource_version = list_function(
+            *args, limit=1
+        ).metadata.resource_version
+        self.__start_timestamp = int(time.time())
+        if self.__spill_file:
+            open(self.__spill_file, "w").close()
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+        self.__thread.start()
+
+    def __run(self):
+        list_function, args = self.__list_function()
+        while not self.__stopped.is_set():
+            try:
+                if self.__resource_version is None:
+                    self.__resource_version = list_function(
+                        *args, limit=1
+                    ).metadata.resource_version
+                self.__watch = watch.Watch()
+                for event in self.__watch.stream(
+                    list_function,
+                    *args,
+                    resource_version=self.__resource_version,
+                    timeout_seconds=self.__watch_timeout,
+                    allow_watch_bookmarks=True,
+                ):
+                    if self.__stopped.is_set():
+                        break
+                    if event["type"] == "BOOKMARK":
+                        # bookmarks are not deserialized by the watch,
+                        # they only carry the last resourceVersion
+                        metadata = event["raw_object"]["metadata"]
+                        self.__resource_version = metadata["resourceVersion"]
+                        continue
+                    obj = event["object"]
+                    self.__resource_version = obj.metadata.resource_version
+                    if event["type"] in ["ADDED", "MODIFIED"]:
+                        self.__record(obj)
+            except ApiException as e:
+                if e.status == 410:
+                    # the resourceVersion has been compacted, the watch
+                    # restarts from the current one
+                    logging.warning(
+                        "event watch expired, the events occurred "
+                        "while reconnecting could be lost"
+                    )
+                    self.__resource_version = None
+                else:
+                    logging.error(f"failed to watch events: {str(e)}")
+                    self.__stopped.wait(1)
+            except Exception as e:
+                logging.error(f"failed to watch events: {str(e)}")
+                self.__stopped.wait(1)
+
+    def __record(self, obj: any):
+        # the reasons are filtered before parsing the event
+        if self.__reasons is not None and obj.reason not in self.__reasons:
+            return
+        timestamp = get_event_timestamp(obj, self.__events_api, True)
+        if timestamp is None:
+            timestamp = int(time.time())
+        if self.__events_api:
+            event = ClusterEvent(k8s_events_obj=obj)
+        else:
+            event = ClusterEvent(k8s_obj=obj)
+        with self.__lock:
+            if len(self.__buffer) == self.__buffer.maxlen:
+                oldest_timestamp, oldest_event = self.__buffer.popleft()
+                if self.__spill_file:
+                    with open(self.__spill_file, "a") as spill:
+                        spill.write(
+                            json.dumps(
+                                {
+                                    "timestamp": oldest_timestamp,
+                                    "event": oldest_event.__dict__,
+                                }
+                            )
+                            + "\n"
+                        )
+                    self.__spilled_events += 1
+                else:
+                    self.dropped_events += 1
+            self.__buffer.append((timestamp, event))
+
+    def start_scenario(self, scenario: str):
+        """
+        Marks the start of a scenario, the events occurred from
+        now on will be returned for this scenario
+
+        :param scenario: the scenario name
+        """
+        self.__scenarios[scenario] = [int(time.time()), None]
+
+    def stop_scenario(self, scenario: str):
+        """
+        Marks the end of a scenario
+
+        :param scenario: the scenario name
+        """
+        if scenario not in self.__scenarios:
+            raise Exception(f"scenario {scenario} has not been started")
+        self.__scenarios[scenario][1] = int(time.time())
+
+    def get_events(
+        self, start_timestamp: Optional[int], end_timestamp: Optional[int]
+    ) -> list[ClusterEvent]:
+        """
+        Returns the events recorded that occurred in a time interval,
+        each event is returned once with its latest update
+
+        :param start_timestamp: timestamp of the start of the interval,
+            if None no bottom limit is set
+        :param end_timestamp: timestamp of the end of the interval,
+            if None no top limit is set
+        :return: the list of the ClusterEvents
+        """
+        time_window = TimeWindow(start_timestamp, end_timestamp)
+        # the updates of the same event replace the previous ones
+        events: dict[tuple[str, str], ClusterEvent] = {}
+        for timestamp, event in self.__recorded_events():
+            if time_window.contains(timestamp):
+                key = (event.namespace, event.name)
+                events.pop(key, None)
+                events[key] = event
+        return list(events.values())
+
+    def __recorded_events(self) -> list[tuple[int, ClusterEvent]]:
+        with self.__lock:
+            recorded = []
+            if self.__spill_file and self.__spilled_events > 0:
+                with open(self.__spill_file, "r") as spill:
+                    for line in spill:
+                        spilled = json.loads(line)
+                        recorded.append(
+                            (
+                                spilled["timestamp"],
+                                ClusterEvent(json_dict=spilled["event"]),
+                            )
+                        )
+            recorded.extend(self.__buffer)
+            return recorded
+
+    def stop(self) -> dict[str, list[ClusterEvent]]:
+        """
+        Stops the recording and returns the events of each scenario,
+        the scenarios not stopped end now. If no scenario has
+        been started all the events recorded are returned with
+        an empty scenario name.
+
+        :return: the lists of ClusterEvents by scenario name
+        """
+        self.__stopped.set()
+        if self.__watch is not None:
+            self.__watch.stop()
+        if self.__thread is not None:
+            self.__thread.join(timeout=self.__watch_timeout + 5)
+        now = int(time.time())
+        if self.dropped_events > 0:
+            logging.warning(
+                f"{self.dropped_events} events have been dropped "
+                f"because the event recorder buffer was full"
+            )
+        if not self.__scenarios:
+            return {"": self.get_events(self.__start_timestamp, now)}
+        return {
+            scenario: self.get_events(start, end if end is not None else now)
+            for scenario, (start, end) in self.__scenarios.items()
+        }
@@ -1,6 +1,9 @@
 import ast
+import copy
+import hashlib
 import json
 import logging
+import math
 import os
 import random
 import re
@@ -8,47 +11,105 @@ import tempfile
 import threading
 import time
 import warnings
-from concurrent.futures import ThreadPoolExecutor, wait
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from contextlib import nullcontext
 from functools import partial
 from queue import Queue
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
 from urllib.parse import urlparse
 
 import arcaflow_lib_kubernetes
 import kubernetes
+import pytz
 import urllib3
-import yaml
-from jinja2 import Environment, PackageLoader
 from kubeconfig import KubeConfig
 from kubernetes import client, config, utils, watch
+from kubernetes.client import rest
 from kubernetes.client.rest import ApiException
 from kubernetes.dynamic.client import DynamicClient
 from kubernetes.stream import stream
+from kubernetes.stream.ws_client import (
+    ABNF,
+    ERROR_CHANNEL,
+    STDERR_CHANNEL,
+    STDOUT_CHANNEL,
+)
 from urllib3 import HTTPResponse
 
+from krkn_lib.k8s.rate_limiter import (
+    PriorityRateLimiter,
+    get_request_priority,
+    request_priority,
+)
+from krkn_lib.k8s.templates import template_registry
 from krkn_lib.models.k8s import (
     PVC,
     AffectedNode,
     AffectedPod,
     ApiRequestException,
+    ArchiveCodec,
+    ConnectionPoolMetrics,
     Container,
+    DownloadManifest,
+    HostConnectionPoolMetrics,
     Pod,
+    PodsGroup,
     PodsMonitorThread,
     PodsStatus,
+    RateLimiterMetrics,
+    RequestPriority,
     ServiceHijacking,
     Volume,
     VolumeMount,
     NodeResources,
 )
-from krkn_lib.models.krkn import HogConfig, HogType
+from krkn_lib.models.krkn import HogConfig, HogType, LogFilterFileStats
 from krkn_lib.models.telemetry import ClusterEvent, NodeInfo, Taint
-from krkn_lib.utils import filter_dictionary, get_random_string
+from krkn_lib.utils import (
+    AdaptiveConcurrencyController,
+    TimeWindow,
+    TransferProgressTracker,
+    get_random_string,
+    parse_log_timestamp,
+)
 from krkn_lib.utils.safe_logger import SafeLogger
 
 SERVICE_TOKEN_FILENAME = "/var/run/secrets/k8s.io/serviceaccount/token"
 SERVICE_CERT_FILENAME = "/var/run/secrets/k8s.io/serviceaccount/ca.crt"
 
 
+def get_event_timestamp(
+    event: Any, events_api: bool = False, last_timestamp: bool = False
+) -> Optional[int]:
+    """
+    Returns the timestamp of a kubernetes event
+
+    :param event: a CoreV1Event or, if `events_api` is True,
+        an EventsV1Event
+    :param events_api: True if the event has been listed with the
+        `events.k8s.io/v1` API (optional, default False)
+    :param last_timestamp: if True returns the last time the event
+        occurred (`lastTimestamp`, the last observed time of the series
+        or `eventTime`), otherwise the first time it occurred
+        (`firstTimestamp` or `eventTime`)
+    :return: the timestamp of the event, None if the event has no date
+    """
+    if events_api:
+        first_date = event.deprecated_first_timestamp
+        last_date = event.deprecated_last_timestamp
+    else:
+        first_date = event.first_timestamp
+        last_date = event.last_timestamp
+    if last_timestamp:
+        series_date = event.series.last_observed_time if event.series else None
+        date = last_date or series_date or event.event_time or first_date
+    else:
+        # the events reported with events.k8s.io/v1
+        # have only the eventTime set
+        date = first_date or event.event_time
+    return int(date.timestamp()) if date else None
+
+
 class KrknKubernetes:
     """ """
 
@@ -63,6 +124,7 @@ class KrknKubernetes:
     __kubeconfig_string: str = None
     __kubeconfig_path: str = None
     apps_api: client.AppsV1Api = None
+    rate_limiter: Optional[PriorityRateLimiter] = None
 
     def __init__(
         self,
@@ -70,6 +132,14 @@ class KrknKubernetes:
         *,
         kubeconfig_string: str = None,
         request_chunk_size: int = 250,
+        connection_pool_maxsize: int = None,
+        num_pools: int = None,
+        pool_block: bool = False,
+        connect_timeout: float = None,
+        read_timeout: float = None,
+        retries: int = None,
+        qps: float = None,
+        burst: int = None,
     ):
         """
         KrknKubernetes Constructor. Can be invoked with kubeconfig_path
@@ -80,6 +150,31 @@ class KrknKubernetes:
         :param kubeconfig_string: (keyword argument)
             kubeconfig in string format
         :param: request_chunk_size: int of chunk size to limit requests to
+        :param connection_pool_maxsize: (keyword argument) maximum number
+            of connections kept open and reused towards each host, should
+            be at least the number of threads calling the API in parallel
+            (optional, default 5 connections per CPU)
+        :param num_pools: (keyword argument) number of per-host connection
+            pools cached by the client (optional, default 4)
+        :param pool_block: (keyword argument) if True, when all the
+            connections of a pool are in use the requests wait for a free
+            connection instead of opening a connection that is discarded
+            afterwards (optional, default False)
+        :param connect_timeout: (keyword argument) default connection
+            timeout in seconds of the non-streaming requests
+            (optional, default no timeout)
+        :param read_timeout: (keyword argument) default read timeout
+            in seconds of the non-streaming requests, watches and
+            followed logs are not affected (optional, default no timeout)
+        :param retries: (keyword argument) number of retries on
+            connection errors (optional, default urllib3 default)
+        :param qps: (keyword argument) maximum number of requests per
+            second sent to the API server, when set all the requests
+            are rate limited by a token bucket with priority lanes
+            (see `request_priority`) (optional, default not limited)
+        :param burst: (keyword argument) maximum number of requests
+            that can be sent at once when qps is set
+            (optional, default qps rounded up)
 
         Initialization with kubeconfig path:
 
@@ -103,6 +198,14 @@ class KrknKubernetes:
             )
 
         self.request_chunk_size = request_chunk_size
+        self.__connection_pool_maxsize = connection_pool_maxsize
+        self.__num_pools = num_pools
+        self.__pool_block = pool_block
+        self.__connect_timeout = connect_timeout
+        self.__read_timeout = read_timeout
+        self.__retries = retries
+        if qps is not None:
+            self.rate_limiter = PriorityRateLimiter(qps, burst)
         if kubeconfig_string is not None:
             self.__kubeconfig_string = kubeconfig_string
             self.__initialize_clients_from_kconfig_string(kubeconfig_string)
@@ -164,6 +267,8 @@ class KrknKubernetes:
             client.Configuration.set_default(client_config)
 
             self.api_client = client.ApiClient(client_config)
+            self.__configure_connection_pool()
+            self.__configure_rate_limiter()
 
             self.cli = client.CoreV1Api(self.api_client)
             self.version_client = client.VersionApi(self.api_client)
@@ -197,6 +302,8 @@ class KrknKubernetes:
                 kubeconfig, True
             )
             self.api_client = arcaflow_lib_kubernetes.connect(connection)
+            self.__configure_connection_pool()
+            self.__configure_rate_limiter()
             self.cli = client.CoreV1Api(self.api_client)
             self.batch_cli = client.BatchV1Api(self.api_client)
             self.apps_api = client.AppsV1Api(self.api_client)
@@ -212,6 +319,136 @@ class KrknKubernetes:
             logging.error("failed to validate kubeconfig: %s\n", str(e))
             raise e
 
+    def __configure_connection_pool(self):
+        """
+        Rebuilds the REST client of the ApiClient applying the
+        connection pool, timeout and retries options passed to
+        the constructor. If none of them has been set the client
+        is left untouched.
+        """
+        if (
+            self.__connection_pool_maxsize is None
+            and self.__num_pools is None
+            and not self.__pool_block
+            and self.__connect_timeout is None
+            and self.__read_timeout is None
+            and self.__retries is None
+        ):
+            return
+
+        configuration = self.api_client.configuration
+        if self.__connection_pool_maxsize is not None:
+            configuration.connection_pool_maxsize = (
+                self.__connection_pool_maxsize
+            )
+        if self.__retries is not None:
+            configuration.retries = self.__retries
+
+        self.api_client.rest_client.pool_manager.clear()
+        rest_client = rest.RESTClientObject(
+            configuration,
+            pools_size=self.__num_pools if self.__num_pools else 4,
+        )
+        rest_client.pool_manager.connection_pool_kw["block"] = (
+            self.__pool_block
+        )
+
+        if (
+            self.__connect_timeout is not None
+            or self.__read_timeout is not None
+        ):
+            default_timeout = (self.__connect_timeout, self.__read_timeout)
+            request = rest_client.request
+
+            def request_with_default_timeout(
+                *args, _preload_content=True, _request_timeout=None, **kwargs
+            ):
+                # streaming responses (watches, followed logs) are
+                # left without timeout since they can be idle for a long
+                # time
+                if _request_timeout is None and _preload_content:
+                    _request_timeout = default_timeout
+                return request(
+                    *args,
+                    _preload_content=_preload_content,
+                    _request_timeout=_request_timeout,
+                    **kwargs,
+                )
+
+            rest_client.request = request_with_default_timeout
+
+        self.api_client.rest_client = rest_client
+
+    def __configure_rate_limiter(self):
+        """
+        Wraps the ApiClient `call_api` method so that every request,
+        including watches and exec streams, acquires a token
+        from the rate limiter before being sent
+        """
+        if self.rate_limiter is None:
+            return
+        call_api = self.api_client.call_api
+        rate_limiter = self.rate_limiter
+
+        def rate_limited_call_api(*args, **kwargs):
+            rate_limiter.acquire()
+            return call_api(*args, **kwargs)
+
+        self.api_client.call_api = rate_limited_call_api
+
+    def get_rate_limiter_metrics(
+        self,
+    ) -> Optional[dict[RequestPriority, RateLimiterMetrics]]:
+        """
+        Returns the queue wait time metrics of each priority lane
+        of the client-side rate limiter
+
+        :return: a dictionary of RateLimiterMetrics by RequestPriority
+            or None if the rate limiter is not enabled (see `qps`
+            constructor parameter)
+        """
+        if self.rate_limiter is None:
+            return None
+        return self.rate_limiter.get_metrics()
+
+    def get_connection_pool_metrics(self) -> ConnectionPoolMetrics:
+        """
+        Returns the usage metrics of the HTTP connection pools of
+        the ApiClient. A number of connections growing along with the
+        number of requests means that the pool is too small for the
+        number of threads and the connections are not reused
+        (see `connection_pool_maxsize` constructor parameter)
+
+        :return: a ConnectionPoolMetrics object
+        """
+        pool_manager = self.api_client.rest_client.pool_manager
+        pool_kw = pool_manager.connection_pool_kw
+        metrics = ConnectionPoolMetrics(
+            num_pools=pool_manager.pools._maxsize,
+            maxsize=pool_kw.get("maxsize", 1),
+            block=pool_kw.get("block", False),
+        )
+        with pool_manager.pools.lock:
+            pools = list(pool_manager.pools._container.values())
+        for pool in pools:
+            if pool.pool is None:
+                continue
+            # the pool queue is filled with None placeholders
+            # that are replaced by the connections once opened
+            available = list(pool.pool.queue)
+            idle = len([conn for conn in available if conn is not None])
+            metrics.pools.append(
+                HostConnectionPoolMetrics(
+                    host=f"{pool.scheme}://{pool.host}:{pool.port}",
+                    maxsize=pool.pool.maxsize,
+                    in_use=pool.pool.maxsize - len(available),
+                    idle=idle,
+                    num_connections=pool.num_connections,
+                    num_requests=pool.num_requests,
+                )
+            )
+        return metrics
+
     def _get_clusterversion_string(self) -> str:
         """
         Return clusterversion status text on OpenShift, empty string
@@ -298,17 +535,25 @@ class KrknKubernetes:
         :return: list of all resources after segmentation
         """
         ret_overall = []
+        # bulk listing is sent with low priority unless
+        # the caller has set a priority explicitly
+        priority = get_request_priority()
+        if priority is None:
+            priority = RequestPriority.low
         try:
-            ret = func(*args, **keyword_args)
-            ret_overall.append(ret)
-            continue_string = ret.metadata._continue
-
-            while continue_string:
-                ret = func(*args, **keyword_args, _continue=continue_string)
+            with request_priority(priority):
+                ret = func(*args, **keyword_args)
                 ret_overall.append(ret)
-
                 continue_string = ret.metadata._continue
 
+                while continue_string:
+                    ret = func(
+                        *args, **keyword_args, _continue=continue_string
+                    )
+                    ret_overall.append(ret)
+
+                    continue_string = ret.metadata._continue
+
         except ApiException as e:
             logging.error(
                 "Exception when calling CoreV1Api->%s: %s\n" % (str(func), e)
@@ -1137,11 +1382,11 @@ class KrknKubernetes:
         :return: the command output
         """
 
-        file_loader = PackageLoader("krkn_lib.k8s", "templates")
-        env = Environment(loader=file_loader, autoescape=True)
-        pod_template = env.get_template("node_exec_pod.j2")
-        pod_body = yaml.safe_load(
-            pod_template.render(nodename=node_name, podname=exec_pod_name)
+        pod_body = template_registry.render_manifest(
+            "node_exec_pod.j2",
+            direct=True,
+            nodename=node_name,
+            podname=exec_pod_name,
         )
 
         logging.info(
@@ -1245,6 +1490,173 @@ class KrknKubernetes:
             _preload_content=False,
         )
 
+    def collect_pods_logs(
+        self,
+        namespaces: list[str],
+        dst_dir: str,
+        start_timestamp: Optional[int],
+        end_timestamp: Optional[int],
+        threads: int = 10,
+        containers: list[str] = None,
+        label_selector: str = None,
+        chunk_size: int = 64 * 1024,
+        clock_skew_margin: int = 60,
+    ) -> list[LogFilterFileStats]:
+        """
+        Collects the logs of the pod containers of a set of namespaces
+        through the `pods/log` API fetching only the lines within the
+        time range, instead of collecting the whole logs with
+        `oc adm must-gather` and filtering them. The logs are requested
+        with `since_seconds` and the timestamps added by the kubelet,
+        `threads` containers are streamed in parallel and each stream
+        is closed as soon as a line after `end_timestamp` is received.
+        The logs are written in `dst_dir` with the same names of the
+        must-gather filtered logs (see
+        `KrknOpenshift.filter_must_gather_ocp_log_folder`), eg.
+        namespaces.<namespace>.pods.<pod>.<container>.<container>.logs.current.log
+        the containers without lines in the time range are not written.
+
+        :param namespaces: the namespaces of the pods
+        :param dst_dir: the folder where the logs will be written
+        :param start_timestamp: timestamp of the first relevant entry, if
+            None the logs are collected from the beginning
+        :param end_timestamp: timestamp of the last relevant entry, if
+            None the logs are collected until the latest
+        :param threads: the number of containers whose logs
+            are collected in parallel (optional, default 10)
+        :param containers: the names of the containers collected, if
+            None all the containers are collected (optional)
+        :param label_selector: filter the pods by label
+            selector (optional)
+        :param chunk_size: size in bytes of the chunks read from
+            each stream (optional, default 64KB)
+        :param clock_skew_margin: seconds added to `since_seconds`,
+            computed with the local clock, so that the lines at the
+            start of the range are not lost if the clock is behind the
+            API server one. The extra lines are filtered out
+            (optional, default 60)
+        :return: the LogFilterFileStats of each container,
+            `source_file` is `<namespace>/<pod>/<container>`
+        """
+        if not os.path.isdir(dst_dir):
+            raise Exception(f"destination folder {dst_dir} does not exist")
+        targets = []
+        for namespace in namespaces:
+            for pod_list in self.get_all_pod_info(namespace, label_selector):
+                for pod in pod_list.items:
+                    for container in pod.spec.containers:
+                        if containers and container.name not in containers:
+                            continue
+                        targets.append(
+                            (namespace, pod.metadata.name, container.name)
+                        )
+        with ThreadPoolExecutor(max_workers=max(1, threads)) as executor:
+            futures = [
+                executor.submit(
+                    self.__collect_container_log,
+                    namespace,
+                    pod_name,
+                    container,
+                    dst_dir,
+                    start_timestamp,
+                    end_timestamp,
+                    chunk_size,
+                    clock_skew_margin,
+                )
+                for namespace, pod_name, container in targets
+            ]
+            return [future.result() for future in futures]
+
+    def __collect_container_log(
+        self,
+        namespace: str,
+        pod_name: str,
+        container: str,
+        dst_dir: str,
+        start_timestamp: Optional[int],
+        end_timestamp: Optional[int],
+        chunk_size: int,
+        clock_skew_margin: int,
+    ) -> LogFilterFileStats:
+        start_time = time.monotonic()
+        stats = LogFilterFileStats(
+            source_file=f"{namespace}/{pod_name}/{container}", shards=1
+        )
+        filtered_file = os.path.join(
+            dst_dir,
+            f"namespaces.{namespace}.pods.{pod_name}."
+            f"{container}.{container}.logs.current.log",
+        )
+        time_window = TimeWindow(start_timestamp, end_timestamp)
+        kwargs = {}
+        if start_timestamp is not None:
+            # the lines logged before the start because of
+            # the seconds rounding and the margin are filtered anyway
+            kwargs["since_seconds"] = max(
+                1,
+                math.ceil(time.time() - start_timestamp) + clock_skew_margin,
+            )
+        response = None
+        try:
+            response = self.cli.read_namespaced_pod_log(
+                name=pod_name,
+                namespace=namespace,
+                container=container,
+                timestamps=True,
+                _return_http_data_only=True,
+                _preload_content=False,
+                **kwargs,
+            )
+            with open(filtered_file, "wb") as output:
+                for line in self.__stream_lines(response, chunk_size):
+                    stats.lines_read += 1
+                    stats.bytes_read += len(line)
+                    # each line starts with the RFC3339
+                    # timestamp added by the kubelet
+                    try:
+                        timestamp = parse_log_timestamp(
+                            line.split(b" ", 1)[0].decode("utf-8"),
+                            "pods/log",
+                        )
+                    except (ValueError, OverflowError):
+                        # the line is skipped as filter_log_line does
+                        # with the lines without a valid date
+                        continue
+                    if end_timestamp is not None and timestamp > end_timestamp:
+                        # the logs are sorted by time,
+                        # the rest of the stream is skipped
+                        break
+                    if time_window.contains(timestamp):
+                        stats.lines_matched += 1
+                        output.write(line)
+        except Exception as e:
+            logging.error(
+                f"failed to collect the logs of container {container} "
+                f"of pod {pod_name} in namespace {namespace}: {str(e)}"
+            )
+            stats.error = str(e)
+        finally:
+            if response is not None:
+                response.close()
+        if stats.lines_matched > 0 and not stats.error:
+            stats.filtered_file = filtered_file
+        elif os.path.exists(filtered_file):
+            os.unlink(filtered_file)
+        stats.elapsed = time.monotonic() - start_time
+        return stats
+
+    def __stream_lines(
+        self, response: HTTPResponse, chunk_size: int
+    ) -> Iterator[bytes]:
+        remainder = b""
+        for chunk in response.stream(chunk_size):
+            lines = (remainder + chunk).split(b"\n")
+            remainder = lines.pop()
+            for line in lines:
+                yield line + b"\n"
+        if remainder:
+            yield remainder
+
     def get_containers_in_pod(
         self, pod_name: str, namespace: str = "default"
     ) -> list[str]:
@@ -1744,28 +2156,29 @@ class KrknKubernetes:
         """
         count = timeout
         timer_start = time.time()
-        for event in self.watch_resource.stream(
-            self.cli.list_node,
-            field_selector=f"metadata.name={node}",
-            timeout_seconds=timeout,
-        ):
-            conditions = [
-                status
-                for status in event["object"].status.conditions
-                if status.type == "Ready"
-            ]
-            if conditions[0].status == status:
-                self.watch_resource.stop()
-                break
-            else:
-                count -= 1
-                logging.info(
-                    "Status of node %s: %s",
-                    node,
-                    str(conditions[0].status),
-                )
-            if not count:
-                self.watch_resource.stop()
+        with request_priority(RequestPriority.high):
+            for event in self.watch_resource.stream(
+                self.cli.list_node,
+                field_selector=f"metadata.name={node}",
+                timeout_seconds=timeout,
+            ):
+                conditions = [
+                    status
+                    for status in event["object"].status.conditions
+                    if status.type == "Ready"
+                ]
+                if conditions[0].status == status:
+                    self.watch_resource.stop()
+                    break
+                else:
+                    count -= 1
+                    logging.info(
+                        "Status of node %s: %s",
+                        node,
+                        str(conditions[0].status),
+                    )
+                if not count:
+                    self.watch_resource.stop()
         end_time = time.time()
         affected_node.set_affected_node_status(status, end_time - timer_start)
         return affected_node
@@ -2168,6 +2581,106 @@ class KrknKubernetes:
         except Exception as e:
             raise ApiException(str(e))
 
+    def stream_cmd_output_from_pod(
+        self,
+        command: list[str],
+        pod_name: str,
+        namespace: str,
+        container: str = None,
+    ) -> Iterator[bytes]:
+        """
+        Executes a command in a pod or a container and yields its
+        stdout as raw bytes while it is received. Unlike
+        `exec_cmd_in_pod` the output is not decoded, so binary
+        output (eg. tar archives) is not corrupted and doesn't need
+        to be base64 encoded in the pod
+
+        :param command: the command and its parameters
+        :param pod_name: pod where the command must be executed
+        :param namespace: namespace of the pod
+        :param container: container where the command
+            must be executed (optional default `None`)
+        :return: an iterator of stdout chunks
+        """
+        keyword_args = {
+            "command": command,
+            "stderr": True,
+            "stdin": False,
+            "stdout": True,
+            "tty": False,
+            "_preload_content": False,
+        }
+        if container:
+            keyword_args["container"] = container
+        resp = stream(
+            self.cli.connect_get_namespaced_pod_exec,
+            pod_name,
+            namespace,
+            **keyword_args,
+        )
+        error = b""
+        stderr = b""
+        try:
+            # the frames are read from the socket directly since
+            # WSClient decodes them as utf-8 strings
+            while resp.is_open():
+                op_code, frame = resp.sock.recv_data_frame(True)
+                if op_code == ABNF.OPCODE_CLOSE:
+                    break
+                if op_code not in [ABNF.OPCODE_BINARY, ABNF.OPCODE_TEXT]:
+                    continue
+                if len(frame.data) < 2:
+                    continue
+                channel = frame.data[0]
+                if channel == STDOUT_CHANNEL:
+                    yield frame.data[1:]
+                elif channel == STDERR_CHANNEL:
+                    stderr += frame.data[1:]
+                elif channel == ERROR_CHANNEL:
+                    error += frame.data[1:]
+        finally:
+            resp.close()
+        if error:
+            status = json.loads(error)
+            if status.get("status") != "Success":
+                raise Exception(
+                    f"command {' '.join(command)} failed: "
+                    f"{status.get('message')} "
+                    f"{stderr.decode('utf-8', 'replace')}"
+                )
+
+    def get_file_checksum_from_pod(
+        self,
+        pod_name: str,
+        container_name: str,
+        namespace: str,
+        filename: str,
+    ) -> Optional[str]:
+        """
+        Computes the sha256 checksum of a file in a pod
+
+        :param pod_name: pod name
+        :param container_name: container name
+        :param namespace: namespace of the pod
+        :param filename: full-path of the file in the pod
+        :return: the hex digest of the file or None if `sha256sum`
+            is not available in the container
+        """
+        try:
+            result = self.exec_cmd_in_pod(
+                [filename],
+                pod_name,
+                namespace,
+                container_name,
+                "sha256sum",
+            )
+        except Exception:
+            return None
+        checksum = result.strip().split(" ")[0]
+        if not re.fullmatch(r"[0-9a-f]{64}", checksum):
+            return None
+        return checksum
+
     def get_archive_volume_from_pod_worker(
         self,
         pod_name: str,
@@ -2183,6 +2696,14 @@ class KrknKubernetes:
         delete_remote_after_download: bool,
         thread_number: int,
         safe_logger: SafeLogger,
+        binary: bool = False,
+        codec: ArchiveCodec = ArchiveCodec.none,
+        max_retries: int = 5,
+        manifest: DownloadManifest = None,
+        on_part_downloaded: Callable[[int, str], None] = None,
+        concurrency_controller: AdaptiveConcurrencyController = None,
+        progress: TransferProgressTracker = None,
+        resume: bool = False,
     ):
         """
         Download worker for the create_download_multipart_archive
@@ -2190,7 +2711,8 @@ class KrknKubernetes:
         parameter until the queue will be empty and will download
         the i-th tar volume popped from the queue itself.
         the file will be downloaded in base64 string format in order
-        to avoid archive corruptions caused by the Kubernetes WebSocket API.
+        to avoid archive corruptions caused by the Kubernetes WebSocket API
+        unless `binary` is set.
 
 
         :param pod_name: pod name from which the tar volume
@@ -2224,6 +2746,27 @@ class KrknKubernetes:
         :param thread_number: the assigned thread number
         :param safe_logger: SafeLogger class, will allow thread-safe
             logging
+        :param binary: if True the tar volume is streamed as raw bytes
+            straight to a `.tar` file and verified against the sha256
+            checksum computed in the pod (if `sha256sum` is available)
+        :param codec: the codec used to compress the archive in the
+            pod, sets the extension of the local file
+        :param max_retries: number of times a binary download is resumed
+            from the last byte received if the connection drops
+        :param manifest: if set the state of each binary download
+            is saved in the manifest
+        :param on_part_downloaded: if set, called by the worker with the
+            archive number and the local filename as soon as a volume is
+            downloaded. Since the worker does not pick the next volume
+            until the callback returns, a blocking callback (eg. putting
+            in a bounded queue) throttles the download
+        :param concurrency_controller: if set, the worker waits for
+            a slot of the controller before downloading each volume
+        :param progress: if set, the download of each volume is
+            tracked in the `download` stage of the tracker
+        :param resume: binary downloads only, if True the volumes
+            partially downloaded by a previous run are resumed,
+            otherwise the existing local files are truncated
         """
         while not queue.empty():
             file_number = queue.get()
@@ -2233,16 +2776,110 @@ class KrknKubernetes:
                     f"element format, download failed"
                 )
                 return
+            if concurrency_controller:
+                concurrency_controller.acquire()
+            if progress:
+                progress.start_part("download", file_number)
 
             local_file_name = (
                 f"{local_download_path}/{local_file_prefix}"
-                f"{file_number:02d}.tar.b64"
+                f"{file_number:02d}{codec.extension}.b64"
             )
             remote_file_name = (
                 f"{remote_archive_path}/{remote_archive_prefix}part."
                 f"{file_number:02d}"
             )
 
+            if binary:
+                local_file_name = local_file_name.replace(".b64", "")
+                downloaded = False
+                try:
+                    if manifest:
+                        manifest.set_part(
+                            file_number,
+                            remote=remote_file_name,
+                            local=local_file_name,
+                            status="downloading",
+                        )
+                    if not resume and os.path.exists(local_file_name):
+                        # stale file of a previous run
+                        os.unlink(local_file_name)
+                    checksum = self.download_file_from_pod(
+                        pod_name,
+                        container_name,
+                        namespace,
+                        remote_file_name,
+                        local_file_name,
+                        max_retries=max_retries,
+                        resume=resume,
+                        on_bytes=(
+                            partial(progress.add_bytes, "download")
+                            if progress
+                            else None
+                        ),
+                    )
+                    downloaded = True
+                    if manifest:
+                        manifest.set_part(
+                            file_number,
+                            size=os.stat(local_file_name).st_size,
+                            sha256=checksum,
+                            status="downloaded",
+                        )
+                    downloaded_file_list.append((file_number, local_file_name))
+                    safe_logger.info(
+                        f"[Thread #{thread_number}] : "
+                        f"{queue.unfinished_tasks-1}/"
+                        f"{queue_size} "
+                        f"{local_file_name} downloaded "
+                    )
+                except Exception as e:
+                    if manifest:
+                        manifest.set_part(file_number, status="failed")
+                    safe_logger.error(
+                        f"[Thread #{thread_number}]: failed "
+                        f"to download {remote_file_name}"
+                        f" from pod: {pod_name}, "
+                        f"container: {container_name}, "
+                        f"namespace: {namespace}"
+                        f" with exception: {str(e)}. Aborting download."
+                    )
+                finally:
+                    # the remote file is kept if the download failed
+                    # to be resumed later
+                    if delete_remote_after_download and downloaded:
+                        try:
+                            self.delete_file_from_pod(
+                                pod_name,
+                                container_name,
+                                namespace,
+                                remote_file_name,
+                            )
+                        except Exception as e:
+                            safe_logger.error(
+                                f"[Thread #{thread_number}]: failed to "
+                                f"remove remote archive "
+                                f"{remote_file_name}: {str(e)}"
+                            )
+                    self.__release_concurrency_slot(
+                        concurrency_controller, local_file_name, downloaded
+                    )
+                    if progress:
+                        progress.finish_part(
+                            "download", file_number, error=not downloaded
+                        )
+                    if downloaded:
+                        self.__notify_part_downloaded(
+                            on_part_downloaded,
+                            file_number,
+                            local_file_name,
+                            thread_number,
+                            safe_logger,
+                        )
+                    queue.task_done()
+                continue
+
+            downloaded = False
             try:
                 with open(local_file_name, "x") as file_buffer:
                     base64_dump = [
@@ -2267,9 +2904,12 @@ class KrknKubernetes:
                         if resp.peek_stdout():
                             out = resp.read_stdout()
                             file_buffer.write(out)
+                            if progress:
+                                progress.add_bytes("download", len(out))
                     resp.close()
                     file_buffer.flush()
                     file_buffer.seek(0)
+                    downloaded = True
                     downloaded_file_list.append((file_number, local_file_name))
                     safe_logger.info(
                         f"[Thread #{thread_number}] : "
@@ -2288,8 +2928,7 @@ class KrknKubernetes:
                     f" with exception: {str(e)}. Aborting download."
                 )
             finally:
-                queue.task_done()
-                if delete_remote_after_download:
+                if delete_remote_after_download and downloaded:
                     try:
                         # delete the backup file
                         self.delete_file_from_pod(
@@ -2304,6 +2943,175 @@ class KrknKubernetes:
                             f"remove remote archive "
                             f"{remote_file_name}: {str(e)}"
                         )
+                self.__release_concurrency_slot(
+                    concurrency_controller, local_file_name, downloaded
+                )
+                if progress:
+                    progress.finish_part(
+                        "download", file_number, error=not downloaded
+                    )
+                if downloaded:
+                    self.__notify_part_downloaded(
+                        on_part_downloaded,
+                        file_number,
+                        local_file_name,
+                        thread_number,
+                        safe_logger,
+                    )
+                # the volume is marked as done only after the
+                # callback returned, so the download does not
+                # terminate before all the volumes are notified
+                queue.task_done()
+
+    def __release_concurrency_slot(
+        self,
+        concurrency_controller: Optional[AdaptiveConcurrencyController],
+        local_file_name: str,
+        downloaded: bool,
+    ):
+        if concurrency_controller is None:
+            return
+        size = 0
+        if downloaded and os.path.exists(local_file_name):
+            size = os.stat(local_file_name).st_size
+        concurrency_controller.release(size, error=not downloaded)
+
+    def __notify_part_downloaded(
+        self,
+        on_part_downloaded: Optional[Callable[[int, str], None]],
+        file_number: int,
+        local_file_name: str,
+        thread_number: int,
+        safe_logger: SafeLogger,
+    ):
+        if on_part_downloaded is None:
+            return
+        try:
+            on_part_downloaded(file_number, local_file_name)
+        except Exception as e:
+            safe_logger.error(
+                f"[Thread #{thread_number}]: on_part_downloaded "
+                f"callback failed for {local_file_name}: {str(e)}"
+            )
+
+    def download_file_from_pod(
+        self,
+        pod_name: str,
+        container_name: str,
+        namespace: str,
+        remote_file_name: str,
+        local_file_name: str,
+        max_retries: int = 5,
+        retry_backoff: float = 1,
+        resume: bool = False,
+        on_bytes: Callable[[int], None] = None,
+    ) -> str:
+        """
+        Downloads a file from a pod as raw bytes. If the connection
+        drops or the stream ends early the download is resumed from
+        the last byte received (`tail -c +N`) retrying with exponential
+        backoff. Once completed the file is verified against the size
+        and the sha256 checksum computed in the pod (if `sha256sum` is
+        available), if the verification fails the download restarts
+        from scratch.
+
+        :param pod_name: pod name
+        :param container_name: container name
+        :param namespace: namespace of the pod
+        :param remote_file_name: full-path of the file in the pod
+        :param local_file_name: full-path of the local file
+        :param max_retries: maximum number of retries
+            (optional default 5)
+        :param retry_backoff: seconds to wait before the first retry,
+            doubled at every retry (optional default 1)
+        :param resume: if True and the local file already exists,
+            (eg. partially downloaded by a previous run) the download
+            continues from its size otherwise an exception is raised
+            (optional default False)
+        :param on_bytes: callback invoked with the size of each
+            chunk of bytes received (optional)
+        :return: the sha256 checksum of the downloaded file
+        """
+        if os.path.exists(local_file_name) and not resume:
+            raise FileExistsError(f"{local_file_name} already exists")
+        size = self.exec_cmd_in_pod(
+            [f"wc -c < {remote_file_name}"],
+            pod_name,
+            namespace,
+            container_name,
+        ).strip()
+        if not size.isdigit():
+            raise Exception(
+                f"impossible to read the size of {remote_file_name}: {size}"
+            )
+        remote_size = int(size)
+        remote_checksum = self.get_file_checksum_from_pod(
+            pod_name, container_name, namespace, remote_file_name
+        )
+
+        retry = 0
+        while True:
+            checksum = hashlib.sha256()
+            offset = 0
+            if os.path.exists(local_file_name):
+                if os.stat(local_file_name).st_size > remote_size:
+                    os.unlink(local_file_name)
+                else:
+                    with open(local_file_name, "rb") as file_buffer:
+                        for chunk in iter(
+                            lambda: file_buffer.read(1024 * 1024), b""
+                        ):
+                            checksum.update(chunk)
+                            offset += len(chunk)
+            try:
+                if offset < remote_size:
+                    with open(local_file_name, "ab") as file_buffer:
+                        for chunk in self.stream_cmd_output_from_pod(
+                            ["tail", "-c", f"+{offset + 1}", remote_file_name],
+                            pod_name,
+                            namespace,
+                            container_name,
+                        ):
+                            checksum.update(chunk)
+                            file_buffer.write(chunk)
+                            offset += len(chunk)
+                            if on_bytes:
+                                on_bytes(len(chunk))
+                else:
+                    open(local_file_name, "ab").close()
+                if offset < remote_size:
+                    # stream ended early, the next retry resumes
+                    # from the bytes already downloaded
+                    raise Exception(
+                        f"download interrupted at byte "
+                        f"{offset}/{remote_size}"
+                    )
+                if offset > remote_size or (
+                    remote_checksum is not None
+                    and remote_checksum != checksum.hexdigest()
+                ):
+                    # corrupted file, restarts from scratch
+                    os.unlink(local_file_name)
+                    raise Exception(
+                        f"verification failed, remote size: {remote_size} "
+                        f"checksum: {remote_checksum}, local size: {offset} "
+                        f"checksum: {checksum.hexdigest()}"
+                    )
+                return checksum.hexdigest()
+            except Exception as e:
+                if retry >= max_retries:
+                    raise e
+                logging.warning(
+                    "download of %s interrupted at byte %d/%d, "
+                    "retry number %d: %s",
+                    remote_file_name,
+                    offset,
+                    remote_size,
+                    retry + 1,
+                    str(e),
+                )
+                time.sleep(retry_backoff * 2**retry)
+                retry += 1
 
     def archive_and_get_path_from_pod(
         self,
@@ -2317,6 +3125,13 @@ class KrknKubernetes:
         archive_part_size: int = 30000,
         max_threads: int = 5,
         safe_logger: SafeLogger = None,
+        binary: bool = False,
+        codec: ArchiveCodec = ArchiveCodec.none,
+        max_retries: int = 5,
+        resume: bool = False,
+        on_part_downloaded: Callable[[int, str], None] = None,
+        concurrency_controller: AdaptiveConcurrencyController = None,
+        progress: TransferProgressTracker = None,
     ) -> list[(int, str)]:
         """
         Archives and downloads a folder content
@@ -2348,15 +3163,66 @@ class KrknKubernetes:
         :param safe_logger: SafeLogger, if omitted a default SafeLogger will
             be instantiated that will simply use the logging package
             to print logs to stdout.
+        :param binary: if True the archive volumes are downloaded as raw
+            bytes in `.tar` files (verified against the checksum computed
+            in the pod) instead of base64 encoded `.tar.b64` files
+        :param codec: the codec used to compress the archive in the pod
+            (see `get_archive_codec`), the local files extension
+            will change accordingly (eg. `.tar.gz`)
+        :param max_retries: binary downloads only, number of times
+            a volume download is resumed from the last byte received
+            if the connection drops (optional default 5)
+        :param resume: binary downloads only, the state of the binary
+            downloads is persisted in a
+            `<archive_files_prefix>-manifest.json` file in
+            `download_path`. If set to True and the manifest of a
+            previous interrupted download exists the archive is not
+            recreated and only the volumes not completed are downloaded,
+            resuming the partial ones (optional default False)
+        :param on_part_downloaded: callback invoked by the download
+            threads with the archive number and the local filename of
+            each volume as soon as it is downloaded, allows to process
+            the volumes while the download is still running. Volumes
+            already downloaded by a resumed download are notified
+            before the download starts (optional)
+        :param concurrency_controller: if set, `max_concurrency`
+            download threads are started instead of `max_threads` and
+            the controller adapts the number of volumes downloaded
+            in parallel to the throughput and the errors (optional)
+        :param progress: if set, the archive creation in the pod and
+            the download of the volumes are tracked respectively in the
+            `archive` and `download` stages of the tracker (optional)
         :return: the list of the archive number and filenames downloaded
         """
         if safe_logger is None:
             safe_logger = SafeLogger()
+        if resume and not binary:
+            raise Exception("resume is supported only by binary downloads")
 
         remote_archive_prefix = f"{archive_files_prefix}-"
         local_file_prefix = remote_archive_prefix
         queue = Queue()
         downloaded_files = list[(int, str)]()
+        manifest_path = os.path.join(
+            download_path, f"{archive_files_prefix}-manifest.json"
+        )
+        manifest = DownloadManifest.load(manifest_path) if resume else None
+        # a new archive is downloaded from scratch
+        resumed = manifest is not None
+        if resumed:
+            safe_logger.info(
+                f"resuming download from manifest {manifest_path}, "
+                f"{len(manifest.pending_parts())}/{manifest.part_count} "
+                f"volumes remaining"
+            )
+            for number, part in sorted(manifest.parts.items()):
+                if part.get("status") == "downloaded":
+                    downloaded_files.append((number, part["local"]))
+            for number in manifest.pending_parts():
+                queue.put(number)
+            if on_part_downloaded:
+                for number, local_file_name in downloaded_files:
+                    on_part_downloaded(number, local_file_name)
         try:
             # create the folder archive splitting
             # in tar files of size `chunk_size`
@@ -2376,52 +3242,36 @@ class KrknKubernetes:
             ):
                 raise Exception("remote target path does not exist")
 
-            # to support busybox (minimal) split naming options
-            # we first split with the default suffix (aa, ab, ac etc.)
-            tar_command = (
-                f"tar cpf >(split -a 2 -b {archive_part_size}k - "
-                f"{remote_archive_path}/{remote_archive_prefix}part.)"
-                f" -C {target_path} . --exclude {remote_archive_prefix}*"
-            )
-
-            safe_logger.info("creating data archive, please wait....")
-            self.exec_cmd_in_pod(
-                [tar_command],
-                pod_name,
-                namespace,
-                container_name,
-            )
-            # and then we rename the filenames replacing
-            # suffix letters with numbers
-            rename_command = (
-                f"COUNTER=0; for i in "
-                f"`ls {remote_archive_path}/{remote_archive_prefix}*`; "
-                f"do mv $i {remote_archive_path}/{remote_archive_prefix}part."
-                f"`printf '%02d' $COUNTER`; COUNTER=$((COUNTER+1)); done"
-            )
-
-            self.exec_cmd_in_pod(
-                [rename_command],
-                pod_name,
-                namespace,
-                container_name,
-            )
-
-            # count how many tar files has been created
-            count_files_command = (
-                f"ls {remote_archive_path}/{remote_archive_prefix}* | wc -l"
-            )
-
-            archive_file_number = self.exec_cmd_in_pod(
-                [count_files_command],
-                pod_name,
-                namespace,
-                container_name,
-            )
+            if manifest is None:
+                with (
+                    progress.track_part("archive", 0)
+                    if progress
+                    else nullcontext()
+                ):
+                    archive_file_number = self.__create_archive_volumes_in_pod(
+                        pod_name,
+                        container_name,
+                        namespace,
+                        remote_archive_path,
+                        remote_archive_prefix,
+                        target_path,
+                        archive_part_size,
+                        codec,
+                        safe_logger,
+                    )
+                for i in range(archive_file_number):
+                    queue.put(i)
+                if binary:
+                    manifest = DownloadManifest(
+                        manifest_path, archive_file_number
+                    )
+                    manifest.save()
 
-            for i in range(int(archive_file_number)):
-                queue.put(i)
             queue_size = queue.qsize()
+            if progress:
+                progress.set_totals("download", parts=queue_size)
+            if concurrency_controller:
+                max_threads = concurrency_controller.max_concurrency
             for i in range(max_threads):
                 worker = threading.Thread(
                     target=self.get_archive_volume_from_pod_worker,
@@ -2439,11 +3289,21 @@ class KrknKubernetes:
                         True,
                         i,
                         safe_logger,
+                        binary,
+                        codec,
+                        max_retries,
+                        manifest,
+                        on_part_downloaded,
+                        concurrency_controller,
+                        progress,
+                        resumed,
                     ),
                 )
                 worker.daemon = True
                 worker.start()
             queue.join()
+            if manifest is not None and len(manifest.pending_parts()) == 0:
+                os.unlink(manifest_path)
         except Exception as e:
             safe_logger.error(
                 f"failed to create archive {target_path} on pod: {pod_name}, "
@@ -2454,6 +3314,379 @@ class KrknKubernetes:
 
         return downloaded_files
 
+    def __create_archive_volumes_in_pod(
+        self,
+        pod_name: str,
+        container_name: str,
+        namespace: str,
+        remote_archive_path: str,
+        remote_archive_prefix: str,
+        target_path: str,
+        archive_part_size: int,
+        codec: ArchiveCodec,
+        safe_logger: SafeLogger,
+    ) -> int:
+        """
+        Archives a folder in a pod splitting it in volumes
+        named <remote_archive_prefix>part.<two digits number>
+
+        :return: the number of volumes created
+        """
+        # to support busybox (minimal) split naming options
+        # we first split with the default suffix (aa, ab, ac etc.)
+        compress_command = (
+            f"{codec.compress_command} | " if codec.compress_command else ""
+        )
+        tar_command = (
+            f"tar cpf >({compress_command}"
+            f"split -a 2 -b {archive_part_size}k - "
+            f"{remote_archive_path}/{remote_archive_prefix}part.)"
+            f" -C {target_path} . --exclude {remote_archive_prefix}*"
+        )
+
+        safe_logger.info("creating data archive, please wait....")
+        self.exec_cmd_in_pod(
+            [tar_command],
+            pod_name,
+            namespace,
+            container_name,
+        )
+        # and then we rename the filenames replacing
+        # suffix letters with numbers
+        rename_command = (
+            f"COUNTER=0; for i in "
+            f"`ls {remote_archive_path}/{remote_archive_prefix}*`; "
+            f"do mv $i {remote_archive_path}/{remote_archive_prefix}part."
+            f"`printf '%02d' $COUNTER`; COUNTER=$((COUNTER+1)); done"
+        )
+
+        self.exec_cmd_in_pod(
+            [rename_command],
+            pod_name,
+            namespace,
+            container_name,
+        )
+
+        # count how many tar files has been created
+        count_files_command = (
+            f"ls {remote_archive_path}/{remote_archive_prefix}* | wc -l"
+        )
+
+        archive_file_number = self.exec_cmd_in_pod(
+            [count_files_command],
+            pod_name,
+            namespace,
+            container_name,
+        )
+        return int(archive_file_number)
+
+    def get_archive_codec(
+        self,
+        pod_name: str,
+        container_name: str,
+        namespace: str,
+        codec: str = "auto",
+    ) -> ArchiveCodec:
+        """
+        Selects the codec used to compress the archives downloaded
+        from a container checking the binaries available in it.
+
+        :param pod_name: pod name
+        :param container_name: container name
+        :param namespace: namespace of the pod
+        :param codec: one of `auto`, `none`, `gzip`, `zstd` or `client`.
+            If `auto` the first available between zstd and gzip is
+            selected, falling back to `client` (compression on the client
+            side) if none of them is available in the container.
+            If `gzip` or `zstd` are not available in the container an
+            exception is raised.
+        :return: the ArchiveCodec selected
+        """
+        if codec != "auto":
+            codec = ArchiveCodec(codec)
+            if codec.compress_command is None:
+                return codec
+        available = self.exec_cmd_in_pod(
+            [
+                "for c in zstd gzip; do "
+                "command -v $c > /dev/null 2>&1 && echo $c; done"
+            ],
+            pod_name,
+            namespace,
+            container_name,
+        ).split()
+        if codec == "auto":
+            for candidate in [ArchiveCodec.zstd, ArchiveCodec.gzip]:
+                if candidate.value in available:
+                    return candidate
+            return ArchiveCodec.client
+        if codec.value not in available:
+            raise Exception(
+                f"{codec.value} not available in pod: {pod_name}, "
+                f"container: {container_name}, namespace: {namespace}"
+            )
+        return codec
+
+    def stream_archive_from_pod(
+        self,
+        pod_name: str,
+        container_name: str,
+        namespace: str,
+        target_path: str,
+        archive_files_prefix: str,
+        download_path: str = "/tmp",
+        archive_part_size: int = 30000,
+        max_threads: int = 5,
+        safe_logger: SafeLogger = None,
+        codec: ArchiveCodec = ArchiveCodec.none,
+        on_part_downloaded: Callable[[int, str], None] = None,
+    ) -> list[(int, str)]:
+        """
+        Archives and downloads a folder content from a container
+        without staging anything in the pod: the `tar` output is
+        streamed as raw bytes to the client that splits it locally
+        in volumes of `archive_part_size` kilobytes.
+        To download in parallel the entries of the folder are
+        distributed, balanced by size, in up to `max_threads` shards,
+        each one archived by a separate `tar` process. Each shard is
+        a complete tar archive, so unlike the volumes of
+        `archive_and_get_path_from_pod` the ordered concatenation of
+        the volumes is a sequence of tar archives that must be extracted
+        with `tar -xi` (--ignore-zeros). To tell them apart the volumes
+        are named `<archive_files_prefix>-<number>.shards.tar` (followed
+        by the codec extension, eg. `.shards.tar.gz`).
+
+        :param pod_name: pod name from which the folder
+            must be downloaded
+        :param container_name: container name from which the
+            folder must be downloaded
+        :param namespace: namespace of the pod
+        :param target_path: the path that will be archived
+            and downloaded from the container
+        :param archive_files_prefix: prefix string that will be added
+            to the files
+        :param download_path: the local path
+            where the archive will be saved
+        :param archive_part_size: the archive will be split into multiple
+            files of the specified `archive_part_size` (kilobytes)
+        :param max_threads: maximum number of shards downloaded
+            in parallel
+        :param safe_logger: SafeLogger, if omitted a default SafeLogger will
+            be instantiated that will simply use the logging package
+            to print logs to stdout.
+        :param codec: the codec used to compress the archive in the pod
+            (see `get_archive_codec`), each shard is compressed separately
+            and the volumes can be extracted with `cat volumes* | zcat |
+            tar -xi` (or `zstdcat`)
+        :param on_part_downloaded: callback invoked with the archive
+            number and the local filename of each volume as soon as the
+            shard containing it is downloaded. The volumes are numbered
+            in the order in which the shards complete, the volumes of a
+            shard have consecutive numbers (optional)
+        :return: the list of the archive number and filenames downloaded,
+            if a shard fails the remaining ones are cancelled, the
+            volumes downloaded are removed and an Exception is raised
+        """
+        if safe_logger is None:
+            safe_logger = SafeLogger()
+        if not os.path.isdir(download_path):
+            raise Exception(f"download path {download_path} does not exist")
+        if not self.path_exists_in_pod(
+            pod_name, container_name, namespace, target_path
+        ):
+            raise Exception("remote target path does not exist")
+
+        shards = self.__shard_pod_folder(
+            pod_name, container_name, namespace, target_path, max_threads
+        )
+        local_file_prefix = f"{archive_files_prefix}-"
+        extension = f".shards{codec.extension}"
+        downloaded_files = list[(int, str)]()
+        with ThreadPoolExecutor(max_workers=max(1, len(shards))) as executor:
+            futures = {
+                executor.submit(
+                    self.__stream_archive_shard_from_pod,
+                    pod_name,
+                    container_name,
+                    namespace,
+                    target_path,
+                    entries,
+                    os.path.join(
+                        download_path,
+                        f"{local_file_prefix}shard{shard_number:02d}-",
+                    ),
+                    archive_part_size * 1024,
+                    codec,
+                ): shard_number
+                for shard_number, entries in enumerate(shards)
+            }
+            failure = None
+            for future in as_completed(futures):
+                shard_number = futures[future]
+                try:
+                    shard_files = future.result()
+                    safe_logger.info(
+                        f"shard {shard_number + 1}/{len(shards)} "
+                        f"downloaded in {len(shard_files)} volumes"
+                    )
+                    # the volumes are notified without waiting
+                    # for the other shards
+                    for shard_file in shard_files:
+                        file_number = len(downloaded_files)
+                        local_file_name = os.path.join(
+                            download_path,
+                            f"{local_file_prefix}{file_number:02d}"
+                            f"{extension}",
+                        )
+                        os.rename(shard_file, local_file_name)
+                        downloaded_files.append((file_number, local_file_name))
+                        if on_part_downloaded:
+                            on_part_downloaded(file_number, local_file_name)
+                except Exception as e:
+                    safe_logger.error(
+                        f"failed to download shard {shard_number} "
+                        f"of {target_path} from pod: {pod_name}, "
+                        f"container: {container_name}, "
+                        f"namespace: {namespace} "
+                        f"with exception: {str(e)}. Aborting download."
+                    )
+                    failure = e
+                    for pending in futures:
+                        pending.cancel()
+                    break
+
+        if failure is not None:
+            # an incomplete archive is removed, including the shards
+            # completed while the running ones were awaited
+            local_files = [file for _, file in downloaded_files]
+            for future in futures:
+                if not future.cancelled() and future.exception() is None:
+                    local_files.extend(future.result())
+            for local_file in local_files:
+                if os.path.exists(local_file):
+                    os.unlink(local_file)
+            raise Exception(
+                f"failed to download {target_path} from pod: {pod_name}, "
+                f"container: {container_name}, namespace: {namespace}: "
+                f"{str(failure)}"
+            )
+        return downloaded_files
+
+    def __shard_pod_folder(
+        self,
+        pod_name: str,
+        container_name: str,
+        namespace: str,
+        target_path: str,
+        max_shards: int,
+    ) -> list[list[str]]:
+        """
+        Distributes the entries of a folder in a pod in up to
+        `max_shards` lists of similar size (in kilobytes)
+        """
+        du_command = (
+            f"cd {target_path} && for f in * .*; do "
+            f'[ "$f" = "." ] || [ "$f" = ".." ] || [ ! -e "$f" ] '
+            f'|| du -sk "$f"; done'
+        )
+        output = self.exec_cmd_in_pod(
+            [du_command], pod_name, namespace, container_name
+        )
+        entries = []
+        for line in output.splitlines():
+            size, _, name = line.partition("\t")
+            if not name or not size.isdigit():
+                continue
+            entries.append((int(size), name))
+        if not entries:
+            return [["."]]
+        shards_number = max(1, min(max_shards, len(entries)))
+        shards = [[] for _ in range(shards_number)]
+        shard_sizes = [0] * shards_number
+        # largest entries first to the least loaded shard
+        for size, name in sorted(entries, reverse=True):
+            shard = shard_sizes.index(min(shard_sizes))
+            shards[shard].append(name)
+            shard_sizes[shard] += size
+        return shards
+
+    def __stream_archive_shard_from_pod(
+        self,
+        pod_name: str,
+        container_name: str,
+        namespace: str,
+        target_path: str,
+        entries: list[str],
+        local_file_prefix: str,
+        part_size: int,
+        codec: ArchiveCodec = ArchiveCodec.none,
+    ) -> list[str]:
+        """
+        Streams the tar archive of a set of entries of a folder
+        in a pod and splits it locally in volumes of `part_size` bytes
+        """
+        quoted_entries = " ".join(
+            "'" + entry.replace("'", "'\\''") + "'" for entry in entries
+        )
+        # GNU tar exits with 1 if a file changed while being archived,
+        # (eg. prometheus WAL) that's not considered a failure, other
+        # implementations (eg. busybox) exit with 1 on errors
+        max_rc_command = (
+            "if tar --version 2>/dev/null | grep -q 'GNU tar'; "
+            "then max_rc=1; else max_rc=0; fi; "
+        )
+        tar_command = f"tar cpf - -C {target_path} {quoted_entries}"
+        if codec.compress_command:
+            # the tar exit code is sent on the fd 4 to be checked
+            # after the pipe, whose exit code is the compressor one
+            tar_command = (
+                f"{max_rc_command}"
+                f"exec 3>&1; rc=$( {{ {{ {tar_command}; echo $? >&4; }} | "
+                f"{codec.compress_command} >&3; }} 4>&1 ); "
+                f'compress_rc=$?; [ "$compress_rc" -eq 0 ] && '
+                f'[ "$rc" -le "$max_rc" ]'
+            )
+        else:
+            tar_command = (
+                f'{max_rc_command}{tar_command}; [ $? -le "$max_rc" ]'
+            )
+        local_files = []
+        file_buffer = None
+        written = 0
+        try:
+            for chunk in self.stream_cmd_output_from_pod(
+                ["sh", "-c", tar_command],
+                pod_name,
+                namespace,
+                container_name,
+            ):
+                view = memoryview(chunk)
+                while len(view) > 0:
+                    if file_buffer is None or written == part_size:
+                        if file_buffer is not None:
+                            file_buffer.close()
+                        local_files.append(
+                            f"{local_file_prefix}{len(local_files):04d}.tar"
+                        )
+                        file_buffer = open(local_files[-1], "xb")
+                        written = 0
+                    size = min(len(view), part_size - written)
+                    file_buffer.write(view[:size])
+                    written += size
+                    view = view[size:]
+        except Exception as e:
+            if file_buffer is not None:
+                file_buffer.close()
+                file_buffer = None
+            for local_file in local_files:
+                if os.path.exists(local_file):
+                    os.unlink(local_file)
+            raise e
+        finally:
+            if file_buffer is not None:
+                file_buffer.close()
+        return local_files
+
     def is_pod_running(self, pod_name: str, namespace: str) -> bool:
         """
         Checks if a pod and all its containers are running
@@ -2503,11 +3736,20 @@ class KrknKubernetes:
         cluster_timezone: str = "UTC",
         limit: int = 500,
         namespace: str = None,
+        reasons: Iterable[str] = None,
+        events_api: bool = False,
+        last_timestamp: bool = False,
+        max_list_restarts: int = 3,
     ) -> list[ClusterEvent]:
         """
         Collects cluster events querying `/api/v1/events`
-        filtered in a given time interval and writes them in
-        a temporary file in json format.
+        (or `/apis/events.k8s.io/v1/events`) filtered in a given
+        time interval. The events are listed in pages of `limit` events,
+        each page is filtered and discarded before requesting the next
+        one, so the memory used doesn't depend on the number of events
+        in the cluster. The API doesn't support field selectors on the
+        event dates, the events are filtered by reason and time before
+        being parsed in ClusterEvent.
 
         :param start_timestamp: timestamp of the minimum date
             after that the event is relevant
@@ -2515,37 +3757,144 @@ class KrknKubernetes:
             before that the event is relevant
         :param local_timezone: timezone of the local system
         :param cluster_timezone: timezone of the remote cluster
-        :param limit: limit of the number of events to be fetched
-            from the cluster
+        :param limit: number of events fetched from the
+            cluster with each request
         :param namespace: Namespace from which the events must be
             collected, if None all-namespaces will be selected
-        :return: Returns a list of parsed ClusterEvents
+        :param reasons: if set only the events with one of the reasons
+            are collected (eg. `relevant_event_reasons`), a single
+            reason is filtered by the API with a field selector
+        :param events_api: if True the events are listed with the
+            `events.k8s.io/v1` API
+        :param last_timestamp: if True the events are filtered by the
+            last time they occurred (`lastTimestamp`, the last
+            observed time of the series or `eventTime`), so the events
+            started before the interval and repeated within it are
+            collected, otherwise by the first time they occurred
+            (`firstTimestamp` or `eventTime`)
+        :param max_list_restarts: number of times the listing is
+            restarted from the first page if the continue token
+            expires while paginating (optional, default 3)
+        :return: Returns a list of parsed ClusterEvents, empty if
+            the events can't be listed completely
 
         """
-        events = []
         try:
+            # the epoch timestamps don't depend on the timezone,
+            # the timezones are only validated
+            pytz.timezone(cluster_timezone)
+            pytz.timezone(local_timezone)
+            time_window = TimeWindow(start_timestamp, end_timestamp)
+            if reasons is not None:
+                reasons = frozenset(reasons)
+            api = (
+                client.EventsV1Api(self.api_client) if events_api else self.cli
+            )
+            keyword_args = {"limit": limit}
+            if reasons is not None and len(reasons) == 1:
+                keyword_args["field_selector"] = (
+                    f"reason={next(iter(reasons))}"
+                )
             if namespace:
-                events_list = self.cli.list_namespaced_event(namespace)
-
+                list_function = partial(api.list_namespaced_event, namespace)
             else:
-                events_list = self.cli.list_event_for_all_namespaces()
-            events_list = events_list.items
-            for obj in events_list:
-                in_filtered_time = filter_dictionary(
-                    obj.first_timestamp,
-                    start_timestamp,
-                    end_timestamp,
-                    cluster_timezone,
-                    local_timezone,
-                )
-                if in_filtered_time:
-                    events.append(ClusterEvent(k8s_obj=obj))
-
+                list_function = api.list_event_for_all_namespaces
+            # a partial list is never returned, if the continue token
+            # expires (410 Gone) during a long listing the list restarts
+            for _ in range(max_list_restarts):
+                try:
+                    return self.__list_cluster_events(
+                        list_function,
+                        keyword_args,
+                        time_window,
+                        reasons,
+                        events_api,
+                        last_timestamp,
+                    )
+                except ApiException as e:
+                    if e.status != 410:
+                        raise e
+                    logging.warning(
+                        "events list expired while paginating, "
+                        "restarting the listing"
+                    )
+            raise Exception(
+                f"events list expired {max_list_restarts} times "
+                f"while paginating"
+            )
         except Exception as e:
             logging.error(str(e))
 
+        return []
+
+    def __list_cluster_events(
+        self,
+        list_function: Callable,
+        keyword_args: dict[str, Any],
+        time_window: TimeWindow,
+        reasons: Optional[frozenset[str]],
+        events_api: bool,
+        last_timestamp: bool,
+    ) -> list[ClusterEvent]:
+        """
+        PRIVATE
+        Lists page by page the events and parses
+        the ones with the reasons within the time window
+        """
+        events = []
+        for page in self.__iter_continue_pages(list_function, **keyword_args):
+            page_events = [
+                obj
+                for obj in page.items
+                if reasons is None or obj.reason in reasons
+            ]
+            in_filtered_time = time_window.contains_all(
+                [
+                    get_event_timestamp(obj, events_api, last_timestamp)
+                    for obj in page_events
+                ]
+            )
+            # parses only the events within the time window
+            for obj, in_window in zip(page_events, in_filtered_time):
+                if in_window:
+                    if events_api:
+                        events.append(ClusterEvent(k8s_events_obj=obj))
+                    else:
+                        events.append(ClusterEvent(k8s_obj=obj))
         return events
 
+    def __iter_continue_pages(
+        self, func, *args, **keyword_args
+    ) -> Iterator[Any]:
+        """
+        Lazy version of `list_continue_helper`, yields each page of
+        the list as soon as it's received so that only one page
+        at time is kept in memory
+
+        :param func: function to call of the kubernetes cli
+        :param args: any set arguments for the function
+        :param keyword_args: key value pair arguments to pass to the function
+        :return: an iterator on the pages of the list
+        """
+        # bulk listing is sent with low priority unless
+        # the caller has set a priority explicitly
+        priority = get_request_priority()
+        if priority is None:
+            priority = RequestPriority.low
+        continue_string = None
+        while True:
+            with request_priority(priority):
+                if continue_string:
+                    ret = func(
+                        *args, **keyword_args, _continue=continue_string
+                    )
+                else:
+                    ret = func(*args, **keyword_args)
+            yield ret
+            continue_string = ret.metadata._continue
+            if not continue_string:
+                return
+
     def parse_events_from_file(
         self, events_filename: str
     ) -> Optional[list[ClusterEvent]]:
@@ -2901,7 +4250,13 @@ class KrknKubernetes:
 
         return PodsMonitorThread(executor, future)
 
-    def __monitor_pods_worker(
+    def __monitor_pods_worker(self, *args, **kwargs) -> PodsStatus:
+        # the recovery timing reads must not be delayed
+        # by the other requests queued in the rate limiter
+        with request_priority(RequestPriority.high):
+            return self.__monitor_pods(*args, **kwargs)
+
+    def __monitor_pods(
         self,
         pods_and_namespaces: [(str, str)],
         pods_status: PodsStatus,
@@ -3059,8 +4414,9 @@ class KrknKubernetes:
         start_time = time.time()
         ready = False
 
-        while not ready and not event.is_set():
-            ready = self.is_pod_running(pod_name, namespace)
+        with request_priority(RequestPriority.high):
+            while not ready and not event.is_set():
+                ready = self.is_pod_running(pod_name, namespace)
         end_time = time.time()
         pod = AffectedPod(
             pod_name=pod_name,
@@ -3200,34 +4556,29 @@ class KrknKubernetes:
         selector_key = "service-hijacking"
         selector_value = f"sh-{get_random_string(5)}"
 
-        file_loader = PackageLoader("krkn_lib.k8s", "templates")
-        env = Environment(loader=file_loader, autoescape=True)
-        config_map_template = env.get_template(
-            "service_hijacking_config_map.j2"
-        )
-        plan_dump = yaml.dump(plan)
-        cm_body = yaml.safe_load(
-            config_map_template.render(
-                name=config_map_name, namespace=namespace, plan=plan_dump
-            )
+        cm_body = template_registry.render_manifest(
+            "service_hijacking_config_map.j2",
+            direct=True,
+            name=config_map_name,
+            namespace=namespace,
+            plan=plan,
         )
         self.cli.create_namespaced_config_map(
             namespace=namespace, body=cm_body
         )
 
-        pod_template = env.get_template("service_hijacking_pod.j2")
-        pod_body = yaml.safe_load(
-            pod_template.render(
-                name=pod_name,
-                namespace=namespace,
-                selector_key=selector_key,
-                selector_value=selector_value,
-                image=image,
-                port_name=port_name,
-                config_map_name=config_map_name,
-                port_number=port_number,
-                stats_route=stats_route,
-            )
+        pod_body = template_registry.render_manifest(
+            "service_hijacking_pod.j2",
+            direct=True,
+            name=pod_name,
+            namespace=namespace,
+            selector_key=selector_key,
+            selector_value=selector_value,
+            image=image,
+            port_name=port_name,
+            config_map_name=config_map_name,
+            port_number=port_number,
+            stats_route=stats_route,
         )
 
         self.create_pod(namespace=namespace, body=pod_body)
@@ -3290,26 +4641,88 @@ class KrknKubernetes:
         :param node_selectors: the node selectors of the node(s) where
             the pod will be scheduled by kubernetes
         """
-        file_loader = PackageLoader("krkn_lib.k8s", "templates")
-        env = Environment(loader=file_loader, autoescape=True)
-        pod_template = env.get_template("syn_flood_pod.j2")
-        pod_body = yaml.safe_load(
-            pod_template.render(
-                name=pod_name,
-                namespace=namespace,
-                has_node_selectors=len(node_selectors.keys()) > 0,
-                node_selectors=node_selectors,
-                image=image,
-                target=target,
-                duration=duration,
-                target_port=target_port,
-                packet_size=packet_size,
-                window_size=window_size,
-            )
+        pod_body = self.__build_syn_flood_pod_body(
+            pod_name,
+            namespace,
+            image,
+            target,
+            target_port,
+            packet_size,
+            window_size,
+            duration,
+            node_selectors,
         )
 
         self.create_pod(namespace=namespace, body=pod_body)
 
+    def deploy_syn_flood_batch(
+        self,
+        pod_name_prefix: str,
+        namespace: str,
+        image: str,
+        target: str,
+        target_port: int,
+        packet_size: int,
+        window_size: int,
+        duration: int,
+        node_selectors: list[dict[str, list[str]]] = None,
+        node_names: list[str] = None,
+        max_workers: int = 10,
+        timeout: int = 120,
+    ) -> PodsGroup:
+        """
+        Deploys a group of Pods to run the Syn Flood scenario, one for
+        each node selector and/or node name passed as parameter.
+        The pods are created concurrently and their readiness is
+        tracked with a single watch shared by the whole group.
+
+        :param pod_name_prefix: the prefix of the pod names, a random
+            suffix will be appended to each pod name
+        :param namespace: The namespace where the pods will be deployed
+        :param image: the syn flood scenario container image
+        :param target: the target hostname or ip address
+        :param target_port: the target TCP port
+        :param packet_size: the SYN packet size in bytes
+        :param window_size: the TCP window size in bytes
+        :param duration: the duration of the flood in seconds
+        :param node_selectors: a list of node selectors, one pod will be
+            deployed for each of them (same format of `deploy_syn_flood`)
+        :param node_names: a list of node names, one pod will be
+            deployed on each of them
+        :param max_workers: maximum number of pods created in parallel
+        :param timeout: maximum time in seconds to wait for all the
+            pods to be running
+        :return: a PodsGroup handle that can be used to undeploy
+            all the pods of the group
+        """
+        group_selectors = self.__batch_node_selectors(
+            node_selectors, node_names
+        )
+        group_label = f"syn-flood-{get_random_string(5)}"
+        pod_bodies = []
+        for selectors in group_selectors:
+            pod_bodies.append(
+                self.__build_syn_flood_pod_body(
+                    f"{pod_name_prefix}-{get_random_string(5)}",
+                    namespace,
+                    image,
+                    target,
+                    target_port,
+                    packet_size,
+                    window_size,
+                    duration,
+                    selectors,
+                    labels={"krkn-pods-group": group_label},
+                )
+            )
+        return self.__deploy_pods_batch(
+            pod_bodies,
+            namespace,
+            f"krkn-pods-group={group_label}",
+            max_workers,
+            timeout,
+        )
+
     def deploy_hog(self, pod_name: str, hog_config: HogConfig):
         """
         Deploys a Pod to run the Syn Flood scenario
@@ -3317,6 +4730,110 @@ class KrknKubernetes:
         :param pod_name: The name of the pod that will be deployed
         :param hog_config: Hog Configuration
         """
+        pod_body = self.__build_hog_pod_body(pod_name, hog_config)
+        self.create_pod(namespace=hog_config.namespace, body=pod_body)
+
+    def deploy_hog_batch(
+        self,
+        pod_name_prefix: str,
+        hog_config: HogConfig,
+        node_selectors: list[dict[str, list[str]]] = None,
+        node_names: list[str] = None,
+        max_workers: int = 10,
+        timeout: int = 120,
+    ) -> PodsGroup:
+        """
+        Deploys a group of Hog Pods, one for each node selector
+        and/or node name passed as parameter. The pods are created
+        concurrently and their readiness is tracked with a single
+        watch shared by the whole group.
+
+        :param pod_name_prefix: the prefix of the pod names, a random
+            suffix will be appended to each pod name
+        :param hog_config: Hog Configuration, the `node_selector`
+            field is overridden by the `node_selectors`
+            and `node_names` parameters
+        :param node_selectors: a list of node selectors, one pod will be
+            deployed for each of them (same format of `deploy_syn_flood`).
+            A hog pod is scheduled with a single label, so each selector
+            must have one key with one value (eg.
+            `{"kubernetes.io/hostname": ["worker-0"]}`)
+        :param node_names: a list of node names, one pod will be
+            deployed on each of them
+        :param max_workers: maximum number of pods created in parallel
+        :param timeout: maximum time in seconds to wait for all the
+            pods to be running
+        :return: a PodsGroup handle that can be used to undeploy
+            all the pods of the group
+        """
+        group_selectors = self.__batch_node_selectors(
+            node_selectors, node_names
+        )
+        hog_selectors = []
+        for selectors in group_selectors:
+            values = list(selectors.values())
+            if len(values) != 1 or len(values[0]) != 1:
+                raise Exception(
+                    f"hog pods support a single key=value node selector, "
+                    f"got {selectors}"
+                )
+            hog_selectors.append(f"{list(selectors.keys())[0]}={values[0][0]}")
+
+        group_label = f"hog-{get_random_string(5)}"
+        pod_bodies = []
+        for selector in hog_selectors:
+            node_config = copy.copy(hog_config)
+            node_config.node_selector = selector
+            pod_bodies.append(
+                self.__build_hog_pod_body(
+                    f"{pod_name_prefix}-{get_random_string(5)}",
+                    node_config,
+                    labels={"krkn-pods-group": group_label},
+                )
+            )
+        return self.__deploy_pods_batch(
+            pod_bodies,
+            hog_config.namespace,
+            f"krkn-pods-group={group_label}",
+            max_workers,
+            timeout,
+        )
+
+    def __build_syn_flood_pod_body(
+        self,
+        pod_name: str,
+        namespace: str,
+        image: str,
+        target: str,
+        target_port: int,
+        packet_size: int,
+        window_size: int,
+        duration: int,
+        node_selectors: dict[str, list[str]],
+        labels: dict[str, str] = None,
+    ) -> dict[str, any]:
+        return template_registry.render_manifest(
+            "syn_flood_pod.j2",
+            direct=True,
+            name=pod_name,
+            namespace=namespace,
+            labels=labels,
+            has_node_selectors=len(node_selectors.keys()) > 0,
+            node_selectors=node_selectors,
+            image=image,
+            target=target,
+            duration=duration,
+            target_port=target_port,
+            packet_size=packet_size,
+            window_size=window_size,
+        )
+
+    def __build_hog_pod_body(
+        self,
+        pod_name: str,
+        hog_config: HogConfig,
+        labels: dict[str, str] = None,
+    ) -> dict[str, any]:
         compiled_regex = re.compile(r"^.+=.*$")
         has_selector = hog_config.node_selector is not None and bool(
             compiled_regex.match(hog_config.node_selector)
@@ -3325,35 +4842,127 @@ class KrknKubernetes:
             node_selector = hog_config.node_selector.split("=")
         else:
             node_selector = {"", ""}
-        file_loader = PackageLoader("krkn_lib.k8s", "templates")
-        env = Environment(loader=file_loader, autoescape=True)
-        io_volume = {"volumes": [hog_config.io_target_pod_volume]}
-        yaml_data = yaml.dump(io_volume, default_flow_style=False, indent=2)
-        pod_template = env.get_template("hog_pod.j2")
-        pod_body = yaml.safe_load(
-            pod_template.render(
-                name=pod_name,
-                namespace=hog_config.namespace,
-                hog_type=hog_config.type.value,
-                hog_type_io=HogType.io.value,
-                has_selector=has_selector,
-                node_selector_key=node_selector[0],
-                node_selector_value=node_selector[1],
-                image=hog_config.image,
-                duration=hog_config.duration,
-                cpu_load_percentage=hog_config.cpu_load_percentage,
-                cpu_method=hog_config.cpu_method,
-                io_block_size=hog_config.io_block_size,
-                io_write_bytes=hog_config.io_write_bytes,
-                io_target_pod_folder=hog_config.io_target_pod_folder,
-                io_volume_mount=yaml_data,
-                memory_vm_bytes=hog_config.memory_vm_bytes,
-                workers=hog_config.workers,
-                target_pod_folder=hog_config.io_target_pod_folder,
+        return template_registry.render_manifest(
+            "hog_pod.j2",
+            direct=True,
+            name=pod_name,
+            namespace=hog_config.namespace,
+            labels=labels,
+            hog_type=hog_config.type.value,
+            hog_type_io=HogType.io.value,
+            has_selector=has_selector,
+            node_selector_key=node_selector[0],
+            node_selector_value=node_selector[1],
+            image=hog_config.image,
+            duration=hog_config.duration,
+            cpu_load_percentage=hog_config.cpu_load_percentage,
+            cpu_method=hog_config.cpu_method,
+            io_block_size=hog_config.io_block_size,
+            io_write_bytes=hog_config.io_write_bytes,
+            io_target_pod_volume=hog_config.io_target_pod_volume,
+            memory_vm_bytes=hog_config.memory_vm_bytes,
+            workers=hog_config.workers,
+            target_pod_folder=hog_config.io_target_pod_folder,
+        )
+
+    def __batch_node_selectors(
+        self,
+        node_selectors: list[dict[str, list[str]]] = None,
+        node_names: list[str] = None,
+    ) -> list[dict[str, list[str]]]:
+        selectors = []
+        if node_selectors:
+            selectors.extend(node_selectors)
+        if node_names:
+            selectors.extend(
+                [{"kubernetes.io/hostname": [node]} for node in node_names]
             )
+        if len(selectors) == 0:
+            raise Exception("no node selectors or node names provided")
+        return selectors
+
+    def __deploy_pods_batch(
+        self,
+        pod_bodies: list[dict[str, any]],
+        namespace: str,
+        label_selector: str,
+        max_workers: int,
+        timeout: int,
+    ) -> PodsGroup:
+        """
+        PRIVATE
+        Creates a group of pods concurrently with a bounded thread pool
+        and waits for all of them to be running (or completed) with a
+        single watch filtered by the label selector shared by the group.
+
+        :param pod_bodies: the pod manifests, each of them must contain
+            the label identified by `label_selector`
+        :param namespace: the namespace where the pods will be created
+        :param label_selector: the label selector shared by the group
+        :param max_workers: maximum number of pods created in parallel
+        :param timeout: maximum time in seconds to wait for all the
+            pods to be running
+        :return: the PodsGroup handle
+        """
+        pods_group = PodsGroup(
+            namespace, label_selector, self.delete_pod, max_workers
         )
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(
+                    self.cli.create_namespaced_pod,
+                    body=body,
+                    namespace=namespace,
+                ): body["metadata"]["name"]
+                for body in pod_bodies
+            }
+            for future, pod_name in futures.items():
+                try:
+                    future.result()
+                    pods_group.pod_names.append(pod_name)
+                except Exception as e:
+                    logging.error(
+                        f"failed to create pod {pod_name} "
+                        f"in namespace {namespace}: {str(e)}"
+                    )
+                    pods_group.failed_pods.append(pod_name)
 
-        self.create_pod(namespace=hog_config.namespace, body=pod_body)
+        pending = set(pods_group.pod_names)
+        readiness_watch = watch.Watch()
+        try:
+            for event in readiness_watch.stream(
+                self.cli.list_namespaced_pod,
+                namespace,
+                label_selector=label_selector,
+                timeout_seconds=timeout,
+            ):
+                pod = event["object"]
+                pod_name = pod.metadata.name
+                if pod_name not in pending:
+                    continue
+                # a pod that exits immediately can skip the Running
+                # phase in the watch events
+                if pod.status.phase in ["Running", "Succeeded"]:
+                    pending.remove(pod_name)
+                    pods_group.ready_pods.append(pod_name)
+                elif pod.status.phase == "Failed":
+                    pending.remove(pod_name)
+                    pods_group.failed_pods.append(pod_name)
+                if len(pending) == 0:
+                    readiness_watch.stop()
+        except Exception as e:
+            logging.error(
+                f"failed to watch pods group {label_selector} "
+                f"in namespace {namespace}: {str(e)}"
+            )
+        for pod_name in pending:
+            logging.error(
+                f"pod {pod_name} in namespace {namespace} "
+                f"not running after {timeout} seconds"
+            )
+            pods_group.failed_pods.append(pod_name)
+
+        return pods_group
 
     def get_node_resources_info(self, node_name: str) -> NodeResources:
         resources = NodeResources()
@@ -0,0 +1,506 @@
+import asyncio
+import logging
+import os
+import time
+from typing import AsyncIterator, Optional
+
+import yaml
+
+from krkn_lib.models.k8s import AffectedPod
+
+try:
+    from kubernetes_asyncio import client as async_client
+    from kubernetes_asyncio import config as async_config
+    from kubernetes_asyncio import watch as async_watch
+    from kubernetes_asyncio.client import ApiException as AsyncApiException
+    from kubernetes_asyncio.config.kube_config import (
+        KUBE_CONFIG_DEFAULT_LOCATION,
+    )
+    from kubernetes_asyncio.stream import WsApiClient
+except ImportError:
+    async_client = None
+    async_config = None
+    async_watch = None
+    AsyncApiException = Exception
+    KUBE_CONFIG_DEFAULT_LOCATION = None
+    WsApiClient = None
+
+
+class AsyncKrknKubernetes:
+    """
+    asyncio variant of KrknKubernetes built on top of kubernetes_asyncio
+    (not installed by default, installed by the `async` extra with
+    `pip install krkn-lib[async]`).
+    Exposes the core operations (list, get, watch, exec, create and
+    delete pod) as coroutines so that a single event loop can drive
+    thousands of concurrent watches and waits.
+
+    The clients are initialized asynchronously, the class must be
+    used as an async context manager or initialized with
+    `await initialize()` and closed with `await close()`:
+
+    >>> async with AsyncKrknKubernetes("/home/test/.kube/config") as lib:
+    >>>     pods = await lib.list_pods("default")
+    """
+
+    request_chunk_size: int = 250
+    api_client = None
+    ws_api_client = None
+    cli = None
+    ws_cli = None
+    __kubeconfig_string: str = None
+    __kubeconfig_path: str = None
+    __max_connections: int = 100
+
+    def __init__(
+        self,
+        kubeconfig_path: str = None,
+        *,
+        kubeconfig_string: str = None,
+        request_chunk_size: int = 250,
+        max_connections: int = 100,
+    ):
+        """
+        AsyncKrknKubernetes Constructor. Can be invoked with kubeconfig_path
+        or, optionally, with a kubeconfig in string
+        format using the keyword argument
+
+        :param kubeconfig_path: kubeconfig path
+            (optional default KUBE_CONFIG_DEFAULT_LOCATION)
+        :param kubeconfig_string: (keyword argument)
+            kubeconfig in string format
+        :param request_chunk_size: int of chunk size to limit requests to
+        :param max_connections: maximum number of simultaneous
+            connections to the API server
+        """
+        if async_client is None:
+            raise Exception(
+                "kubernetes_asyncio is not installed, please install it "
+                "with `pip install krkn-lib[async]` to use "
+                "AsyncKrknKubernetes"
+            )
+        if kubeconfig_string is not None and kubeconfig_path is not None:
+            raise Exception(
+                "please use either a kubeconfig path "
+                "or a valid kubeconfig string"
+            )
+        if kubeconfig_string is None and kubeconfig_path is None:
+            kubeconfig_path = KUBE_CONFIG_DEFAULT_LOCATION
+
+        self.request_chunk_size = request_chunk_size
+        self.__kubeconfig_string = kubeconfig_string
+        self.__kubeconfig_path = kubeconfig_path
+        self.__max_connections = max_connections
+
+    async def __aenter__(self) -> "AsyncKrknKubernetes":
+        await self.initialize()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def initialize(self):
+        """
+        Initializes all the clients from the kubeconfig
+        """
+        client_config = async_client.Configuration()
+        try:
+            if self.__kubeconfig_string is not None:
+                await async_config.load_kube_config_from_dict(
+                    yaml.safe_load(self.__kubeconfig_string),
+                    client_configuration=client_config,
+                )
+            else:
+                kubeconfig_path = os.path.expanduser(self.__kubeconfig_path)
+                await async_config.load_kube_config(
+                    config_file=kubeconfig_path,
+                    client_configuration=client_config,
+                )
+        except Exception as e:
+            logging.error("failed to validate kubeconfig: %s\n", str(e))
+            raise e
+
+        http_proxy = os.getenv("http_proxy", None)
+        if http_proxy is not None:
+            client_config.proxy = http_proxy
+        client_config.connection_pool_maxsize = self.__max_connections
+
+        self.api_client = async_client.ApiClient(client_config)
+        self.ws_api_client = WsApiClient(client_config)
+        self.cli = async_client.CoreV1Api(self.api_client)
+        self.ws_cli = async_client.CoreV1Api(self.ws_api_client)
+
+    async def close(self):
+        """
+        Closes all the clients
+        """
+        if self.api_client:
+            await self.api_client.close()
+        if self.ws_api_client:
+            await self.ws_api_client.close()
+
+    async def list_continue_helper(self, func, *args, **keyword_args):
+        """
+        List continue helper, be able to get all objects past the request limit
+
+        :param func: coroutine function of the kubernetes cli
+        :param args: any set arguments for the function
+        :param keyword_args: key value pair arguments to pass to the function
+        :return: list of all resources after segmentation
+        """
+        ret_overall = []
+        try:
+            ret = await func(*args, **keyword_args)
+            ret_overall.append(ret)
+            continue_string = ret.metadata._continue
+
+            while continue_string:
+                ret = await func(
+                    *args, **keyword_args, _continue=continue_string
+                )
+                ret_overall.append(ret)
+                continue_string = ret.metadata._continue
+
+        except AsyncApiException as e:
+            logging.error(
+                "Exception when calling CoreV1Api->%s: %s\n" % (str(func), e)
+            )
+
+        return ret_overall
+
+    async def list_namespaces(self, label_selector: str = None) -> list[str]:
+        """
+        List all namespaces
+
+        :param label_selector: filter by label
+            selector (optional default `None`)
+        :return: list of namespaces names
+        """
+        ret = await self.list_continue_helper(
+            self.cli.list_namespace,
+            label_selector=label_selector,
+            limit=self.request_chunk_size,
+        )
+        return [
+            namespace.metadata.name
+            for ret_list in ret
+            for namespace in ret_list.items
+        ]
+
+    async def list_nodes(self, label_selector: str = None) -> list[str]:
+        """
+        List nodes in the cluster
+
+        :param label_selector: filter by label
+            selector (optional default `None`)
+        :return: a list of node names
+        """
+        ret = await self.list_continue_helper(
+            self.cli.list_node,
+            label_selector=label_selector,
+            limit=self.request_chunk_size,
+        )
+        return [
+            node.metadata.name for ret_list in ret for node in ret_list.items
+        ]
+
+    async def list_pods(
+        self, namespace: str, label_selector: str = None
+    ) -> list[str]:
+        """
+        List pods in the given namespace
+
+        :param namespace: namespace to search for pods
+        :param label_selector: filter by label selector
+            (optional default `None`)
+        :return: a list of pod names
+        """
+        ret = await self.list_continue_helper(
+            self.cli.list_namespaced_pod,
+            namespace,
+            label_selector=label_selector,
+            limit=self.request_chunk_size,
+        )
+        return [
+            pod.metadata.name for ret_list in ret for pod in ret_list.items
+        ]
+
+    async def get_all_pods(
+        self, label_selector: str = None
+    ) -> list[[str, str]]:
+        """
+        Return a list of tuples containing pod name [0] and namespace [1]
+
+        :param label_selector: filter by label_selector
+            (optional default `None`)
+        :return: list of tuples pod,namespace
+        """
+        ret = await self.list_continue_helper(
+            self.cli.list_pod_for_all_namespaces,
+            label_selector=label_selector,
+            limit=self.request_chunk_size,
+        )
+        return [
+            [pod.metadata.name, pod.metadata.namespace]
+            for ret_list in ret
+            for pod in ret_list.items
+        ]
+
+    async def read_pod(self, name: str, namespace: str = "default"):
+        """
+        Read a pod definition
+
+        :param name: pod name
+        :param namespace: namespace (optional default `default`)
+        :return: V1Pod definition of the pod
+        """
+        return await self.cli.read_namespaced_pod(
+            name=name, namespace=namespace
+        )
+
+    async def is_pod_running(self, pod_name: str, namespace: str) -> bool:
+        """
+        Checks if a pod and all its containers are running
+
+        :param pod_name: the name of the pod to check
+        :param namespace: the namespace of the pod to check
+        :return: True if is running or False if not
+        """
+        try:
+            response = await self.read_pod(pod_name, namespace)
+            for status in response.status.container_statuses:
+                if not status.ready:
+                    return False
+            return True
+        except Exception:
+            return False
+
+    async def watch_pods(
+        self,
+        namespace: str,
+        label_selector: str = None,
+        field_selector: str = None,
+        timeout: int = 60,
+    ) -> AsyncIterator[dict[str, any]]:
+        """
+        Watches the pods of a namespace, yielding the watch events
+        (dictionaries with `type`, `object` and `raw_object` keys)
+
+        :param namespace: the namespace of the pods
+        :param label_selector: filter by label selector
+            (optional default `None`)
+        :param field_selector: filter by field selector
+            (optional default `None`)
+        :param timeout: the duration of the watch in seconds
+        :return: an async iterator of watch events
+        """
+        keyword_args = {"timeout_seconds": timeout}
+        if label_selector:
+            keyword_args["label_selector"] = label_selector
+        if field_selector:
+            keyword_args["field_selector"] = field_selector
+        async with async_watch.Watch() as pods_watch:
+            async for event in pods_watch.stream(
+                self.cli.list_namespaced_pod, namespace, **keyword_args
+            ):
+                yield event
+
+    async def wait_until_pod_is_ready(
+        self, pod_name: str, namespace: str, timeout: int = 120
+    ) -> AffectedPod:
+        """
+        Waits until all the containers of a pod are ready
+        watching the pod instead of polling the API
+
+        :param pod_name: the name of the pod
+        :param namespace: the namespace of the pod
+        :param timeout: maximum time to wait in seconds
+        :return: an AffectedPod with the `pod_readiness_time` set if the pod
+            became ready within the timeout
+        """
+        start_time = time.time()
+        pod = AffectedPod(pod_name=pod_name, namespace=namespace)
+        async for event in self.watch_pods(
+            namespace,
+            field_selector=f"metadata.name={pod_name}",
+            timeout=timeout,
+        ):
+            statuses = event["object"].status.container_statuses
+            if statuses and all(status.ready for status in statuses):
+                pod.pod_readiness_time = time.time() - start_time
+                break
+        return pod
+
+    async def create_pod(self, body: any, namespace: str, timeout: int = 120):
+        """
+        Create a pod in a namespace and waits for it to be running
+        (or already completed), fails as soon as the pod fails
+
+        :param body: an object representation of a valid pod yaml manifest
+        :param namespace: namespace where the pod is created
+        :param timeout: request timeout
+        """
+        pod_name = body["metadata"]["name"]
+        try:
+            await self.cli.create_namespaced_pod(
+                body=body, namespace=namespace
+            )
+            async for event in self.watch_pods(
+                namespace,
+                field_selector=f"metadata.name={pod_name}",
+                timeout=timeout,
+            ):
+                phase = event["object"].status.phase
+                if phase in ["Running", "Succeeded"]:
+                    return
+                if phase == "Failed":
+                    raise Exception(f"pod {pod_name} failed")
+            raise Exception("Starting pod failed")
+        except Exception as e:
+            logging.error("Pod creation failed %s", str(e))
+            await self.delete_pod(pod_name, namespace)
+            raise e
+
+    async def delete_pod(
+        self, name: str, namespace: str = "default", timeout: int = 120
+    ):
+        """
+        Delete a pod in a namespace and waits for its removal
+
+        :param name: pod name
+        :param namespace: namespace (optional default `default`)
+        :param timeout: maximum time to wait for the removal in seconds
+        """
+        try:
+            await self.cli.delete_namespaced_pod(
+                name=name, namespace=namespace
+            )
+            async for event in self.watch_pods(
+                namespace,
+                field_selector=f"metadata.name={name}",
+                timeout=timeout,
+            ):
+                if event["type"] == "DELETED":
+                    return
+        except AsyncApiException as e:
+            if e.status == 404:
+                return
+            logging.error("Failed to delete pod %s", str(e))
+            raise e
+
+    async def get_pod_shell(
+        self, pod_name: str, namespace: str, container: str = None
+    ) -> Optional[str]:
+        """
+        Gets the shell running on a Pod. Currently checking against
+        /bin/bash and /bin/sh.
+
+        :param pod_name: pod where the command must be executed
+        :param namespace: namespace of the pod
+        :param container: container where the command
+            must be executed (optional default `None`)
+        """
+        for shell in ["bash", "sh"]:
+            try:
+                ret = await self.__exec_cmd_in_pod_unsafe(
+                    [f'test -f /bin/{shell} && echo "True"'],
+                    pod_name,
+                    namespace,
+                    container,
+                    base_command="sh",
+                    prefix=["-c"],
+                )
+                if ret != "":
+                    return shell
+            except Exception:
+                pass
+        return None
+
+    async def exec_cmd_in_pod(
+        self,
+        command: list[str],
+        pod_name: str,
+        namespace: str,
+        container: str = None,
+        base_command: str = None,
+    ) -> str:
+        """
+        Executes a base command and its parameters
+        in a pod or a container
+
+        :param command: command parameters list or full command string
+            if the command must be piped to `bash -c`
+            (in that case `base_command` parameter
+            must is omitted`)
+        :param pod_name: pod where the command must be executed
+        :param namespace: namespace of the pod
+        :param container: container where the command
+            must be executed (optional default `None`)
+        :param base_command: base command that must be executed
+            along the parameters (optional, default `bash -c` is tested and if
+            not present will fallback on `sh -c` )
+        :return: the command stdout and stderr
+        """
+        if base_command is not None:
+            return await self.__exec_cmd_in_pod_unsafe(
+                command, pod_name, namespace, container, base_command
+            )
+        shell = await self.get_pod_shell(pod_name, namespace, container)
+        if not shell:
+            raise Exception("impossible to determine the shell to run command")
+        return await self.__exec_cmd_in_pod_unsafe(
+            command, pod_name, namespace, container, shell, prefix=["-c"]
+        )
+
+    async def __exec_cmd_in_pod_unsafe(
+        self,
+        command: list[str],
+        pod_name: str,
+        namespace: str,
+        container: str = None,
+        base_command: str = None,
+        prefix: list[str] = None,
+    ) -> str:
+        if not isinstance(command, list):
+            command = [command]
+        exec_command = [base_command]
+        if prefix:
+            exec_command.extend(prefix)
+        exec_command.extend(command)
+
+        keyword_args = {
+            "command": exec_command,
+            "stderr": True,
+            "stdin": False,
+            "stdout": True,
+            "tty": False,
+        }
+        if container:
+            keyword_args["container"] = container
+        ret = await self.ws_cli.connect_get_namespaced_pod_exec(
+            pod_name, namespace, **keyword_args
+        )
+        if "OCI runtime exec failed" in ret:
+            raise Exception(ret)
+        return ret
+
+    async def gather(self, *coroutines, limit: int = None) -> list[any]:
+        """
+        Runs a set of coroutines concurrently, optionally bounding
+        the number of coroutines running at the same time
+
+        :param coroutines: the coroutines to run
+        :param limit: maximum number of coroutines running at the same
+            time, if None all the coroutines run together
+        :return: the list of the results in the same order of the
+            coroutines
+        """
+        if limit is None:
+            return await asyncio.gather(*coroutines)
+        semaphore = asyncio.Semaphore(limit)
+
+        async def bounded(coroutine):
+            async with semaphore:
+                return await coroutine
+
+        return await asyncio.gather(*[bounded(c) for c in coroutines])
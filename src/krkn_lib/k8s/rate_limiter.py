@@ -0,0 +1,146 @@
+import heapq
+import itertools
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from krkn_lib.models.k8s import RateLimiterMetrics, RequestPriority
+
+_request_priority = threading.local()
+
+
+def get_request_priority() -> Optional[RequestPriority]:
+    """
+    Returns the priority set for the requests of the current thread
+
+    :return: the RequestPriority set with `request_priority` or None
+        if no priority has been set in the current thread
+    """
+    return getattr(_request_priority, "value", None)
+
+
+@contextmanager
+def request_priority(priority: RequestPriority) -> Iterator[None]:
+    """
+    Context manager that sets the rate limiter priority of all the
+    requests made by the current thread within the context. The
+    priority is thread local, requests made by threads spawned
+    inside the context are not affected.
+
+    >>> with request_priority(RequestPriority.high):
+    >>>     lib_k8s.is_pod_running("pod", "namespace")
+
+    :param priority: the priority of the requests
+    """
+    previous = get_request_priority()
+    _request_priority.value = priority
+    try:
+        yield
+    finally:
+        _request_priority.value = previous
+
+
+class PriorityRateLimiter:
+    """
+    Thread safe token bucket rate limiter (same semantic of the
+    client-go one) with priority lanes. The bucket is refilled
+    at `qps` tokens per second up to `burst` tokens, every request
+    consumes a token. When the tokens are exhausted the requests
+    are queued and served in priority order (FIFO within the same
+    priority), so high priority requests are never starved by a
+    flood of low priority ones.
+    """
+
+    qps: float
+    burst: int
+
+    def __init__(self, qps: float, burst: int = None):
+        """
+        :param qps: number of tokens added to the bucket every second
+        :param burst: size of the bucket, maximum number of requests
+            that can be sent at once (optional, default qps rounded up)
+        """
+        if qps <= 0:
+            raise Exception("qps must be greater than 0")
+        if burst is None:
+            burst = max(1, math.ceil(qps))
+        if burst < 1:
+            raise Exception("burst must be greater than 0")
+        self.qps = qps
+        self.burst = burst
+        self.__tokens = float(burst)
+        self.__last_refill = time.monotonic()
+        self.__condition = threading.Condition()
+        self.__queue: list[tuple[int, int]] = []
+        self.__sequence = itertools.count()
+        self.__metrics = {
+            priority: RateLimiterMetrics(priority)
+            for priority in RequestPriority
+        }
+
+    def __refill(self):
+        now = time.monotonic()
+        self.__tokens = min(
+            self.burst, self.__tokens + (now - self.__last_refill) * self.qps
+        )
+        self.__last_refill = now
+
+    def acquire(self, priority: RequestPriority = None) -> float:
+        """
+        Blocks until a token is available for the request
+
+        :param priority: the priority of the request (optional, default
+            the priority set in the current thread by `request_priority`
+            or `RequestPriority.normal`)
+        :return: the time in seconds spent waiting for the token
+        """
+        if priority is None:
+            priority = get_request_priority()
+        if priority is None:
+            priority = RequestPriority.normal
+        start_time = time.monotonic()
+        ticket = (priority.value, next(self.__sequence))
+        with self.__condition:
+            metrics = self.__metrics[priority]
+            metrics.waiting += 1
+            heapq.heappush(self.__queue, ticket)
+            while True:
+                self.__refill()
+                if self.__queue[0] == ticket and self.__tokens >= 1:
+                    heapq.heappop(self.__queue)
+                    self.__tokens -= 1
+                    break
+                if self.__queue[0] == ticket:
+                    timeout = (1 - self.__tokens) / self.qps
+                else:
+                    timeout = None
+                self.__condition.wait(timeout)
+            wait_time = time.monotonic() - start_time
+            metrics.waiting -= 1
+            metrics.requests += 1
+            metrics.total_wait_time += wait_time
+            metrics.max_wait_time = max(metrics.max_wait_time, wait_time)
+            # wakes up the next request in the queue
+            self.__condition.notify_all()
+        return wait_time
+
+    def get_metrics(self) -> dict[RequestPriority, RateLimiterMetrics]:
+        """
+        Returns a snapshot of the queue wait time metrics of
+        each priority lane
+
+        :return: a dictionary of RateLimiterMetrics by RequestPriority
+        """
+        with self.__condition:
+            return {
+                priority: RateLimiterMetrics(
+                    priority,
+                    requests=metrics.requests,
+                    waiting=metrics.waiting,
+                    total_wait_time=metrics.total_wait_time,
+                    max_wait_time=metrics.max_wait_time,
+                )
+                for priority, metrics in self.__metrics.items()
+            }
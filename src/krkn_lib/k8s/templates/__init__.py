@@ -0,0 +1,2 @@
+from .manifests import *  # NOQA
+from .template_registry import *  # NOQA
@@ -0,0 +1,269 @@
+import yaml
+
+
+def build_node_exec_pod_manifest(
+    podname: str, nodename: str, **_
+) -> dict[str, any]:
+    """
+    Builds the manifest described by `node_exec_pod.j2`
+    without rendering and parsing the template
+
+    :param podname: the name of the pod
+    :param nodename: the node where the pod will be scheduled
+    :return: the pod manifest
+    """
+    return {
+        "apiVersion": "v1",
+        "kind": "Pod",
+        "metadata": {"name": podname},
+        "spec": {
+            "hostNetwork": True,
+            "nodeName": nodename,
+            "containers": [
+                {
+                    "name": "fedtools",
+                    "image": "docker.io/fedora/tools",
+                    "command": ["/bin/sh", "-c", "sleep infinity\n"],
+                    "securityContext": {"privileged": True},
+                    "volumeMounts": [
+                        {
+                            "mountPath": "/run/dbus/system_bus_socket",
+                            "name": "dbus",
+                            "readOnly": True,
+                        }
+                    ],
+                }
+            ],
+            "volumes": [
+                {
+                    "name": "dbus",
+                    "hostPath": {"path": "/run/dbus/system_bus_socket"},
+                }
+            ],
+        },
+    }
+
+
+def build_hog_pod_manifest(
+    name: str,
+    namespace: str,
+    hog_type: str,
+    hog_type_io: str,
+    has_selector: bool,
+    node_selector_key: str,
+    node_selector_value: str,
+    image: str,
+    duration: int,
+    cpu_load_percentage: int,
+    cpu_method: str,
+    io_block_size: str,
+    io_write_bytes: str,
+    io_target_pod_volume: dict[str, any],
+    memory_vm_bytes: str,
+    workers: int,
+    target_pod_folder: str,
+    labels: dict[str, str] = None,
+    **_,
+) -> dict[str, any]:
+    """
+    Builds the manifest described by `hog_pod.j2`
+    without rendering and parsing the template,
+    the parameters are the same of the template
+
+    :return: the pod manifest
+    """
+    metadata = {"name": name, "namespace": namespace}
+    if labels:
+        metadata["labels"] = {k: str(v) for k, v in labels.items()}
+
+    container = {
+        "name": "krkn-hog",
+        "image": image,
+        "securityContext": {"privileged": True},
+        "env": [
+            {"name": "HOG_TYPE", "value": f"{hog_type}"},
+            {"name": "LOAD_PERCENTAGE", "value": f"{cpu_load_percentage}"},
+            {"name": "CPU_METHOD", "value": f"{cpu_method}"},
+            {"name": "HDD_WRITE_SIZE", "value": f"{io_block_size}"},
+            {"name": "HDD_BYTES", "value": f"{io_write_bytes}"},
+            {"name": "STRESS_PATH", "value": f"{target_pod_folder}"},
+            {"name": "VM_BYTES", "value": f"{memory_vm_bytes}"},
+            {"name": "WORKERS", "value": f"{workers}"},
+            {"name": "DURATION", "value": f"{duration}"},
+        ],
+    }
+
+    spec = {}
+    if has_selector:
+        spec["nodeSelector"] = {node_selector_key: node_selector_value}
+    if hog_type == hog_type_io:
+        spec["volumes"] = [io_target_pod_volume]
+        container["volumeMounts"] = [
+            {"name": "node-volume", "mountPath": target_pod_folder}
+        ]
+    spec["restartPolicy"] = "Never"
+    spec["imagePullPolicy"] = "IfNotPresent"
+    spec["containers"] = [container]
+
+    return {
+        "apiVersion": "v1",
+        "kind": "Pod",
+        "metadata": metadata,
+        "spec": spec,
+    }
+
+
+def build_syn_flood_pod_manifest(
+    name: str,
+    namespace: str,
+    has_node_selectors: bool,
+    node_selectors: dict[str, list[str]],
+    image: str,
+    target: str,
+    duration: int,
+    target_port: int,
+    packet_size: int,
+    window_size: int,
+    labels: dict[str, str] = None,
+    **_,
+) -> dict[str, any]:
+    """
+    Builds the manifest described by `syn_flood_pod.j2`
+    without rendering and parsing the template,
+    the parameters are the same of the template
+
+    :return: the pod manifest
+    """
+    metadata = {"name": name, "namespace": namespace}
+    if labels:
+        metadata["labels"] = {k: str(v) for k, v in labels.items()}
+
+    spec = {}
+    if has_node_selectors:
+        spec["affinity"] = {
+            "nodeAffinity": {
+                "requiredDuringSchedulingIgnoredDuringExecution": {
+                    "nodeSelectorTerms": [
+                        {
+                            "matchExpressions": [
+                                {
+                                    "key": key,
+                                    "operator": "In",
+                                    "values": list(values),
+                                }
+                            ]
+                        }
+                        for key, values in node_selectors.items()
+                    ]
+                }
+            }
+        }
+    spec["hostNetwork"] = True
+    spec["dnsPolicy"] = "ClusterFirstWithHostNet"
+    spec["restartPolicy"] = "Never"
+    spec["imagePullPolicy"] = "IfNotPresent"
+    spec["containers"] = [
+        {
+            "name": "syn-flood",
+            "image": image,
+            "securityContext": {"privileged": True},
+            "env": [
+                {"name": "TARGET", "value": target},
+                {"name": "DURATION", "value": f"{duration}"},
+                {"name": "TARGET_PORT", "value": f"{target_port}"},
+                {"name": "PACKET_SIZE", "value": f"{packet_size}"},
+                {"name": "WINDOW_SIZE", "value": f"{window_size}"},
+            ],
+        }
+    ]
+
+    return {
+        "apiVersion": "v1",
+        "kind": "Pod",
+        "metadata": metadata,
+        "spec": spec,
+    }
+
+
+def build_service_hijacking_config_map_manifest(
+    name: str, namespace: str, plan: dict[str, any], **_
+) -> dict[str, any]:
+    """
+    Builds the manifest described by `service_hijacking_config_map.j2`
+    without rendering and parsing the template
+
+    :param name: the name of the ConfigMap
+    :param namespace: the namespace of the ConfigMap
+    :param plan: the service hijacking test plan
+    :return: the ConfigMap manifest
+    """
+    return {
+        "apiVersion": "v1",
+        "kind": "ConfigMap",
+        "metadata": {"name": name, "namespace": namespace},
+        "data": {"plan.yaml": yaml.dump(plan).rstrip("\n")},
+    }
+
+
+def build_service_hijacking_pod_manifest(
+    name: str,
+    namespace: str,
+    selector_key: str,
+    selector_value: str,
+    image: str,
+    port_name: str,
+    config_map_name: str,
+    port_number: int,
+    stats_route: str,
+    **_,
+) -> dict[str, any]:
+    """
+    Builds the manifest described by `service_hijacking_pod.j2`
+    without rendering and parsing the template,
+    the parameters are the same of the template
+
+    :return: the pod manifest
+    """
+    return {
+        "apiVersion": "v1",
+        "kind": "Pod",
+        "metadata": {
+            "name": name,
+            "namespace": namespace,
+            "labels": {selector_key: selector_value},
+        },
+        "spec": {
+            "containers": [
+                {
+                    "name": "service-hijacking",
+                    "image": image,
+                    "env": [
+                        {
+                            "name": "TEST_PLAN_PATH",
+                            "value": "/service-hijacking/plan.yaml",
+                        },
+                        {"name": "STATS_ROUTE", "value": stats_route},
+                        {"name": "FLASK_RUN_PORT", "value": f"{port_number}"},
+                    ],
+                    "ports": [
+                        {"name": port_name, "containerPort": port_number}
+                    ],
+                    "volumeMounts": [
+                        {
+                            "name": "config-volume",
+                            "mountPath": "/service-hijacking",
+                        }
+                    ],
+                }
+            ],
+            "volumes": [
+                {
+                    "name": "config-volume",
+                    "configMap": {
+                        "name": config_map_name,
+                        "items": [{"key": "plan.yaml", "path": "plan.yaml"}],
+                    },
+                }
+            ],
+        },
+    }
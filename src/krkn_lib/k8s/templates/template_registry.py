@@ -0,0 +1,132 @@
+from typing import Callable
+
+import yaml
+from jinja2 import Environment, PackageLoader, Template
+
+from krkn_lib.k8s.templates.manifests import (
+    build_hog_pod_manifest,
+    build_node_exec_pod_manifest,
+    build_service_hijacking_config_map_manifest,
+    build_service_hijacking_pod_manifest,
+    build_syn_flood_pod_manifest,
+)
+
+
+def to_yaml(value: any) -> str:
+    """
+    Jinja2 filter that serializes an object in yaml format
+
+    :param value: the object to be serialized
+    :return: the yaml string
+    """
+    return yaml.dump(value, default_flow_style=False, indent=2)
+
+
+class TemplateRegistry:
+    """
+    Registry of the pod manifest templates shipped with krkn_lib.
+    Every template is compiled only once when the registry is
+    instantiated and the compiled template is reused by every
+    render. Templates can optionally be associated to a builder
+    function that creates the manifest dictionary directly, skipping
+    both the rendering and the yaml parsing of the rendered text.
+    """
+
+    def __init__(
+        self,
+        package_name: str = "krkn_lib.k8s",
+        package_path: str = "templates",
+    ):
+        """
+        Compiles all the templates available in the package
+
+        :param package_name: the python package containing the templates
+        :param package_path: the folder of the templates in the package
+        """
+        self.__environment = Environment(
+            loader=PackageLoader(package_name, package_path),
+            autoescape=True,
+            auto_reload=False,
+        )
+        self.__environment.filters["to_yaml"] = to_yaml
+        self.__templates: dict[str, Template] = {}
+        self.__builders: dict[str, Callable[..., dict[str, any]]] = {}
+        for template_name in self.__environment.list_templates(
+            extensions=["j2"]
+        ):
+            self.__templates[template_name] = self.__environment.get_template(
+                template_name
+            )
+
+    def get_template(self, template_name: str) -> Template:
+        """
+        Returns a compiled template
+
+        :param template_name: the template file name (eg. hog_pod.j2)
+        :return: the compiled template
+        """
+        if template_name not in self.__templates:
+            raise Exception(f"template {template_name} not found")
+        return self.__templates[template_name]
+
+    def register_builder(
+        self,
+        template_name: str,
+        builder: Callable[..., dict[str, any]],
+    ):
+        """
+        Associates a builder function to a template. The builder must
+        accept the same keyword arguments of the template and return
+        the same dictionary returned by parsing the rendered template.
+
+        :param template_name: the template file name
+        :param builder: the builder function
+        """
+        self.get_template(template_name)
+        self.__builders[template_name] = builder
+
+    def render(self, template_name: str, **params) -> str:
+        """
+        Renders a compiled template
+
+        :param template_name: the template file name
+        :param params: the template parameters
+        :return: the rendered text
+        """
+        return self.get_template(template_name).render(**params)
+
+    def render_manifest(
+        self, template_name: str, direct: bool = False, **params
+    ) -> dict[str, any]:
+        """
+        Returns the manifest dictionary of a template
+
+        :param template_name: the template file name
+        :param direct: if True and a builder has been registered
+            for the template the manifest is created directly by the
+            builder, otherwise the template is rendered and parsed.
+            Values are not html-escaped when the manifest is built
+            directly (optional, default False)
+        :param params: the template parameters
+        :return: the manifest dictionary
+        """
+        if direct and template_name in self.__builders:
+            return self.__builders[template_name](**params)
+        return yaml.safe_load(self.render(template_name, **params))
+
+
+template_registry = TemplateRegistry()
+template_registry.register_builder(
+    "node_exec_pod.j2", build_node_exec_pod_manifest
+)
+template_registry.register_builder("hog_pod.j2", build_hog_pod_manifest)
+template_registry.register_builder(
+    "syn_flood_pod.j2", build_syn_flood_pod_manifest
+)
+template_registry.register_builder(
+    "service_hijacking_config_map.j2",
+    build_service_hijacking_config_map_manifest,
+)
+template_registry.register_builder(
+    "service_hijacking_pod.j2", build_service_hijacking_pod_manifest
+)
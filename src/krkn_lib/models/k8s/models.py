@@ -1,6 +1,10 @@
+import json
+import os
+import threading
 from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass
-from typing import Optional
+from enum import Enum
+from typing import Callable, Optional
 
 
 @dataclass(frozen=True, order=False)
@@ -388,6 +392,377 @@ class ServiceHijacking:
         self.config_map_name = config_map_name
 
 
+class PodsGroup:
+    """
+    Handle returned by the batch deployment methods
+    (eg. deploy_hog_batch, deploy_syn_flood_batch) that holds
+    the pods deployed as a single group and can tear the whole
+    group down in parallel
+    """
+
+    namespace: str
+    """
+    Namespace where the pods have been deployed
+    """
+    label_selector: str
+    """
+    Label selector shared by all the pods of the group
+    """
+    pod_names: list[str]
+    """
+    Names of all the pods that have been created
+    """
+    ready_pods: list[str]
+    """
+    Names of the pods that reached the Running phase
+    or completed successfully
+    """
+    failed_pods: list[str]
+    """
+    Names of the pods that failed to be created or that didn't
+    reach the Running (or Succeeded) phase within the timeout
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        label_selector: str,
+        delete_pod: Callable[[str, str], None],
+        max_workers: int = 10,
+    ):
+        self.namespace = namespace
+        self.label_selector = label_selector
+        self.pod_names = []
+        self.ready_pods = []
+        self.failed_pods = []
+        self._delete_pod = delete_pod
+        self._max_workers = max_workers
+
+    def is_ready(self) -> bool:
+        """
+        Checks if all the pods of the group are running
+
+        :return: True if all the pods reached the Running phase
+        """
+        return len(self.pod_names) > 0 and len(self.failed_pods) == 0
+
+    def undeploy(self) -> list[str]:
+        """
+        Deletes all the pods of the group in parallel
+
+        :return: the list of the pod names that failed to be deleted
+        """
+        not_deleted = []
+        if len(self.pod_names) == 0:
+            return not_deleted
+        with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+            futures = {
+                executor.submit(self._delete_pod, pod_name, self.namespace): (
+                    pod_name
+                )
+                for pod_name in self.pod_names
+            }
+            for future, pod_name in futures.items():
+                try:
+                    future.result()
+                except Exception:
+                    not_deleted.append(pod_name)
+        return not_deleted
+
+
+class HostConnectionPoolMetrics:
+    """
+    Usage metrics of the HTTP connection pool opened
+    towards a single host
+    """
+
+    host: str
+    """
+    Scheme, host and port of the pool (eg. https://api.cluster:6443)
+    """
+    maxsize: int
+    """
+    Maximum number of connections kept open towards the host
+    """
+    in_use: int
+    """
+    Connections currently checked out by a request
+    """
+    idle: int
+    """
+    Open connections waiting in the pool to be reused
+    """
+    num_connections: int
+    """
+    Total number of connections opened since the pool creation,
+    if it grows with num_requests the pool is too small and the
+    connections are not reused
+    """
+    num_requests: int
+    """
+    Total number of requests sent through the pool
+    """
+
+    def __init__(
+        self,
+        host: str,
+        maxsize: int,
+        in_use: int,
+        idle: int,
+        num_connections: int,
+        num_requests: int,
+    ):
+        self.host = host
+        self.maxsize = maxsize
+        self.in_use = in_use
+        self.idle = idle
+        self.num_connections = num_connections
+        self.num_requests = num_requests
+
+
+class ConnectionPoolMetrics:
+    """
+    Usage metrics of the HTTP connection pools used by the
+    Kubernetes ApiClient
+    """
+
+    num_pools: int
+    """
+    Maximum number of per-host pools cached by the pool manager
+    """
+    maxsize: int
+    """
+    Maximum number of connections kept open towards each host
+    """
+    block: bool
+    """
+    If True the requests wait for a free connection when the pool
+    is exhausted instead of opening a new, not reusable, one
+    """
+    pools: list[HostConnectionPoolMetrics]
+    """
+    Metrics of every host pool currently open
+    """
+
+    def __init__(
+        self,
+        num_pools: int,
+        maxsize: int,
+        block: bool,
+        pools: list[HostConnectionPoolMetrics] = None,
+    ):
+        self.num_pools = num_pools
+        self.maxsize = maxsize
+        self.block = block
+        self.pools = pools if pools is not None else []
+
+
+class RequestPriority(int, Enum):
+    """
+    Priority lanes of the client-side rate limiter, when the
+    tokens are exhausted the waiting requests are served
+    from the highest priority (lowest value) lane first
+    """
+
+    high = 0
+    """
+    Recovery timing reads (pod and node monitoring)
+    """
+    normal = 1
+    """
+    Default priority of every request
+    """
+    low = 2
+    """
+    Bulk paginated listing
+    """
+
+
+class RateLimiterMetrics:
+    """
+    Metrics of a priority lane of the client-side rate limiter
+    """
+
+    priority: RequestPriority
+    """
+    The priority lane
+    """
+    requests: int
+    """
+    Number of requests that acquired a token
+    """
+    waiting: int
+    """
+    Number of requests currently waiting for a token
+    """
+    total_wait_time: float
+    """
+    Total time in seconds spent by the requests waiting for a token
+    """
+    max_wait_time: float
+    """
+    Longest time in seconds a request waited for a token
+    """
+
+    def __init__(
+        self,
+        priority: RequestPriority,
+        requests: int = 0,
+        waiting: int = 0,
+        total_wait_time: float = 0,
+        max_wait_time: float = 0,
+    ):
+        self.priority = priority
+        self.requests = requests
+        self.waiting = waiting
+        self.total_wait_time = total_wait_time
+        self.max_wait_time = max_wait_time
+
+    @property
+    def average_wait_time(self) -> float:
+        """
+        Average time in seconds a request waited for a token
+        """
+        if self.requests == 0:
+            return 0
+        return self.total_wait_time / self.requests
+
+
+class ArchiveCodec(str, Enum):
+    """
+    Compression codec of the archives downloaded from the pods
+    """
+
+    none = "none"
+    """
+    Plain tar archive
+    """
+    gzip = "gzip"
+    """
+    Archive compressed in the pod with gzip
+    """
+    zstd = "zstd"
+    """
+    Archive compressed in the pod with zstd
+    """
+    client = "client"
+    """
+    Archive downloaded as plain tar and compressed
+    with gzip on the client before the upload
+    """
+
+    @property
+    def extension(self) -> str:
+        """
+        Extension of the archive files downloaded from the pod
+        """
+        if self == ArchiveCodec.gzip:
+            return ".tar.gz"
+        if self == ArchiveCodec.zstd:
+            return ".tar.zst"
+        return ".tar"
+
+    @property
+    def compress_command(self) -> Optional[str]:
+        """
+        Command that compresses stdin to stdout in the pod, None
+        if the archive is not compressed in the pod
+        """
+        if self == ArchiveCodec.gzip:
+            return "gzip -c"
+        if self == ArchiveCodec.zstd:
+            return "zstd -q -c"
+        return None
+
+
+class DownloadManifest:
+    """
+    Persistent state of a multi-volume archive download, saved as a
+    json file after every change so that an interrupted download can be
+    resumed downloading only the volumes not completed yet
+    """
+
+    path: str
+    """
+    Local path of the manifest file
+    """
+    part_count: int
+    """
+    Total number of volumes of the archive
+    """
+    parts: dict[int, dict[str, any]]
+    """
+    State of each volume by volume number (remote file name,
+    local file name, size, sha256 checksum and status)
+    """
+
+    def __init__(self, path: str, part_count: int = 0):
+        self.path = path
+        self.part_count = part_count
+        self.parts = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def load(path: str) -> Optional["DownloadManifest"]:
+        """
+        Loads a manifest from file
+
+        :param path: local path of the manifest
+        :return: the DownloadManifest or None if the file doesn't exist
+        """
+        if not os.path.isfile(path):
+            return None
+        with open(path, "r") as manifest_file:
+            json_object = json.load(manifest_file)
+        manifest = DownloadManifest(path, json_object["part_count"])
+        manifest.parts = {
+            int(number): part for number, part in json_object["parts"].items()
+        }
+        return manifest
+
+    def save(self):
+        """
+        Atomically writes the manifest on file
+        """
+        with self._lock:
+            self.__save()
+
+    def __save(self):
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w") as manifest_file:
+            json.dump(
+                {"part_count": self.part_count, "parts": self.parts},
+                manifest_file,
+                indent=4,
+            )
+        os.replace(temp_path, self.path)
+
+    def set_part(self, part_number: int, **fields):
+        """
+        Updates the state of a volume and saves the manifest
+
+        :param part_number: the volume number
+        :param fields: the fields to update (eg. status="downloaded")
+        """
+        with self._lock:
+            part = self.parts.setdefault(part_number, {})
+            part.update(fields)
+            self.__save()
+
+    def pending_parts(self) -> list[int]:
+        """
+        Returns the volumes not downloaded yet
+
+        :return: the list of the volume numbers
+        """
+        with self._lock:
+            return [
+                number
+                for number in range(self.part_count)
+                if self.parts.get(number, {}).get("status") != "downloaded"
+            ]
+
+
 class NodeResources:
     memory: int
     cpu: int
@@ -213,3 +213,170 @@ class HogConfig:
                 config.memory_vm_bytes = yaml_dict["memory-vm-bytes"]
 
         return config
+
+
+@dataclass(order=False)
+class ConcurrencySample:
+    """
+    Snapshot of the state of an AdaptiveConcurrencyController
+    taken at the end of a sampling interval
+    """
+
+    timestamp: float
+    """
+    epoch time of the sample
+    """
+
+    concurrency: int
+    """
+    concurrency chosen by the controller for the next interval
+    """
+
+    in_flight: int
+    """
+    number of tasks running when the sample was taken
+    """
+
+    throughput: float
+    """
+    bytes (or tasks if no bytes are reported) completed per second
+    in the interval
+    """
+
+    completed: int
+    """
+    number of tasks completed in the interval
+    """
+
+    errors: int
+    """
+    number of tasks failed in the interval
+    """
+
+    @property
+    def error_rate(self) -> float:
+        total = self.completed + self.errors
+        return self.errors / total if total > 0 else 0.0
+
+
+@dataclass(order=False)
+class TransferStageProgress:
+    """
+    Snapshot of the progress of a stage of a transfer
+    (eg. archive, download, decode, upload)
+    """
+
+    stage: str
+    """
+    name of the stage
+    """
+
+    parts_total: Optional[int]
+    """
+    number of parts to be processed by the stage, None if unknown
+    """
+
+    parts_completed: int
+    """
+    number of parts processed
+    """
+
+    parts_failed: int
+    """
+    number of parts failed
+    """
+
+    bytes_total: Optional[int]
+    """
+    bytes to be processed by the stage, None if unknown
+    """
+
+    bytes_transferred: int
+    """
+    bytes processed
+    """
+
+    elapsed: float
+    """
+    seconds since the first part of the stage started, stopped
+    at the last part completed while no part is running
+    """
+
+    throughput: float
+    """
+    bytes processed per second
+    """
+
+    eta: Optional[float]
+    """
+    estimated seconds to the end of the stage, None if
+    the totals are unknown or nothing has been processed yet
+    """
+
+    thread_throughput: dict[str, float]
+    """
+    bytes per second processed by each thread, by thread name
+    """
+
+    part_latencies: dict[int, float]
+    """
+    seconds spent processing each completed part, by part number
+    """
+
+    @property
+    def average_part_latency(self) -> float:
+        if not self.part_latencies:
+            return 0.0
+        return sum(self.part_latencies.values()) / len(self.part_latencies)
+
+    @property
+    def max_part_latency(self) -> float:
+        return max(self.part_latencies.values(), default=0.0)
+
+
+@dataclass(order=False)
+class LogFilterFileStats:
+    """
+    Outcome of the time range filtering of a log file
+    """
+
+    source_file: str
+    """
+    full-path of the log file filtered
+    """
+
+    filtered_file: Optional[str] = None
+    """
+    full-path of the filtered file, None if no line matched
+    or the filtering failed
+    """
+
+    shards: int = 0
+    """
+    number of byte ranges in which the file has been split
+    """
+
+    lines_read: int = 0
+    """
+    number of lines read
+    """
+
+    lines_matched: int = 0
+    """
+    number of lines within the time range written in the filtered file
+    """
+
+    bytes_read: int = 0
+    """
+    number of bytes read
+    """
+
+    elapsed: float = 0.0
+    """
+    seconds spent filtering the file, summed over the shards
+    """
+
+    error: Optional[str] = None
+    """
+    the error occurred if the filtering failed
+    """
@@ -2,8 +2,9 @@ from __future__ import annotations
 
 import base64
 import json
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
+from typing import Optional
 
 import yaml
 
@@ -316,6 +317,7 @@ class ClusterEvent:
         k8s_json_dict: any = None,
         json_dict: any = None,
         k8s_obj: any = None,
+        k8s_events_obj: any = None,
     ):
         self.name = ""
         self.creation = datetime.now(timezone.utc).strftime(
@@ -344,6 +346,28 @@ class ClusterEvent:
             self.involved_object_namespace = k8s_obj.involved_object.namespace
             self.type = k8s_obj.type
 
+        if k8s_events_obj:
+            # This parses EventsV1Event
+            # (https://github.com/kubernetes-client/python/blob/master/kubernetes/docs/EventsV1Event.md)
+            self.name = k8s_events_obj.metadata.name
+            self.creation = str(k8s_events_obj.metadata.creation_timestamp)
+            self.reason = k8s_events_obj.reason
+            self.message = k8s_events_obj.note
+            self.namespace = k8s_events_obj.metadata.namespace
+            if k8s_events_obj.reporting_controller:
+                self.source_component = k8s_events_obj.reporting_controller
+            elif k8s_events_obj.deprecated_source:
+                self.source_component = (
+                    k8s_events_obj.deprecated_source.component
+                )
+            if k8s_events_obj.regarding:
+                self.involved_object_kind = k8s_events_obj.regarding.kind
+                self.involved_object_name = k8s_events_obj.regarding.name
+                self.involved_object_namespace = (
+                    k8s_events_obj.regarding.namespace
+                )
+            self.type = k8s_events_obj.type
+
         if k8s_json_dict:
             self.name = k8s_json_dict["metadata"]["name"]
             self.creation = str(k8s_json_dict["metadata"]["creationTimestamp"])
@@ -494,3 +518,98 @@ class S3BucketObject:
     if it's a file represents the date when the file
     has been created/modified
     """
+
+
+@dataclass(order=False)
+class S3MultipartUpload:
+    """
+    Class that represents an S3 multipart upload initiated
+    through the telemetry webservice
+    """
+
+    upload_id: str
+    """
+    the S3 upload id
+    """
+
+    bucket_folder: str
+    """
+    the folder on which the file will be stored
+    """
+
+    remote_filename: str
+    """
+    the name of the file in the bucket
+    """
+
+    part_size: int
+    """
+    the size in bytes of each part (except the last one)
+    """
+
+    part_urls: list[str]
+    """
+    the presigned urls where the parts will be uploaded,
+    the n-th url is for the part number n+1
+    """
+
+
+@dataclass(order=False)
+class FileUploadResult:
+    """
+    Outcome of the upload of a file on the S3 bucket
+    """
+
+    local_filename: str
+    """
+    the local file full-path
+    """
+
+    remote_filename: str
+    """
+    the name of the file in the bucket
+    """
+
+    uploaded: bool = False
+    """
+    True if the file has been uploaded
+    """
+
+    attempts: int = 0
+    """
+    number of upload attempts
+    """
+
+    size: int = 0
+    """
+    size in bytes of the file uploaded
+    """
+
+    error: Optional[str] = None
+    """
+    the last error occurred if the upload failed
+    """
+
+
+@dataclass(order=False)
+class UploadResult:
+    """
+    Aggregated outcome of the upload of a set of files
+    """
+
+    files: list[FileUploadResult] = field(default_factory=list)
+    """
+    the outcome of each file
+    """
+
+    @property
+    def uploaded_files(self) -> list[FileUploadResult]:
+        return [file for file in self.files if file.uploaded]
+
+    @property
+    def failed_files(self) -> list[FileUploadResult]:
+        return [file for file in self.files if not file.uploaded]
+
+    @property
+    def success(self) -> bool:
+        return len(self.failed_files) == 0
@@ -1,19 +1,30 @@
 import ast
 import logging
 import os
+import re
 import shutil
 import subprocess
 import tarfile
 import threading
 from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from queue import Queue
-from typing import Optional
+from typing import Iterator, Optional
 
 from tzlocal import get_localzone
 
 from krkn_lib.k8s import KrknKubernetes
-from krkn_lib.utils import SafeLogger, filter_log_file_worker
+from krkn_lib.models.krkn import LogFilterFileStats
+from krkn_lib.utils import (
+    AdaptiveConcurrencyController,
+    ParallelGzipWriter,
+    SafeLogger,
+    filter_log_file,
+    filter_log_file_worker,
+    filter_log_files,
+    filter_log_files_to_archive,
+)
 
 
 class KrknOpenshift(KrknKubernetes):
@@ -22,10 +33,28 @@ class KrknOpenshift(KrknKubernetes):
         kubeconfig_path: str = None,
         *,
         kubeconfig_string: str = None,
+        request_chunk_size: int = 250,
+        connection_pool_maxsize: int = None,
+        num_pools: int = None,
+        pool_block: bool = False,
+        connect_timeout: float = None,
+        read_timeout: float = None,
+        retries: int = None,
+        qps: float = None,
+        burst: int = None,
     ):
         super().__init__(
             kubeconfig_path=kubeconfig_path,
             kubeconfig_string=kubeconfig_string,
+            request_chunk_size=request_chunk_size,
+            connection_pool_maxsize=connection_pool_maxsize,
+            num_pools=num_pools,
+            pool_block=pool_block,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            retries=retries,
+            qps=qps,
+            burst=burst,
         )
 
     def get_clusterversion_string(self) -> str:
@@ -170,6 +199,230 @@ class KrknOpenshift(KrknKubernetes):
                 network_plugins.append("Unknown")
         return network_plugins
 
+    def __get_must_gather_data_folder(self, src_dir: str) -> (str, str):
+        """
+        Finds the folder containing the data collected by
+        `oc adm must-gather` and the timezone of the cluster
+
+        :param src_dir: the folder where must-gather has been run
+        :return: the data folder and the cluster timezone
+            (UTC if not found)
+        """
+        if "~" in src_dir:
+            src_dir = os.path.expanduser(src_dir)
+        download_folder = [f.path for f in os.scandir(src_dir) if f.is_dir()]
+        data_folder = [
+            f.path for f in os.scandir(download_folder[0]) if f.is_dir()
+        ]
+        return data_folder[0], self.__get_remote_timezone(data_folder[0])
+
+    def __get_remote_timezone(self, folder: str) -> str:
+        """
+        Reads the timezone of the cluster from the `timestamp` file
+        written by `oc adm must-gather` and `oc adm inspect`
+
+        :param folder: the folder containing the `timestamp` file
+        :return: the cluster timezone (UTC if not found)
+        """
+        # default remote timestamp will be utc
+        remote_timezone = "UTC"
+        if os.path.exists(os.path.join(folder, "timestamp")):
+            with open(
+                os.path.join(folder, "timestamp"), mode="r"
+            ) as timestamp_file:
+                line = timestamp_file.readline()
+                remote_timezone = line.split()[3]
+        return remote_timezone
+
+    def __inspect_namespace(
+        self,
+        oc: str,
+        kubeconfig_path: str,
+        namespace: str,
+        dest_dir: str,
+        safe_logger: SafeLogger,
+    ) -> str:
+        """
+        Collects the data of a namespace with `oc adm inspect` in its
+        own destination folder, without changing the working directory
+        of the process so it can run in parallel with other collections
+
+        :param oc: the path of the `oc` CLI
+        :param kubeconfig_path: path of the kubeconfig file
+        :param namespace: the namespace inspected
+        :param dest_dir: the folder where the data is written
+        :param safe_logger: thread safe logger
+        :return: the folder where the data has been written
+        """
+        result = subprocess.run(
+            [
+                oc,
+                "adm",
+                "inspect",
+                f"ns/{namespace}",
+                "--kubeconfig",
+                kubeconfig_path,
+                f"--dest-dir={dest_dir}",
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+        # oc adm inspect fails even if only part of the resources
+        # can't be collected, the data gathered is filtered anyway
+        if result.returncode != 0:
+            safe_logger.error(
+                f"oc adm inspect of namespace {namespace} exited with "
+                f"code {result.returncode}: {result.stderr.strip()}"
+            )
+        return dest_dir
+
+    def __iter_collected_namespaces(
+        self,
+        oc: str,
+        kubeconfig_path: str,
+        namespaces: list[str],
+        src_dir: str,
+        collection_threads: int,
+        safe_logger: SafeLogger,
+    ) -> Iterator[str]:
+        """
+        Runs `oc adm inspect` on `collection_threads` namespaces at
+        time, each one with `src_dir/<namespace>` as `--dest-dir`,
+        yielding the folder of each namespace as soon as it's collected
+
+        :return: the folders of the namespaces collected
+        """
+        with ThreadPoolExecutor(
+            max_workers=max(1, collection_threads)
+        ) as collectors:
+            collections = {
+                collectors.submit(
+                    self.__inspect_namespace,
+                    oc,
+                    kubeconfig_path,
+                    namespace,
+                    os.path.join(src_dir, namespace),
+                    safe_logger,
+                ): namespace
+                for namespace in namespaces
+            }
+            for collection in as_completed(collections):
+                namespace = collections[collection]
+                try:
+                    namespace_dir = collection.result()
+                except Exception as e:
+                    safe_logger.error(
+                        f"failed to collect data from openshift "
+                        f"with oc command: {str(e)}"
+                    )
+                    raise e
+                safe_logger.info(f"namespace {namespace} collected")
+                yield namespace_dir
+
+    def __collect_filter_namespaces(
+        self,
+        oc: str,
+        kubeconfig_path: str,
+        namespaces: list[str],
+        src_dir: str,
+        dst_dir: str,
+        start_timestamp: Optional[int],
+        end_timestamp: Optional[int],
+        log_filter_patterns: list[str],
+        threads: int,
+        collection_threads: int,
+        safe_logger: SafeLogger,
+    ) -> list[LogFilterFileStats]:
+        """
+        Collects the namespaces (see `__iter_collected_namespaces`)
+        and filters the log files of each namespace in `dst_dir` by
+        `threads` threads as soon as the namespace is collected,
+        overlapping the filtering with the collection of the
+        other namespaces.
+
+        :return: the LogFilterFileStats of the filtered files
+        """
+        local_timezone = f"{get_localzone()}"
+        patterns = list(map(re.compile, log_filter_patterns))
+        filters_futures = []
+        with ThreadPoolExecutor(max_workers=max(1, threads)) as filters:
+            for namespace_dir in self.__iter_collected_namespaces(
+                oc,
+                kubeconfig_path,
+                namespaces,
+                src_dir,
+                collection_threads,
+                safe_logger,
+            ):
+                remote_timezone = self.__get_remote_timezone(namespace_dir)
+                for file in Path(namespace_dir).rglob("*.log"):
+                    filters_futures.append(
+                        filters.submit(
+                            filter_log_file,
+                            file,
+                            src_dir,
+                            dst_dir,
+                            start_timestamp,
+                            end_timestamp,
+                            remote_timezone,
+                            local_timezone,
+                            patterns,
+                        )
+                    )
+        return [f.result() for f in filters_futures]
+
+    def __collect_filter_namespaces_to_archive(
+        self,
+        oc: str,
+        kubeconfig_path: str,
+        namespaces: list[str],
+        src_dir: str,
+        archive_name: str,
+        start_timestamp: Optional[int],
+        end_timestamp: Optional[int],
+        log_filter_patterns: list[str],
+        threads: int,
+        collection_threads: int,
+        safe_logger: SafeLogger,
+    ) -> list[LogFilterFileStats]:
+        """
+        Collects the namespaces (see `__iter_collected_namespaces`)
+        and streams the filtered log files of each namespace in
+        `archive_name` as soon as the namespace is collected (see
+        `filter_log_files_to_archive`), overlapping the filtering
+        with the collection of the other namespaces. The files of each
+        namespace are filtered with the timezone of its collection,
+        if no namespace is collected the archive is empty.
+
+        :return: the LogFilterFileStats of the filtered files
+        """
+
+        def log_files() -> Iterator[tuple[Path, str]]:
+            for namespace_dir in self.__iter_collected_namespaces(
+                oc,
+                kubeconfig_path,
+                namespaces,
+                src_dir,
+                collection_threads,
+                safe_logger,
+            ):
+                remote_timezone = self.__get_remote_timezone(namespace_dir)
+                for file in Path(namespace_dir).rglob("*.log"):
+                    yield file, remote_timezone
+
+        return filter_log_files_to_archive(
+            log_files(),
+            src_dir,
+            archive_name,
+            start_timestamp,
+            end_timestamp,
+            "UTC",
+            f"{get_localzone()}",
+            log_filter_patterns,
+            threads,
+        )
+
     def filter_must_gather_ocp_log_folder(
         self,
         src_dir: str,
@@ -179,7 +432,10 @@ class KrknOpenshift(KrknKubernetes):
         log_files_extension: str,
         threads: int,
         log_filter_patterns: list[str],
-    ):
+        concurrency_controller: AdaptiveConcurrencyController = None,
+        processes: int = None,
+        binary_search: bool = False,
+    ) -> Optional[list[LogFilterFileStats]]:
         """
         Filters a folder containing logs collected by the
         `oc adm must-gather` command
@@ -218,32 +474,52 @@ class KrknOpenshift(KrknKubernetes):
             parsed by dateutil.parser (it supports several formats by default but not every date format).
             Each pattern *must contain* only 1 group that represent the time string that must be extracted
             and parsed
+        :param concurrency_controller: if set, `max_concurrency` threads
+            are started instead of `threads` and the controller adapts the
+            number of files filtered in parallel to the throughput
+        :param processes: if set, the files are filtered by `processes`
+            worker processes instead of threads (see `filter_log_files`),
+            spreading the parsing on multiple cores and splitting
+            the biggest files
+        :param binary_search: if True the lines within the time range of
+            the files sorted by time are found with a binary search and
+            copied without parsing each line, the lines without a date
+            in the range are kept (see `filter_log_file_worker`)
+        :return: the LogFilterFileStats of each file if `processes`
+            is set, otherwise None
         """
 
-        if "~" in src_dir:
-            src_dir = os.path.expanduser(src_dir)
-        download_folder = [f.path for f in os.scandir(src_dir) if f.is_dir()]
-        data_folder = [
-            f.path for f in os.scandir(download_folder[0]) if f.is_dir()
-        ]
-        # default remote timestamp will be utc
-        remote_timezone = "UTC"
+        data_folder, remote_timezone = self.__get_must_gather_data_folder(
+            src_dir
+        )
         local_timezone = f"{get_localzone()}"
-
-        if os.path.exists(os.path.join(data_folder[0], "timestamp")):
-            with open(
-                os.path.join(data_folder[0], "timestamp"), mode="r"
-            ) as timestamp_file:
-                line = timestamp_file.readline()
-                remote_timezone = line.split()[3]
         if not os.path.exists(dst_dir):
             logging.error("Log destination dir do not exist")
             raise Exception("Log destination dir do not exist")
+        log_files = list(Path(data_folder).rglob(log_files_extension))
+        if processes:
+            try:
+                return filter_log_files(
+                    log_files,
+                    data_folder,
+                    dst_dir,
+                    start_timestamp,
+                    end_timestamp,
+                    remote_timezone,
+                    local_timezone,
+                    log_filter_patterns,
+                    processes=processes,
+                    binary_search=binary_search,
+                )
+            except Exception as e:
+                logging.error(f"failed to filter log folder: {str(e)}")
+                raise e
         queue = Queue()
-        log_files = list(Path(data_folder[0]).rglob(log_files_extension))
         for file in log_files:
             queue.put(file)
 
+        if concurrency_controller:
+            threads = concurrency_controller.max_concurrency
         try:
             for _ in range(threads):
                 worker = threading.Thread(
@@ -251,12 +527,14 @@ class KrknOpenshift(KrknKubernetes):
                     args=(
                         start_timestamp,
                         end_timestamp,
-                        data_folder[0],
+                        data_folder,
                         dst_dir,
                         remote_timezone,
                         local_timezone,
                         log_filter_patterns,
                         queue,
+                        concurrency_controller,
+                        binary_search,
                     ),
                 )
                 worker.daemon = True
@@ -278,6 +556,11 @@ class KrknOpenshift(KrknKubernetes):
         safe_logger: SafeLogger,
         namespace: str = None,
         oc_path: str = None,
+        processes: int = None,
+        stream_archive: bool = False,
+        namespaces: list[str] = None,
+        collection_threads: int = None,
+        native_collection: bool = False,
     ) -> str:
         """
         Collects, filters and finally creates a tar.gz archive containing
@@ -303,29 +586,50 @@ class KrknOpenshift(KrknKubernetes):
             namespace
         :param oc_path: the path of the `oc` CLI, if None will
             be searched in the PATH
+        :param processes: if set, the logs are filtered by `processes`
+            worker processes instead of `threads` threads
+        :param stream_archive: if True the filtered logs are written
+            directly in the archive by `threads` threads without
+            writing them in `dst_dir` (see `filter_log_files_to_archive`)
+        :param namespaces: if set the logs are collected with
+            `oc adm inspect` only for the provided namespaces (with
+            `namespace`), each one in its own `src_dir/<namespace>`
+            folder. The logs of each namespace are filtered by
+            `threads` threads as soon as it's collected
+        :param collection_threads: the number of namespaces
+            collected in parallel, if None `threads`
+        :param native_collection: if True `oc` is not used, only the
+            pod logs of `namespaces` (all the namespaces if not set)
+            within the time range are fetched through the pods/log API
+            and written in `dst_dir` (see
+            `KrknKubernetes.collect_pods_logs`), `collection_threads`
+            containers at time. `src_dir`, `log_filter_patterns`
+            and `stream_archive` are not used
 
         :return: the path of the archive containing the filtered logs
         """
 
         OC_COMMAND = "oc"
 
-        if oc_path is None and shutil.which(OC_COMMAND) is None:
-            safe_logger.error(
-                f"{OC_COMMAND} command not found in $PATH,"
-                f" skipping log collection"
-            )
-            return
-        oc = shutil.which(OC_COMMAND)
-        if oc_path is not None:
-            if not os.path.exists(oc_path):
+        oc = None
+        if not native_collection:
+            if oc_path is None and shutil.which(OC_COMMAND) is None:
                 safe_logger.error(
-                    f"provided oc command path: {oc_path} is not valid"
-                )
-                raise Exception(
-                    f"provided oc command path: {oc_path} is not valid"
+                    f"{OC_COMMAND} command not found in $PATH,"
+                    f" skipping log collection"
                 )
-            else:
-                oc = oc_path
+                return
+            oc = shutil.which(OC_COMMAND)
+            if oc_path is not None:
+                if not os.path.exists(oc_path):
+                    safe_logger.error(
+                        f"provided oc command path: {oc_path} is not valid"
+                    )
+                    raise Exception(
+                        f"provided oc command path: {oc_path} is not valid"
+                    )
+                else:
+                    oc = oc_path
 
         if "~" in kubeconfig_path:
             kubeconfig_path = os.path.expanduser(kubeconfig_path)
@@ -350,24 +654,78 @@ class KrknOpenshift(KrknKubernetes):
             safe_logger.error(f"provided workdir path: {dst_dir} is not valid")
             raise Exception(f"provided workdir path: {dst_dir} is not valid")
 
-        # COLLECT: run must-gather in workdir folder
-        cur_dir = os.getcwd()
-        os.chdir(src_dir)
-        safe_logger.info(f"collecting openshift logs in {src_dir}...")
-        try:
-            if namespace:
-                subprocess.Popen(
-                    [
+        if namespace:
+            namespaces = (namespaces or []) + [namespace]
+        archive_name = os.path.join(dst_dir, "logs.tar.gz")
+
+        if native_collection:
+            # COLLECT AND FILTER: only the lines within the time range
+            # fetched through the pods/log API in the filtered layout
+            if not namespaces:
+                namespaces = self.list_namespaces()
+            namespaces = list(dict.fromkeys(namespaces))
+            safe_logger.info(
+                f"collecting the pod logs of {len(namespaces)} "
+                f"namespaces in {dst_dir}..."
+            )
+            try:
+                self.collect_pods_logs(
+                    namespaces,
+                    dst_dir,
+                    start_timestamp,
+                    end_timestamp,
+                    collection_threads or threads,
+                )
+            except Exception as e:
+                safe_logger.error(f"failed to collect pod logs: {str(e)}")
+                raise e
+        elif namespaces:
+            # COLLECT AND FILTER: oc adm inspect run in parallel
+            # on each namespace, filtered as soon as it's collected
+            namespaces = list(dict.fromkeys(namespaces))
+            safe_logger.info(
+                f"collecting openshift logs of {len(namespaces)} "
+                f"namespaces in {src_dir}..."
+            )
+            if stream_archive:
+                try:
+                    safe_logger.info(
+                        f"filtering openshift logs in {archive_name}..."
+                    )
+                    self.__collect_filter_namespaces_to_archive(
                         oc,
-                        "adm",
-                        "inspect",
-                        f"ns/{namespace}",
-                        "--kubeconfig",
                         kubeconfig_path,
-                    ],
-                    stdout=subprocess.DEVNULL,
-                ).wait()
-            else:
+                        namespaces,
+                        src_dir,
+                        archive_name,
+                        start_timestamp,
+                        end_timestamp,
+                        log_filter_patterns,
+                        threads,
+                        collection_threads or threads,
+                        safe_logger,
+                    )
+                except Exception as e:
+                    safe_logger.error(f"failed to filter logs: {str(e)}")
+                    raise e
+                return archive_name
+            self.__collect_filter_namespaces(
+                oc,
+                kubeconfig_path,
+                namespaces,
+                src_dir,
+                dst_dir,
+                start_timestamp,
+                end_timestamp,
+                log_filter_patterns,
+                threads,
+                collection_threads or threads,
+                safe_logger,
+            )
+        else:
+            # COLLECT: run must-gather in workdir folder
+            safe_logger.info(f"collecting openshift logs in {src_dir}...")
+            try:
                 subprocess.Popen(
                     [
                         oc,
@@ -377,36 +735,65 @@ class KrknOpenshift(KrknKubernetes):
                         kubeconfig_path,
                     ],
                     stdout=subprocess.DEVNULL,
+                    cwd=src_dir,
                 ).wait()
-            os.chdir(cur_dir)
-        except Exception as e:
-            safe_logger.error(
-                f"failed to collect data from openshift "
-                f"with oc command: {str(e)}"
-            )
-            raise e
+            except Exception as e:
+                safe_logger.error(
+                    f"failed to collect data from openshift "
+                    f"with oc command: {str(e)}"
+                )
+                raise e
 
-        # FILTER: filtering logs in
-        try:
-            safe_logger.info(f"filtering openshift logs in {dst_dir}...")
-            self.filter_must_gather_ocp_log_folder(
-                src_dir,
-                dst_dir,
-                start_timestamp,
-                end_timestamp,
-                "*.log",
-                threads,
-                log_filter_patterns,
-            )
-        except Exception as e:
-            safe_logger.error(f"failed to filter logs: {str(e)}")
-            raise e
+        if stream_archive and not native_collection:
+            # FILTER AND ARCHIVE: filtered logs streamed in the archive
+            try:
+                safe_logger.info(
+                    f"filtering openshift logs in {archive_name}..."
+                )
+                data_folder, remote_timezone = (
+                    self.__get_must_gather_data_folder(src_dir)
+                )
+                filter_log_files_to_archive(
+                    list(Path(data_folder).rglob("*.log")),
+                    data_folder,
+                    archive_name,
+                    start_timestamp,
+                    end_timestamp,
+                    remote_timezone,
+                    f"{get_localzone()}",
+                    log_filter_patterns,
+                    threads,
+                )
+            except Exception as e:
+                safe_logger.error(f"failed to filter logs: {str(e)}")
+                raise e
+            return archive_name
+
+        if not namespaces and not native_collection:
+            # FILTER: filtering logs in
+            try:
+                safe_logger.info(f"filtering openshift logs in {dst_dir}...")
+                self.filter_must_gather_ocp_log_folder(
+                    src_dir,
+                    dst_dir,
+                    start_timestamp,
+                    end_timestamp,
+                    "*.log",
+                    threads,
+                    log_filter_patterns,
+                    processes=processes,
+                )
+            except Exception as e:
+                safe_logger.error(f"failed to filter logs: {str(e)}")
+                raise e
 
         # ARCHIVE: creating tar archive of filtered files
-        archive_name = os.path.join(dst_dir, "logs.tar.gz")
         try:
-            with tarfile.open(archive_name, "w:gz") as tar:
-                for file in os.listdir(dst_dir):
+            files = os.listdir(dst_dir)
+            with ParallelGzipWriter(archive_name) as writer, tarfile.open(
+                fileobj=writer, mode="w|"
+            ) as tar:
+                for file in files:
                     path = os.path.join(dst_dir, file)
                     tar.add(path, arcname=file)
         except Exception as e:
@@ -1,11 +1,14 @@
 import base64
+import math
 import os
 import tempfile
 import threading
 import time
 import warnings
-from queue import Queue
-from typing import Optional
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from queue import Empty, Queue
+from typing import Callable, Optional
 
 import requests
 import urllib3
@@ -13,8 +16,20 @@ import yaml
 
 import krkn_lib.utils as utils
 from krkn_lib.k8s import KrknKubernetes
-from krkn_lib.models.krkn import ChaosRunAlertSummary
-from krkn_lib.models.telemetry import ChaosRunTelemetry, ScenarioTelemetry
+from krkn_lib.models.krkn import ChaosRunAlertSummary, ConcurrencySample
+from krkn_lib.models.telemetry import (
+    ChaosRunTelemetry,
+    FileUploadResult,
+    S3MultipartUpload,
+    ScenarioTelemetry,
+    UploadResult,
+)
+from krkn_lib.utils import (
+    AdaptiveConcurrencyController,
+    FileSliceReader,
+    RetryScheduler,
+    TransferProgressTracker,
+)
 from krkn_lib.utils.safe_logger import SafeLogger
 
 
@@ -24,6 +39,12 @@ class KrknTelemetryKubernetes:
     __telemetry_request_id: str = ""
     safe_logger: SafeLogger = None
     default_telemetry_group = "default"
+    # set to False when the telemetry API does not expose
+    # the batch presigned url endpoint
+    __presigned_url_batch_supported: bool = True
+    # set to False when the telemetry API does not expose
+    # the multipart upload endpoints
+    __multipart_upload_supported: bool = True
 
     def __init__(
         self,
@@ -39,6 +60,7 @@ class KrknTelemetryKubernetes:
         )
         self.__kubecli = lib_kubernetes
         self.safe_logger = safe_logger
+        self.__http_sessions = threading.local()
         self.__telemetry_request_id = telemetry_request_id
         if not krkn_telemetry_config:
             self.__krkn_telemetry_config = {}
@@ -53,6 +75,35 @@ class KrknTelemetryKubernetes:
         """
         return self.__kubecli
 
+    def get_http_session(self) -> requests.Session:
+        """
+        Returns the HTTP session of the calling thread, created on the
+        first call. The session keeps the connections to the telemetry
+        API and to the S3 bucket alive, so the upload threads pay the
+        TLS handshake only once. `requests.Session` is not thread safe
+        so every thread gets its own.
+
+        :return: the requests.Session of the current thread
+        """
+        session = getattr(self.__http_sessions, "session", None)
+        if session is None:
+            session = requests.Session()
+            self.__http_sessions.session = session
+        return session
+
+    def get_upload_timeout(self) -> tuple[float, float]:
+        """
+        Returns the (connect, read) timeout of the uploads to S3, set by
+        the `upload_connect_timeout` and `upload_read_timeout` telemetry
+        options (default 5 and 60 seconds)
+
+        :return: the connect and read timeout in seconds
+        """
+        return (
+            self.__krkn_telemetry_config.get("upload_connect_timeout", 5),
+            self.__krkn_telemetry_config.get("upload_read_timeout", 60),
+        )
+
     def get_telemetry_config(self) -> dict[str, any]:
         """
         Returns the telemetry config section from config.yaml
@@ -147,7 +198,7 @@ class KrknTelemetryKubernetes:
                 "Accept": "text/plain",
             }
             json_data = chaos_telemetry.to_json()
-            request = requests.post(
+            request = self.get_http_session().post(
                 url=f"{url}/telemetry",
                 auth=(username, password),
                 data=json_data,
@@ -175,6 +226,8 @@ class KrknTelemetryKubernetes:
         prometheus_container_name: str,
         prometheus_namespace: str,
         remote_archive_path: str = "/prometheus",
+        on_part_downloaded: Callable[[int, str], None] = None,
+        progress: TransferProgressTracker = None,
     ) -> list[(int, str)]:
         """
         Downloads the prometheus metrics folder from a prometheus pod
@@ -191,6 +244,11 @@ class KrknTelemetryKubernetes:
             pod lives
         :param remote_archive_path: (Optional) the path where prometheus logs
             are stored, if not specified will default to `/prometheus`
+        :param on_part_downloaded: (Optional) callback invoked with the
+            archive number and the filename of each volume as soon as it
+            is downloaded
+        :param progress: (Optional) TransferProgressTracker updated with
+            the progress of the `archive` and `download` stages
         :return: the list of the archive number and filenames downloaded
         """
         file_list = list[(int, str)]()
@@ -203,6 +261,20 @@ class KrknTelemetryKubernetes:
         backup_threads = telemetry_config.get("backup_threads")
         archive_path = telemetry_config.get("archive_path")
         archive_size = telemetry_config.get("archive_size")
+        # archive volumes are downloaded base64 encoded unless
+        # the raw bytes download is explicitly requested
+        binary_download = telemetry_config.get(
+            "prometheus_binary_download", False
+        )
+        # streams the archive to the client without
+        # staging the volumes in the pod
+        stream_download = telemetry_config.get(
+            "prometheus_stream_download", False
+        )
+        compression = telemetry_config.get("prometheus_compression", "none")
+        adaptive_concurrency = telemetry_config.get(
+            "adaptive_concurrency", False
+        )
         exceptions = []
         is_exception = False
         if prometheus_backup is None:
@@ -259,6 +331,29 @@ class KrknTelemetryKubernetes:
             target_path = "/prometheus/wal"
 
         try:
+            codec = self.__kubecli.get_archive_codec(
+                prometheus_pod_name,
+                prometheus_container_name,
+                prometheus_namespace,
+                compression,
+            )
+            self.safe_logger.info(
+                f"prometheus backup compression: {codec.value}"
+            )
+            if stream_download:
+                return self.__kubecli.stream_archive_from_pod(
+                    prometheus_pod_name,
+                    prometheus_container_name,
+                    prometheus_namespace,
+                    target_path,
+                    request_id,
+                    archive_path,
+                    archive_part_size=archive_size,
+                    max_threads=backup_threads,
+                    safe_logger=self.safe_logger,
+                    codec=codec,
+                    on_part_downloaded=on_part_downloaded,
+                )
             file_list = self.__kubecli.archive_and_get_path_from_pod(
                 prometheus_pod_name,
                 prometheus_container_name,
@@ -270,6 +365,17 @@ class KrknTelemetryKubernetes:
                 max_threads=backup_threads,
                 archive_part_size=archive_size,
                 safe_logger=self.safe_logger,
+                binary=binary_download,
+                codec=codec,
+                on_part_downloaded=on_part_downloaded,
+                concurrency_controller=(
+                    self.__get_concurrency_controller(
+                        backup_threads, "download"
+                    )
+                    if adaptive_concurrency
+                    else None
+                ),
+                progress=progress,
             )
             return file_list
         except Exception as e:
@@ -283,22 +389,96 @@ class KrknTelemetryKubernetes:
             self.safe_logger.error(exception_string)
             raise Exception(exception_string)
 
+    def __get_concurrency_controller(
+        self, max_threads: int, operation: str
+    ) -> AdaptiveConcurrencyController:
+        """
+        Builds an AdaptiveConcurrencyController logging
+        each sample collected
+        """
+
+        def log_sample(sample: ConcurrencySample):
+            self.safe_logger.info(
+                f"prometheus backup {operation}: concurrency "
+                f"{sample.concurrency}/{max_threads}, "
+                f"in flight {sample.in_flight}, "
+                f"throughput {sample.throughput / (1024 * 1024):.2f}MB/s, "
+                f"error rate {sample.error_rate:.2f}"
+            )
+
+        return AdaptiveConcurrencyController(
+            max_concurrency=max_threads, on_sample=log_sample
+        )
+
+    def __get_presigned_url_provider(
+        self,
+        api_url: str,
+        bucket_folder: str,
+        remote_filenames: list[str],
+        username: str,
+        password: str,
+        batch_size: int,
+    ) -> Callable[[str], Optional[str]]:
+        """
+        Creates a thread safe function that returns the upload url of a
+        remote filename. The urls are requested lazily with
+        `get_bucket_urls_for_filenames`: when a file without url is
+        requested, a batch made of the file and of the following
+        `batch_size - 1` files of `remote_filenames` is requested, so
+        that the urls are not left expiring while the other files are
+        uploaded. Each url is returned only once.
+        """
+        urls = dict[str, str]()
+        pending = list(remote_filenames)
+        lock = threading.Lock()
+
+        def get_presigned_url(remote_filename: str) -> Optional[str]:
+            with lock:
+                if batch_size > 0 and remote_filename in pending:
+                    pending.remove(remote_filename)
+                    batch = [remote_filename] + pending[: batch_size - 1]
+                    del pending[: batch_size - 1]
+                    urls.update(
+                        self.get_bucket_urls_for_filenames(
+                            api_url,
+                            bucket_folder,
+                            batch,
+                            username,
+                            password,
+                            batch_size,
+                        )
+                    )
+                return urls.pop(remote_filename, None)
+
+        return get_presigned_url
+
     def put_prometheus_data(
         self,
         telemetry_config: dict,
         archive_volumes: list[(int, str)],
         request_id: str,
-    ):
+        progress: TransferProgressTracker = None,
+    ) -> UploadResult:
         """
         Puts a list of files on telemetry S3 bucket, multithreading.
+        The failed uploads are retried up to `max_retries` times after
+        an exponential backoff delay.
 
         :param telemetry_config: telemetry section of kraken config.yaml
         :param archive_volumes: a list of tuples containing the
-            archive number, and the archive full path to be uploaded
+            archive number, and the archive full path to be uploaded.
+            base64 encoded volumes (`.b64` extension) are decoded
+            before the upload. If `prometheus_compression` is set to
+            `client` or `auto` the uncompressed `.tar` volumes are
+            compressed with gzip before the upload
         :param request_id: uuid of the session that will represent the
             S3 folder on which the prometheus files will be stored
+        :param progress: (Optional) TransferProgressTracker updated with
+            the progress of the `decode` and `upload` stages
+        :return: the UploadResult with the outcome of each volume
         """
         queue = Queue()
+        upload_result = UploadResult()
         prometheus_backup = telemetry_config.get("prometheus_backup")
         url = telemetry_config.get("api_url")
         username = telemetry_config.get("username")
@@ -306,6 +486,19 @@ class KrknTelemetryKubernetes:
         backup_threads = telemetry_config.get("backup_threads")
         max_retries = telemetry_config.get("max_retries")
         group = telemetry_config.get("telemetry_group")
+        compression = telemetry_config.get("prometheus_compression", "none")
+        presigned_url_batch_size = telemetry_config.get(
+            "presigned_url_batch_size", 50
+        )
+        # volumes bigger than the part size are uploaded in parts
+        multipart_part_size = telemetry_config.get(
+            "multipart_upload_part_size", 0
+        )
+        multipart_threads = telemetry_config.get("multipart_upload_threads", 4)
+        # backup_threads becomes the maximum number of threads
+        adaptive_concurrency = telemetry_config.get(
+            "adaptive_concurrency", False
+        )
         exceptions = []
         is_exception = False
         if prometheus_backup is None:
@@ -337,24 +530,58 @@ class KrknTelemetryKubernetes:
             raise Exception(", ".join(exceptions))
 
         if not prometheus_backup:
-            return
+            return upload_result
 
+        retry_scheduler = RetryScheduler(queue)
+        upload_results = dict[str, FileUploadResult]()
         try:
             total_size = 0
+            remote_filenames = list[str]()
             for item in archive_volumes:
-                decoded_filename = item[1].replace(".b64", "")
                 volume_number = item[0]
-                if item[1] == decoded_filename:
-                    raise Exception(
-                        "impossible to convert base64 file, "
-                        "source and destination file are the same"
+                with (
+                    progress.track_part("decode", volume_number)
+                    if progress
+                    else nullcontext()
+                ):
+                    filename = self.__prepare_prometheus_volume(
+                        item[1], compression
                     )
-                utils.decode_base64_file(item[1], decoded_filename)
-                queue.put((volume_number, decoded_filename, 0))
-                total_size += os.stat(decoded_filename).st_size / (1024 * 1024)
-                os.unlink(item[1])
+                    if progress:
+                        progress.add_bytes("decode", os.stat(filename).st_size)
+                queue.put((volume_number, filename, 0))
+                remote_filenames.append(
+                    f"prometheus-{volume_number:02d}"
+                    f"{utils.get_archive_extension(filename)}"
+                )
+                upload_results[filename] = FileUploadResult(
+                    filename, remote_filenames[-1]
+                )
+                upload_results[filename].size = os.stat(filename).st_size
+                total_size += upload_results[filename].size / (1024 * 1024)
+            # the upload urls are requested in batches as the queue
+            # drains, so that they don't expire before being used
+            get_presigned_url = self.__get_presigned_url_provider(
+                f"{url}/presigned-urls",
+                f"{group}/{request_id}",
+                remote_filenames,
+                username,
+                password,
+                presigned_url_batch_size,
+            )
             uploaded_files = list[str]()
             queue_size = queue.qsize()
+            if progress:
+                progress.set_totals(
+                    "upload",
+                    parts=queue_size,
+                    total_bytes=sum(r.size for r in upload_results.values()),
+                )
+            concurrency_controller = None
+            if adaptive_concurrency:
+                concurrency_controller = self.__get_concurrency_controller(
+                    backup_threads, "upload"
+                )
             for i in range(backup_threads):
                 worker = threading.Thread(
                     target=self.generate_url_and_put_to_s3_worker,
@@ -370,7 +597,15 @@ class KrknTelemetryKubernetes:
                         uploaded_files,
                         max_retries,
                         "prometheus-",
-                        ".tar",
+                        None,
+                        get_presigned_url,
+                        f"{url}/multipart-upload",
+                        multipart_part_size * 1024 * 1024,
+                        multipart_threads,
+                        concurrency_controller,
+                        retry_scheduler,
+                        upload_results,
+                        progress,
                     ),
                 )
                 worker.daemon = True
@@ -379,6 +614,326 @@ class KrknTelemetryKubernetes:
 
         except Exception as e:
             self.safe_logger.error(str(e))
+        finally:
+            retry_scheduler.stop()
+        upload_result.files = list(upload_results.values())
+        if not upload_result.success:
+            self.safe_logger.error(
+                f"failed to upload {len(upload_result.failed_files)}/"
+                f"{len(upload_result.files)} prometheus volumes"
+            )
+        return upload_result
+
+    def backup_prometheus_data(
+        self,
+        telemetry_config: dict,
+        request_id: str,
+        prometheus_pod_name: str,
+        prometheus_container_name: str,
+        prometheus_namespace: str,
+        remote_archive_path: str = "/prometheus",
+        progress: TransferProgressTracker = None,
+    ) -> UploadResult:
+        """
+        Downloads the prometheus metrics folder from a prometheus pod
+        and uploads it on the telemetry S3 bucket in a pipeline: each
+        archive volume is decoded (and compressed if needed) and
+        uploaded as soon as it is downloaded, while the other volumes
+        are still being downloaded. The stages are connected by
+        queues bounded to `prometheus_pipeline_queue_size` volumes
+        (default `backup_threads`) that block the download if the
+        upload falls behind, so only a few volumes are stored
+        on the local disk at the same time. The failed uploads are
+        re-enqueued by a RetryScheduler after an exponential backoff
+        delay, without keeping the upload threads busy, and the volumes
+        that fail to be uploaded after `max_retries` attempts are left
+        in the `archive_path` folder.
+
+        :param telemetry_config: krkn telemetry conf section
+        :param request_id: uuid of the session that will represent the
+            temporary archive files and the S3 folder on which the
+            prometheus files will be stored
+        :param prometheus_pod_name: the name of the prometheus pod from
+            which the data will be archived
+        :param prometheus_container_name: the name of the container in the
+            prometheus pod
+        :param prometheus_namespace: the namespace in which the prometheus
+            pod lives
+        :param remote_archive_path: (Optional) the path where prometheus logs
+            are stored, if not specified will default to `/prometheus`
+        :param progress: (Optional) TransferProgressTracker updated with
+            the progress of the `archive`, `download`, `decode` and
+            `upload` stages
+        :return: the UploadResult with the outcome of each volume
+        """
+        url = telemetry_config.get("api_url")
+        username = telemetry_config.get("username")
+        password = telemetry_config.get("password")
+        backup_threads = telemetry_config.get("backup_threads")
+        max_retries = telemetry_config.get("max_retries")
+        group = telemetry_config.get("telemetry_group")
+        compression = telemetry_config.get("prometheus_compression", "none")
+        multipart_part_size = telemetry_config.get(
+            "multipart_upload_part_size", 0
+        )
+        multipart_threads = telemetry_config.get("multipart_upload_threads", 4)
+        if max_retries is None:
+            raise Exception("telemetry -> max_retries is missing")
+        if not group:
+            group = self.default_telemetry_group
+        if not isinstance(backup_threads, int) or backup_threads < 1:
+            # validated and reported by get_prometheus_pod_data
+            backup_threads = 1
+        queue_size = telemetry_config.get(
+            "prometheus_pipeline_queue_size", backup_threads
+        )
+        decode_queue = Queue(maxsize=queue_size)
+        upload_queue = Queue(maxsize=queue_size)
+        retry_scheduler = RetryScheduler(upload_queue)
+        upload_results = dict[str, FileUploadResult]()
+        upload_result = UploadResult()
+
+        decode_workers = []
+        for i in range(backup_threads):
+            worker = threading.Thread(
+                target=self.__prepare_prometheus_volume_worker,
+                args=(
+                    decode_queue,
+                    upload_queue,
+                    compression,
+                    i,
+                    upload_results,
+                    progress,
+                ),
+            )
+            worker.daemon = True
+            worker.start()
+            decode_workers.append(worker)
+        upload_workers = []
+        for i in range(backup_threads):
+            worker = threading.Thread(
+                target=self.__upload_prometheus_volume_worker,
+                args=(
+                    upload_queue,
+                    request_id,
+                    group,
+                    f"{url}/presigned-url",
+                    username,
+                    password,
+                    i,
+                    max_retries,
+                    f"{url}/multipart-upload",
+                    multipart_part_size * 1024 * 1024,
+                    multipart_threads,
+                    retry_scheduler,
+                    upload_results,
+                    progress,
+                ),
+            )
+            worker.daemon = True
+            worker.start()
+            upload_workers.append(worker)
+
+        try:
+            self.get_prometheus_pod_data(
+                telemetry_config,
+                request_id,
+                prometheus_pod_name,
+                prometheus_container_name,
+                prometheus_namespace,
+                remote_archive_path,
+                on_part_downloaded=lambda number, filename: decode_queue.put(
+                    (number, filename)
+                ),
+                progress=progress,
+            )
+        finally:
+            # drains the pipeline stage by stage, the volumes
+            # downloaded before a failure are still uploaded
+            for _ in decode_workers:
+                decode_queue.put(None)
+            for worker in decode_workers:
+                worker.join()
+            # the retries are marked as done only once re-enqueued
+            upload_queue.join()
+            for _ in upload_workers:
+                upload_queue.put(None)
+            for worker in upload_workers:
+                worker.join()
+            retry_scheduler.stop()
+        upload_result.files = list(upload_results.values())
+        if not upload_result.success:
+            self.safe_logger.error(
+                f"failed to upload {len(upload_result.failed_files)}/"
+                f"{len(upload_result.files)} prometheus volumes"
+            )
+        return upload_result
+
+    def __prepare_prometheus_volume(
+        self, filename: str, compression: str
+    ) -> str:
+        """
+        Decodes a base64 encoded (`.b64`) archive volume and compresses
+        it with gzip if `compression` is `client` or `auto` and the
+        volume has not been compressed in the pod. The source file
+        is deleted.
+
+        :return: the filename of the volume ready to be uploaded
+        """
+        if filename.endswith(".b64"):
+            decoded_filename = filename.replace(".b64", "")
+            if filename == decoded_filename:
+                raise Exception(
+                    "impossible to convert base64 file, "
+                    "source and destination file are the same"
+                )
+            utils.decode_base64_file(filename, decoded_filename)
+            os.unlink(filename)
+            filename = decoded_filename
+        if compression in ["auto", "client"] and filename.endswith(".tar"):
+            # volumes not compressed in the pod
+            compressed_filename = f"{filename}.gz"
+            utils.gzip_file(filename, compressed_filename)
+            os.unlink(filename)
+            filename = compressed_filename
+        return filename
+
+    def __prepare_prometheus_volume_worker(
+        self,
+        decode_queue: Queue,
+        upload_queue: Queue,
+        compression: str,
+        thread_number: int,
+        upload_results: dict[str, FileUploadResult],
+        progress: TransferProgressTracker = None,
+    ):
+        """
+        Pipeline stage that prepares the downloaded volumes
+        for the upload until a None is dequeued. The volumes that
+        can't be prepared are added to `upload_results` as failed.
+        """
+        while True:
+            item = decode_queue.get()
+            if item is None:
+                return
+            file_number, filename = item
+            try:
+                with (
+                    progress.track_part("decode", file_number)
+                    if progress
+                    else nullcontext()
+                ):
+                    filename = self.__prepare_prometheus_volume(
+                        filename, compression
+                    )
+                    if progress:
+                        progress.add_bytes("decode", os.stat(filename).st_size)
+            except Exception as e:
+                self.safe_logger.error(
+                    f"[Thread #{thread_number}] failed to prepare "
+                    f"{filename} for the upload: {str(e)}"
+                )
+                upload_results[filename] = FileUploadResult(
+                    filename,
+                    f"prometheus-{file_number:02d}"
+                    f"{utils.get_archive_extension(filename)}",
+                    error=str(e),
+                )
+                continue
+            upload_queue.put((file_number, filename, 0))
+
+    def __upload_prometheus_volume_worker(
+        self,
+        upload_queue: Queue,
+        request_id: str,
+        telemetry_group: str,
+        api_url: str,
+        username: str,
+        password: str,
+        thread_number: int,
+        max_retries: int,
+        multipart_api_url: str,
+        multipart_part_size: int,
+        multipart_threads: int,
+        retry_scheduler: RetryScheduler,
+        upload_results: dict[str, FileUploadResult],
+        progress: TransferProgressTracker = None,
+    ):
+        """
+        Pipeline stage that uploads the volumes on the S3 bucket
+        until a None is dequeued. Failed uploads are handed to the
+        RetryScheduler that re-enqueues them after the backoff delay,
+        meanwhile the thread uploads the next volumes.
+        """
+        while True:
+            item = upload_queue.get()
+            if item is None:
+                return
+            file_number, local_filename, retry = item
+            remote_filename = (
+                f"prometheus-{file_number:02d}"
+                f"{utils.get_archive_extension(local_filename)}"
+            )
+            result = upload_results.get(local_filename)
+            if result is None:
+                result = FileUploadResult(local_filename, remote_filename)
+                upload_results[local_filename] = result
+            result.attempts += 1
+            if progress:
+                progress.start_part("upload", file_number)
+            try:
+                file_size = os.stat(local_filename).st_size
+                self.upload_file_to_bucket(
+                    api_url,
+                    f"{telemetry_group}/{request_id}",
+                    remote_filename,
+                    local_filename,
+                    username,
+                    password,
+                    multipart_api_url=multipart_api_url,
+                    multipart_part_size=multipart_part_size,
+                    multipart_threads=multipart_threads,
+                )
+            except Exception as e:
+                result.error = str(e)
+                if max_retries == 0 or retry < max_retries:
+                    delay = retry_scheduler.schedule(
+                        (file_number, local_filename, retry + 1), retry
+                    )
+                    self.safe_logger.warning(
+                        f"[Thread #{thread_number}] "
+                        f"{local_filename} "
+                        f"retry number {retry} in {delay:.1f}s: {str(e)}"
+                    )
+                    # the task is marked as done by the scheduler
+                    continue
+                if progress:
+                    progress.finish_part("upload", file_number, error=True)
+                self.safe_logger.error(
+                    f"[Thread #{thread_number}] "
+                    f"max retry number exceeded, "
+                    f"failed to upload file {local_filename} "
+                    f"with exception: {str(e)}"
+                )
+                upload_queue.task_done()
+                continue
+
+            if progress:
+                progress.finish_part("upload", file_number, nbytes=file_size)
+            result.uploaded = True
+            result.size = file_size
+            result.error = None
+            self.safe_logger.info(
+                f"[Thread #{thread_number}] : {local_filename} uploaded "
+            )
+            try:
+                os.unlink(local_filename)
+            except Exception as e:
+                self.safe_logger.warning(
+                    f"[Thread #{thread_number}] failed to remove "
+                    f"{local_filename}: {str(e)}"
+                )
+            upload_queue.task_done()
 
     def generate_url_and_put_to_s3_worker(
         self,
@@ -393,11 +948,21 @@ class KrknTelemetryKubernetes:
         uploaded_file_list: list[str],
         max_retries: int,
         remote_file_prefix: str,
-        remote_file_extension: str,
+        remote_file_extension: Optional[str],
+        get_presigned_url: Callable[[str], Optional[str]] = None,
+        multipart_api_url: str = None,
+        multipart_part_size: int = 0,
+        multipart_threads: int = 4,
+        concurrency_controller: AdaptiveConcurrencyController = None,
+        retry_scheduler: RetryScheduler = None,
+        upload_results: dict[str, FileUploadResult] = None,
+        progress: TransferProgressTracker = None,
     ):
         """
         Worker function that creates an s3 link to put files and upload
-        the file directly on the bucket.
+        the file directly on the bucket. The worker terminates when all
+        the tasks of the queue are done, including the retries
+        still waiting to be re-enqueued.
 
         :param queue: queue that will be consumed. The queue
             elements must be tuples on which the first item must
@@ -423,57 +988,456 @@ class KrknTelemetryKubernetes:
             in the S3 bucket along with the progressive number
             (if is a multiple file archive)
         :param remote_file_extension: the extension of the remote
-            file on the S3 bucket
+            file on the S3 bucket, if None the archive extension of
+            each local file is used (eg. `.tar.gz`)
+        :param get_presigned_url: (Optional) function returning the
+            upload url of a remote filename requested in batch to the API
+            (see `get_bucket_urls_for_filenames`) or None if not
+            available. It's called only for the first upload attempt,
+            the retries and the files without url will request a new one.
+        :param multipart_api_url: (Optional) API endpoint to
+            coordinate the S3 multipart uploads
+        :param multipart_part_size: (Optional) files bigger than
+            `multipart_part_size` bytes are uploaded in parts of this size
+            with a multipart upload, if 0 the files are uploaded with
+            a single request
+        :param multipart_threads: (Optional) number of parts of a file
+            uploaded in parallel
+        :param concurrency_controller: (Optional) if set, the worker
+            waits for a slot of the controller before uploading each file
+        :param retry_scheduler: (Optional) the RetryScheduler of the
+            queue that re-enqueues the failed uploads after an exponential
+            backoff without blocking the worker. If not set the worker
+            waits the backoff delay before re-enqueueing the file
+        :param upload_results: (Optional) the FileUploadResult of
+            each file by local filename, updated by the worker
+            with the outcome of the upload
+        :param progress: (Optional) TransferProgressTracker updated
+            with the progress of the `upload` stage
         :return:
         """
-        THREAD_SLEEP = 5  # NOQA
-        while not queue.empty():
-            data_tuple = queue.get()
+        while True:
+            try:
+                data_tuple = queue.get(timeout=1)
+            except Empty:
+                # pending retries are not marked as done
+                # until re-enqueued
+                if queue.unfinished_tasks == 0:
+                    return
+                continue
             file_number = data_tuple[0]
             local_filename = data_tuple[1]
             retry = data_tuple[2]
+            extension = remote_file_extension
+            if extension is None:
+                extension = utils.get_archive_extension(local_filename)
+            remote_filename = (
+                f"{remote_file_prefix}{file_number:02d}{extension}"
+            )
+            result = None
+            if upload_results is not None:
+                result = upload_results.get(local_filename)
+                if result is None:
+                    result = FileUploadResult(local_filename, remote_filename)
+                    upload_results[local_filename] = result
+                result.attempts += 1
+            if concurrency_controller:
+                concurrency_controller.acquire()
+            if progress:
+                progress.start_part("upload", file_number)
             try:
-                s3_url = self.get_bucket_url_for_filename(
+                file_size = os.stat(local_filename).st_size
+                s3_url = None
+                if get_presigned_url and retry == 0:
+                    s3_url = get_presigned_url(remote_filename)
+                self.upload_file_to_bucket(
                     api_url,
                     f"{telemetry_group}/{request_id}",
-                    f"{remote_file_prefix}"
-                    f"{file_number:02d}"
-                    f"{remote_file_extension}",
+                    remote_filename,
+                    local_filename,
                     username,
                     password,
+                    presigned_url=s3_url,
+                    multipart_api_url=multipart_api_url,
+                    multipart_part_size=multipart_part_size,
+                    multipart_threads=multipart_threads,
                 )
-
-                self.put_file_to_url(s3_url, local_filename)
-                uploaded_file_list.append(local_filename)
-
-                self.safe_logger.info(
-                    f"[Thread #{thread_number}] : "
-                    f"{queue.unfinished_tasks - 1}/"
-                    f"{queue_size} "
-                    f"{local_filename} uploaded "
-                )
-                os.unlink(local_filename)
             except Exception as e:
+                if concurrency_controller:
+                    concurrency_controller.release(error=True)
+                if result:
+                    result.error = str(e)
                 if max_retries == 0 or retry < max_retries:
+                    if retry_scheduler:
+                        delay = retry_scheduler.schedule(
+                            (file_number, local_filename, retry + 1), retry
+                        )
+                    else:
+                        delay = utils.exponential_backoff_delay(retry)
                     self.safe_logger.warning(
                         f"[Thread #{thread_number}] "
                         f"{local_filename} "
-                        f"retry number {retry}"
+                        f"retry number {retry} in {delay:.1f}s: {str(e)}"
                     )
-                    time.sleep(THREAD_SLEEP)
-                    # if there's an exception on the file upload
-                    # the file will be re-enqueued to be retried in 5 seconds
+                    if retry_scheduler:
+                        # the task is marked as done by the scheduler
+                        continue
+                    time.sleep(delay)
                     queue.put((file_number, local_filename, retry + 1))
                 else:
+                    if progress:
+                        progress.finish_part("upload", file_number, error=True)
                     self.safe_logger.error(
                         f"[Thread #{thread_number}] "
                         f"max retry number exceeded, "
                         f"failed to upload file {local_filename} "
                         f"with exception: {str(e)}"
                     )
-                    raise e
-            finally:
                 queue.task_done()
+                continue
+
+            if concurrency_controller:
+                concurrency_controller.release(file_size)
+            if progress:
+                progress.finish_part("upload", file_number, nbytes=file_size)
+            if result:
+                result.uploaded = True
+                result.size = file_size
+                result.error = None
+            uploaded_file_list.append(local_filename)
+            self.safe_logger.info(
+                f"[Thread #{thread_number}] : "
+                f"{queue.unfinished_tasks - 1}/"
+                f"{queue_size} "
+                f"{local_filename} uploaded "
+            )
+            try:
+                os.unlink(local_filename)
+            except Exception as e:
+                self.safe_logger.warning(
+                    f"[Thread #{thread_number}] failed to remove "
+                    f"{local_filename}: {str(e)}"
+                )
+            queue.task_done()
+
+    def upload_file_to_bucket(
+        self,
+        api_url: str,
+        bucket_folder: str,
+        remote_filename: str,
+        local_filename: str,
+        username: str,
+        password: str,
+        presigned_url: str = None,
+        multipart_api_url: str = None,
+        multipart_part_size: int = 0,
+        multipart_threads: int = 4,
+    ):
+        """
+        Uploads a local file on the S3 bucket with a single request
+        or, if bigger than `multipart_part_size`, with a multipart upload.
+        If the telemetry API does not expose the multipart upload
+        endpoints the file is uploaded with a single request.
+
+        :param api_url: API endpoint to generate the S3 temporary link
+        :param bucket_folder: folder on which the file will be stored
+        :param remote_filename: name of the file in the bucket
+        :param local_filename: local file full-path
+        :param username: API username
+        :param password: API password
+        :param presigned_url: (Optional) upload url already requested
+            to the API, ignored by multipart uploads
+        :param multipart_api_url: (Optional) API endpoint to
+            coordinate the S3 multipart uploads
+        :param multipart_part_size: (Optional) size in bytes of the
+            parts, if 0 the multipart upload is disabled
+        :param multipart_threads: (Optional) number of parts uploaded
+            in parallel
+        """
+        if (
+            multipart_api_url
+            and multipart_part_size > 0
+            and self.__multipart_upload_supported
+            and os.stat(local_filename).st_size > multipart_part_size
+            and self.put_file_to_url_multipart(
+                multipart_api_url,
+                bucket_folder,
+                remote_filename,
+                local_filename,
+                username,
+                password,
+                multipart_part_size,
+                multipart_threads,
+            )
+        ):
+            return
+        if presigned_url is None:
+            presigned_url = self.get_bucket_url_for_filename(
+                api_url,
+                bucket_folder,
+                remote_filename,
+                username,
+                password,
+            )
+        self.put_file_to_url(presigned_url, local_filename)
+
+    def put_file_to_url_multipart(
+        self,
+        api_url: str,
+        bucket_folder: str,
+        remote_filename: str,
+        local_filename: str,
+        username: str,
+        password: str,
+        part_size: int,
+        max_threads: int = 4,
+        max_part_retries: int = 3,
+    ) -> bool:
+        """
+        Uploads a local file on the S3 bucket with a multipart upload
+        coordinated by the telemetry API: the upload is initiated with
+        `create_multipart_upload`, the parts are uploaded in parallel,
+        each one retried independently, and the upload is finalized
+        with `complete_multipart_upload`. If a part can't be uploaded
+        the multipart upload is aborted.
+
+        :param api_url: API multipart upload endpoint
+        :param bucket_folder: folder on which the file will be stored
+        :param remote_filename: name of the file in the bucket
+        :param local_filename: local file full-path
+        :param username: API username
+        :param password: API password
+        :param part_size: size in bytes of each part, S3 requires
+            at least 5MB for all the parts except the last one
+        :param max_threads: (Optional) number of parts uploaded in parallel
+        :param max_part_retries: (Optional) number of times the upload
+            of a single part is retried
+        :return: False if the telemetry API does not support the
+            multipart upload and the file has not been uploaded,
+            True otherwise
+        """
+        file_size = os.stat(local_filename).st_size
+        part_count = max(1, math.ceil(file_size / part_size))
+        upload = self.create_multipart_upload(
+            api_url,
+            bucket_folder,
+            remote_filename,
+            part_size,
+            part_count,
+            username,
+            password,
+        )
+        if upload is None:
+            return False
+        try:
+            etags = self.put_file_parts_to_urls(
+                upload.part_urls,
+                local_filename,
+                upload.part_size,
+                max_threads,
+                max_part_retries,
+            )
+            self.complete_multipart_upload(
+                api_url, upload, etags, username, password
+            )
+        except Exception as e:
+            try:
+                self.abort_multipart_upload(
+                    api_url, upload, username, password
+                )
+            except Exception as abort_exception:
+                self.safe_logger.warning(
+                    f"failed to abort multipart upload "
+                    f"{upload.upload_id}: {str(abort_exception)}"
+                )
+            raise e
+        return True
+
+    def put_file_parts_to_urls(
+        self,
+        part_urls: list[str],
+        local_filename: str,
+        part_size: int,
+        max_threads: int = 4,
+        max_part_retries: int = 3,
+    ) -> list[str]:
+        """
+        Puts the parts of a local file in parallel on a list of urls
+        (eg. S3 multipart upload presigned urls), the n-th url
+        receives the n-th `part_size` bytes of the file. Each part
+        is streamed from the file, so at most a read buffer per part
+        is held in memory, and if it fails it is retried with an
+        exponential backoff without resending the others.
+
+        :param part_urls: the urls of the parts
+        :param local_filename: local file full-path
+        :param part_size: size in bytes of each part
+        :param max_threads: (Optional) number of parts uploaded in parallel
+        :param max_part_retries: (Optional) number of times the upload
+            of a single part is retried
+        :return: the list of the ETag of each part returned by S3
+        """
+
+        def put_part(part_number: int) -> str:
+            retry = 0
+            while True:
+                try:
+                    with FileSliceReader(
+                        local_filename, part_number * part_size, part_size
+                    ) as part:
+                        response = self.get_http_session().put(
+                            part_urls[part_number],
+                            data=part,
+                            timeout=self.get_upload_timeout(),
+                        )
+                    if response.status_code != 200:
+                        raise Exception(
+                            f"failed to send part {part_number + 1} to s3 "
+                            f"with status code: {response.status_code}"
+                        )
+                    return response.headers.get("ETag")
+                except Exception as e:
+                    if retry >= max_part_retries:
+                        raise e
+                    self.safe_logger.warning(
+                        f"{local_filename} part {part_number + 1} "
+                        f"retry number {retry}: {str(e)}"
+                    )
+                    time.sleep(utils.exponential_backoff_delay(retry))
+                    retry += 1
+
+        with ThreadPoolExecutor(max_workers=max(1, max_threads)) as executor:
+            return list(executor.map(put_part, range(len(part_urls))))
+
+    def create_multipart_upload(
+        self,
+        api_url: str,
+        bucket_folder: str,
+        remote_filename: str,
+        part_size: int,
+        part_count: int,
+        username: str,
+        password: str,
+    ) -> Optional[S3MultipartUpload]:
+        """
+        Initiates through the telemetry API an S3 multipart upload
+        and gets the presigned urls of the parts. If the API does not
+        expose the multipart upload endpoint the method stops
+        requesting it and returns None: the files must be uploaded
+        with a single request.
+
+        :param api_url: API multipart upload endpoint
+        :param bucket_folder: folder on which the file will be stored
+        :param remote_filename: name of the file in the bucket
+        :param part_size: size in bytes of each part
+        :param part_count: number of parts
+        :param username: API username
+        :param password: API password
+        :return: the S3MultipartUpload initiated, None if the
+            multipart upload is not supported
+        """
+        response = self.get_http_session().post(
+            api_url,
+            auth=(username, password),
+            json={
+                "request_id": bucket_folder,
+                "remote_filename": remote_filename,
+                "parts": part_count,
+            },
+        )
+        if response.status_code in [404, 405, 501]:
+            self.__multipart_upload_supported = False
+            self.safe_logger.info(
+                "multipart upload endpoint not supported by "
+                "the telemetry API, falling back to single requests"
+            )
+            return None
+        if response.status_code != 200:
+            raise Exception(
+                f"impossible to initiate multipart upload from "
+                f"api with code: {response.status_code}"
+            )
+        json_response = response.json()
+        part_urls = json_response.get("urls")
+        if not isinstance(part_urls, list) or len(part_urls) != part_count:
+            raise Exception(
+                f"wrong number of multipart upload urls received, "
+                f"expected {part_count}"
+            )
+        return S3MultipartUpload(
+            upload_id=json_response.get("upload_id"),
+            bucket_folder=bucket_folder,
+            remote_filename=remote_filename,
+            part_size=part_size,
+            part_urls=part_urls,
+        )
+
+    def complete_multipart_upload(
+        self,
+        api_url: str,
+        upload: S3MultipartUpload,
+        etags: list[str],
+        username: str,
+        password: str,
+    ):
+        """
+        Completes through the telemetry API an S3 multipart upload
+
+        :param api_url: API multipart upload endpoint
+        :param upload: the S3MultipartUpload to complete
+        :param etags: the ETag of each part
+        :param username: API username
+        :param password: API password
+        """
+        response = self.get_http_session().post(
+            f"{api_url}/complete",
+            auth=(username, password),
+            json={
+                "request_id": upload.bucket_folder,
+                "remote_filename": upload.remote_filename,
+                "upload_id": upload.upload_id,
+                "parts": [
+                    {"part_number": i + 1, "etag": etag}
+                    for i, etag in enumerate(etags)
+                ],
+            },
+        )
+        if response.status_code != 200:
+            raise Exception(
+                f"impossible to complete multipart upload "
+                f"{upload.upload_id} with code: {response.status_code}"
+            )
+
+    def abort_multipart_upload(
+        self,
+        api_url: str,
+        upload: S3MultipartUpload,
+        username: str,
+        password: str,
+    ):
+        """
+        Aborts through the telemetry API an S3 multipart upload
+        deleting the parts already uploaded
+
+        :param api_url: API multipart upload endpoint
+        :param upload: the S3MultipartUpload to abort
+        :param username: API username
+        :param password: API password
+        """
+        response = self.get_http_session().post(
+            f"{api_url}/abort",
+            auth=(username, password),
+            json={
+                "request_id": upload.bucket_folder,
+                "remote_filename": upload.remote_filename,
+                "upload_id": upload.upload_id,
+            },
+        )
+        if response.status_code != 200:
+            raise Exception(
+                f"impossible to abort multipart upload "
+                f"{upload.upload_id} with code: {response.status_code}"
+            )
 
     def put_file_to_url(self, url: str, local_filename: str):
         """
@@ -483,7 +1447,9 @@ class KrknTelemetryKubernetes:
         """
         try:
             with open(local_filename, "rb") as file:
-                upload_to_s3_response = requests.put(url, data=file, timeout=5)
+                upload_to_s3_response = self.get_http_session().put(
+                    url, data=file, timeout=self.get_upload_timeout()
+                )
                 if upload_to_s3_response.status_code != 200:
                     raise Exception(
                         f"failed to send archive to s3 with "
@@ -518,7 +1484,7 @@ class KrknTelemetryKubernetes:
             "request_id": bucket_folder,
             "remote_filename": remote_filename,
         }
-        presigned_url_response = requests.get(
+        presigned_url_response = self.get_http_session().get(
             api_url,
             auth=(username, password),
             params=url_params,
@@ -530,6 +1496,76 @@ class KrknTelemetryKubernetes:
             )
         return presigned_url_response.content.decode("utf-8")
 
+    def get_bucket_urls_for_filenames(
+        self,
+        api_url: str,
+        bucket_folder: str,
+        remote_filenames: list[str],
+        username: str,
+        password: str,
+        batch_size: int = 50,
+    ) -> dict[str, str]:
+        """
+        Gets from the telemetry API the one shot S3 links to upload
+        a set of files, requesting up to `batch_size` links per call
+        to the batch endpoint. The endpoint accepts a json body
+        `{"request_id": <bucket_folder>, "remote_filenames": [...]}` and
+        returns a json object with the url of each filename.
+        If the API does not support the batch endpoint the method
+        stops requesting it and returns the links obtained so far: the
+        missing links must be requested one by one with
+        `get_bucket_url_for_filename`.
+
+        :param api_url: batch endpoint URL
+        :param bucket_folder: folder on which the files
+            will be stored
+        :param remote_filenames: the names of the files that
+            will be stored in the bucket
+        :param username: API username
+        :param password: API password
+        :param batch_size: maximum number of links requested
+            per call, if 0 the batch endpoint is not used
+        :return: the urls where the files will be uploaded by filename
+        """
+        urls = dict[str, str]()
+        if batch_size <= 0:
+            return urls
+        for start in range(0, len(remote_filenames), batch_size):
+            if not self.__presigned_url_batch_supported:
+                break
+            end = start + batch_size
+            batch = remote_filenames[start:end]
+            try:
+                response = self.get_http_session().post(
+                    api_url,
+                    auth=(username, password),
+                    json={
+                        "request_id": bucket_folder,
+                        "remote_filenames": batch,
+                    },
+                )
+                if response.status_code in [404, 405, 501]:
+                    self.__presigned_url_batch_supported = False
+                    self.safe_logger.info(
+                        "batch presigned url endpoint not supported by "
+                        "the telemetry API, falling back to single requests"
+                    )
+                    break
+                if response.status_code != 200:
+                    raise Exception(
+                        f"impossible to get upload urls from "
+                        f"api with code: {response.status_code}"
+                    )
+                for filename, url in response.json().items():
+                    if filename in batch:
+                        urls[filename] = url
+            except Exception as e:
+                self.safe_logger.warning(
+                    f"failed to get batch of upload urls: {str(e)}, "
+                    f"falling back to single requests"
+                )
+        return urls
+
     def set_parameters_base64(
         self, scenario_telemetry: ScenarioTelemetry, file_path: str
     ) -> dict:
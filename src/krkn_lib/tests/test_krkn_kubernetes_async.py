@@ -0,0 +1,219 @@
+import asyncio
+import importlib.util
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+import yaml
+from kubernetes import config
+
+from krkn_lib.k8s import AsyncKrknKubernetes
+from krkn_lib.tests import BaseTest
+
+
+@unittest.skipIf(
+    importlib.util.find_spec("kubernetes_asyncio") is None,
+    "kubernetes_asyncio not installed",
+)
+class KrknKubernetesAsyncTests(BaseTest):
+    def test_list_and_get(self):
+        namespace = "test-async-" + self.get_random_string(10)
+        self.deploy_namespace(namespace, [])
+        self.deploy_fedtools(namespace=namespace)
+        self.wait_pod("fedtools", namespace)
+
+        async def run():
+            async with AsyncKrknKubernetes(
+                config.KUBE_CONFIG_DEFAULT_LOCATION
+            ) as lib_async:
+                namespaces, pods, nodes = await lib_async.gather(
+                    lib_async.list_namespaces(),
+                    lib_async.list_pods(namespace),
+                    lib_async.list_nodes(),
+                )
+                self.assertIn(namespace, namespaces)
+                self.assertEqual(pods, ["fedtools"])
+                self.assertEqual(
+                    sorted(nodes), sorted(self.lib_k8s.list_nodes())
+                )
+                self.assertTrue(
+                    await lib_async.is_pod_running("fedtools", namespace)
+                )
+                self.assertFalse(
+                    await lib_async.is_pod_running("do_not_exist", namespace)
+                )
+                pod = await lib_async.read_pod("fedtools", namespace)
+                self.assertEqual(pod.metadata.name, "fedtools")
+                all_pods = await lib_async.get_all_pods()
+                self.assertIn(["fedtools", namespace], all_pods)
+
+        asyncio.run(run())
+        self.pod_delete_queue.put(["fedtools", namespace])
+
+    def test_create_exec_delete_pod(self):
+        namespace = "test-async-" + self.get_random_string(10)
+        self.deploy_namespace(namespace, [])
+        pod_names = [
+            "test-async-" + self.get_random_string(5) for _ in range(3)
+        ]
+
+        async def run():
+            async with AsyncKrknKubernetes(
+                kubeconfig_string=open(
+                    config.KUBE_CONFIG_DEFAULT_LOCATION
+                ).read()
+            ) as lib_async:
+                await lib_async.gather(
+                    *[
+                        lib_async.create_pod(
+                            self.alpine_body(name, namespace), namespace
+                        )
+                        for name in pod_names
+                    ],
+                    limit=2,
+                )
+                affected_pods = await lib_async.gather(
+                    *[
+                        lib_async.wait_until_pod_is_ready(
+                            name, namespace, timeout=60
+                        )
+                        for name in pod_names
+                    ]
+                )
+                for affected_pod in affected_pods:
+                    self.assertIsNotNone(affected_pod.pod_readiness_time)
+
+                result = await lib_async.exec_cmd_in_pod(
+                    ["echo test"], pod_names[0], namespace
+                )
+                self.assertEqual(result.strip(), "test")
+                shell = await lib_async.get_pod_shell(pod_names[0], namespace)
+                self.assertEqual(shell, "sh")
+
+                await lib_async.gather(
+                    *[
+                        lib_async.delete_pod(name, namespace)
+                        for name in pod_names
+                    ]
+                )
+                self.assertEqual(await lib_async.list_pods(namespace), [])
+
+        asyncio.run(run())
+
+    def test_constructor(self):
+        with self.assertRaises(Exception):
+            AsyncKrknKubernetes(
+                config.KUBE_CONFIG_DEFAULT_LOCATION,
+                kubeconfig_string="test",
+            )
+
+        async def run():
+            lib_async = AsyncKrknKubernetes(kubeconfig_string="not a config")
+            with self.assertRaises(Exception):
+                await lib_async.initialize()
+            await lib_async.close()
+
+        asyncio.run(run())
+
+    @staticmethod
+    def alpine_body(name: str, namespace: str) -> dict[str, any]:
+        return {
+            "apiVersion": "v1",
+            "kind": "Pod",
+            "metadata": {"name": name, "namespace": namespace},
+            "spec": {
+                "containers": [
+                    {
+                        "name": "alpine",
+                        "image": "alpine",
+                        "command": ["/bin/sh", "-c", "sleep 60m"],
+                    }
+                ]
+            },
+        }
+
+
+class FakeAsyncPodsApi:
+    async def create_namespaced_pod(self, body: any, namespace: str):
+        pass
+
+    async def delete_namespaced_pod(self, name: str, namespace: str):
+        pass
+
+
+class FakeAsyncKrknKubernetes(AsyncKrknKubernetes):
+    def __init__(self, phases: list[str]):
+        super().__init__(kubeconfig_string="")
+        self.cli = FakeAsyncPodsApi()
+        self.phases = phases
+
+    async def watch_pods(self, namespace: str, **kwargs):
+        for phase in self.phases:
+            yield {
+                "type": "MODIFIED",
+                "object": SimpleNamespace(status=SimpleNamespace(phase=phase)),
+            }
+
+
+@unittest.skipIf(
+    importlib.util.find_spec("kubernetes_asyncio") is None,
+    "kubernetes_asyncio not installed",
+)
+class KrknKubernetesAsyncUnitTests(unittest.TestCase):
+    def test_default_kubeconfig(self):
+        home = tempfile.mkdtemp()
+        os.mkdir(os.path.join(home, ".kube"))
+        with open(os.path.join(home, ".kube", "config"), "w") as kubeconfig:
+            yaml.safe_dump(
+                {
+                    "apiVersion": "v1",
+                    "kind": "Config",
+                    "current-context": "test",
+                    "clusters": [
+                        {
+                            "name": "test",
+                            "cluster": {"server": "https://test:6443"},
+                        }
+                    ],
+                    "contexts": [
+                        {
+                            "name": "test",
+                            "context": {"cluster": "test", "user": "test"},
+                        }
+                    ],
+                    "users": [{"name": "test", "user": {"token": "test"}}],
+                },
+                kubeconfig,
+            )
+        previous_home = os.environ.get("HOME")
+        os.environ["HOME"] = home
+        try:
+
+            async def run():
+                async with AsyncKrknKubernetes() as lib_async:
+                    return lib_async.api_client.configuration.host
+
+            self.assertEqual(asyncio.run(run()), "https://test:6443")
+        finally:
+            if previous_home is None:
+                del os.environ["HOME"]
+            else:
+                os.environ["HOME"] = previous_home
+
+    def test_create_pod_phases(self):
+        body = {"metadata": {"name": "test"}}
+        for phases in [["Pending", "Running"], ["Pending", "Succeeded"]]:
+            lib_async = FakeAsyncKrknKubernetes(phases)
+            asyncio.run(lib_async.create_pod(body, "default"))
+        # a failed pod is reported without waiting for the timeout
+        lib_async = FakeAsyncKrknKubernetes(["Pending", "Failed", "Running"])
+        with self.assertRaisesRegex(Exception, "pod test failed"):
+            asyncio.run(lib_async.create_pod(body, "default"))
+        lib_async = FakeAsyncKrknKubernetes(["Pending"])
+        with self.assertRaisesRegex(Exception, "Starting pod failed"):
+            asyncio.run(lib_async.create_pod(body, "default"))
+
+
+if __name__ == "__main__":
+    unittest.main()
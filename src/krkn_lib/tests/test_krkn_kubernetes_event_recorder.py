@@ -0,0 +1,189 @@
+import datetime
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from kubernetes import client
+
+from krkn_lib.k8s import KrknKubernetes
+from krkn_lib.k8s.cluster_event_recorder import ClusterEventRecorder
+from krkn_lib.tests import BaseTest
+
+
+class TestKrknKubernetesEventRecorder(BaseTest):
+    def test_cluster_event_recorder(self):
+        namespace = "test-recorder-" + self.get_random_string(10)
+        pod_name = "recorded-" + self.get_random_string(10)
+        self.deploy_namespace(namespace, [])
+        spill_file = tempfile.mktemp()
+        recorder = ClusterEventRecorder(
+            self.lib_k8s,
+            namespace=namespace,
+            reasons=None,
+            max_events=2,
+            spill_file=spill_file,
+        )
+        recorder.start()
+        recorder.start_scenario("deploy")
+        self.deploy_delayed_readiness_pod(pod_name, namespace, 0)
+        self.wait_pod(pod_name, namespace)
+        time.sleep(5)
+        recorder.stop_scenario("deploy")
+        recorder.start_scenario("idle")
+        events = recorder.stop()
+
+        self.assertEqual(len(events), 2)
+        self.assertGreater(len(events["deploy"]), 2)
+        self.assertTrue(os.path.getsize(spill_file) > 0)
+        for event in events["deploy"]:
+            self.assertEqual(event.namespace, namespace)
+        self.assertTrue(
+            any(
+                event.involved_object_name == pod_name
+                and event.reason == "Scheduled"
+                for event in events["deploy"]
+            )
+        )
+        names = [(e.namespace, e.name) for e in events["deploy"]]
+        self.assertEqual(len(names), len(set(names)))
+        self.assertEqual(recorder.dropped_events, 0)
+
+        recorder = ClusterEventRecorder(self.lib_k8s, namespace=namespace)
+        with self.assertRaises(Exception):
+            recorder.stop_scenario("not-started")
+        with self.assertRaises(Exception):
+            ClusterEventRecorder(self.lib_k8s, max_events=0)
+        self.lib_k8s.delete_namespace(namespace)
+        os.unlink(spill_file)
+
+
+class FakeWatchResponse:
+    def __init__(self, events: list[dict]):
+        self.lines = [json.dumps(event) + "\n" for event in events]
+
+    def stream(self, amt=None, decode_content=False):
+        for line in self.lines:
+            yield line.encode()
+
+    def close(self):
+        pass
+
+    def release_conn(self):
+        pass
+
+
+class FakeEventsApi:
+    """
+    Serves the event watches of the ClusterEventRecorder
+    with a scripted sequence of responses
+    """
+
+    def __init__(self, responses: list[list[dict]]):
+        self.responses = responses
+        self.watched_versions = []
+        self.list_version = 100
+        self.done = threading.Event()
+
+    def list_namespaced_event(self, namespace, **kwargs):
+        """
+        :return: CoreV1EventList
+        """
+        if not kwargs.get("watch"):
+            self.list_version += 100
+            return client.CoreV1EventList(
+                items=[],
+                metadata=client.V1ListMeta(
+                    resource_version=str(self.list_version)
+                ),
+            )
+        self.watched_versions.append(kwargs["resource_version"])
+        if not self.responses:
+            self.done.set()
+            time.sleep(0.05)
+            return FakeWatchResponse([])
+        return FakeWatchResponse(self.responses.pop(0))
+
+
+def fake_event(name: str, reason: str, resource_version: str) -> dict:
+    now = datetime.datetime.now(datetime.timezone.utc).strftime(
+        "%Y-%m-%dT%H:%M:%SZ"
+    )
+    return {
+        "type": "ADDED",
+        "object": {
+            "apiVersion": "v1",
+            "kind": "Event",
+            "metadata": {
+                "name": name,
+                "namespace": "test",
+                "resourceVersion": resource_version,
+                "creationTimestamp": now,
+            },
+            "involvedObject": {
+                "kind": "Pod",
+                "name": "pod",
+                "namespace": "test",
+            },
+            "reason": reason,
+            "message": "message",
+            "source": {"component": "kubelet"},
+            "type": "Normal",
+            "firstTimestamp": now,
+            "lastTimestamp": now,
+        },
+    }
+
+
+class TestClusterEventRecorderWatch(unittest.TestCase):
+    def test_bookmark_and_expired_watch(self):
+        api = FakeEventsApi(
+            [
+                [
+                    fake_event("killed", "Killing", "201"),
+                    fake_event("ignored", "Pulled", "202"),
+                    {
+                        "type": "BOOKMARK",
+                        "object": {
+                            "kind": "Event",
+                            "apiVersion": "v1",
+                            "metadata": {"resourceVersion": "250"},
+                        },
+                    },
+                ],
+                [
+                    {
+                        "type": "ERROR",
+                        "object": {
+                            "kind": "Status",
+                            "apiVersion": "v1",
+                            "status": "Failure",
+                            "reason": "Expired",
+                            "message": "too old resource version",
+                            "code": 410,
+                        },
+                    }
+                ],
+                [fake_event("failed", "FailedScheduling", "301")],
+            ]
+        )
+        krkn_lib = KrknKubernetes.__new__(KrknKubernetes)
+        krkn_lib.cli = api
+        recorder = ClusterEventRecorder(
+            krkn_lib,
+            namespace="test",
+            reasons=["Killing", "FailedScheduling"],
+        )
+        recorder.start()
+        self.assertTrue(api.done.wait(10))
+        events = recorder.stop()[""]
+
+        # the watch resumes from the bookmark and, once expired,
+        # from the resourceVersion listed again
+        self.assertEqual(api.watched_versions[:3], ["200", "250", "300"])
+        self.assertEqual(
+            [(e.name, e.reason) for e in events],
+            [("killed", "Killing"), ("failed", "FailedScheduling")],
+        )
@@ -1,8 +1,15 @@
+import hashlib
 import os
+import subprocess
+import tarfile
+import tempfile
+import threading
 import time
 import unittest
 import uuid
 
+from krkn_lib.k8s import KrknKubernetes
+from krkn_lib.models.k8s import ArchiveCodec
 from krkn_lib.tests import BaseTest
 
 
@@ -165,6 +172,316 @@ class KrknKubernetesTestsExec(BaseTest):
 
         self.pod_delete_queue.put(["fedtools", namespace])
 
+    def test_download_folder_from_pod_as_binary_archive(self):
+        workdir_basepath = os.getenv("TEST_WORKDIR")
+        workdir = self.get_random_string(10)
+        test_workdir = os.path.join(workdir_basepath, workdir)
+        os.mkdir(test_workdir)
+        namespace = "test-" + self.get_random_string(10)
+        self.deploy_namespace(namespace, [])
+        self.deploy_fedtools(namespace=namespace)
+        self.wait_pod("fedtools", namespace)
+        self.lib_k8s.exec_cmd_in_pod(
+            ["mkdir /test"], "fedtools", namespace, "fedtools"
+        )
+        self.lib_k8s.exec_cmd_in_pod(
+            ["dd if=/dev/urandom of=/test/test.bin bs=1024 count=500"],
+            "fedtools",
+            namespace,
+            "fedtools",
+        )
+        remote_checksum = self.lib_k8s.get_file_checksum_from_pod(
+            "fedtools", "fedtools", namespace, "/test/test.bin"
+        )
+        self.assertIsNotNone(remote_checksum)
+
+        # raw binary output is not corrupted by the websocket
+        checksum = hashlib.sha256()
+        for chunk in self.lib_k8s.stream_cmd_output_from_pod(
+            ["cat", "/test/test.bin"], "fedtools", namespace, "fedtools"
+        ):
+            checksum.update(chunk)
+        self.assertEqual(checksum.hexdigest(), remote_checksum)
+
+        with self.assertRaises(Exception):
+            list(
+                self.lib_k8s.stream_cmd_output_from_pod(
+                    ["cat", "/does_not_exist"],
+                    "fedtools",
+                    namespace,
+                    "fedtools",
+                )
+            )
+
+        archive = self.lib_k8s.archive_and_get_path_from_pod(
+            "fedtools",
+            "fedtools",
+            namespace,
+            "/tmp",
+            "/test",
+            str(uuid.uuid1()),
+            archive_part_size=100,
+            download_path=test_workdir,
+            binary=True,
+        )
+        self.assertGreater(len(archive), 1)
+        archive_file = os.path.join(test_workdir, "archive.tar")
+        with open(archive_file, "wb") as archive_buffer:
+            for _, file in sorted(archive):
+                self.assertTrue(file.endswith(".tar"))
+                with open(file, "rb") as part:
+                    archive_buffer.write(part.read())
+        with tarfile.open(archive_file) as tar:
+            test_bin = tar.extractfile("./test.bin").read()
+        self.assertEqual(hashlib.sha256(test_bin).hexdigest(), remote_checksum)
+
+        self.pod_delete_queue.put(["fedtools", namespace])
+
+    def test_stream_archive_from_pod(self):
+        workdir_basepath = os.getenv("TEST_WORKDIR")
+        test_workdir = os.path.join(
+            workdir_basepath, self.get_random_string(10)
+        )
+        os.mkdir(test_workdir)
+        namespace = "test-" + self.get_random_string(10)
+        self.deploy_namespace(namespace, [])
+        self.deploy_fedtools(namespace=namespace)
+        self.wait_pod("fedtools", namespace)
+        checksums = {}
+        for folder in ["a", "b", "c"]:
+            self.lib_k8s.exec_cmd_in_pod(
+                [
+                    f"mkdir -p /test/{folder} && "
+                    f"dd if=/dev/urandom of=/test/{folder}/test.bin "
+                    f"bs=1024 count=300"
+                ],
+                "fedtools",
+                namespace,
+                "fedtools",
+            )
+            checksums[f"./{folder}/test.bin"] = (
+                self.lib_k8s.get_file_checksum_from_pod(
+                    "fedtools",
+                    "fedtools",
+                    namespace,
+                    f"/test/{folder}/test.bin",
+                )
+            )
+        tmp_content = self.lib_k8s.exec_cmd_in_pod(
+            ["ls -A /tmp"], "fedtools", namespace, "fedtools"
+        )
+
+        archive = self.lib_k8s.stream_archive_from_pod(
+            "fedtools",
+            "fedtools",
+            namespace,
+            "/test",
+            str(uuid.uuid1()),
+            download_path=test_workdir,
+            archive_part_size=100,
+            max_threads=2,
+        )
+        self.assertGreater(len(archive), 1)
+        self.assertEqual(
+            [number for number, _ in archive], list(range(len(archive)))
+        )
+        # nothing must be staged in the pod
+        self.assertEqual(
+            self.lib_k8s.exec_cmd_in_pod(
+                ["ls -A /tmp"], "fedtools", namespace, "fedtools"
+            ),
+            tmp_content,
+        )
+        archive_file = os.path.join(test_workdir, "archive.tar")
+        with open(archive_file, "wb") as archive_buffer:
+            for _, file in archive:
+                with open(file, "rb") as part:
+                    archive_buffer.write(part.read())
+        # the volumes contain one tar archive per shard
+        with tarfile.open(archive_file, ignore_zeros=True) as tar:
+            for member in tar.getmembers():
+                if member.name in checksums:
+                    self.assertEqual(
+                        hashlib.sha256(
+                            tar.extractfile(member).read()
+                        ).hexdigest(),
+                        checksums.pop(member.name),
+                    )
+        self.assertEqual(len(checksums), 0)
+        self.pod_delete_queue.put(["fedtools", namespace])
+
+    def test_compressed_archive_from_pod(self):
+        workdir_basepath = os.getenv("TEST_WORKDIR")
+        test_workdir = os.path.join(
+            workdir_basepath, self.get_random_string(10)
+        )
+        os.mkdir(test_workdir)
+        namespace = "test-" + self.get_random_string(10)
+        self.deploy_namespace(namespace, [])
+        self.deploy_fedtools(namespace=namespace)
+        self.wait_pod("fedtools", namespace)
+        self.lib_k8s.exec_cmd_in_pod(
+            ["mkdir /test && yes prometheus | head -c 1000000 > /test/test"],
+            "fedtools",
+            namespace,
+            "fedtools",
+        )
+        codec = self.lib_k8s.get_archive_codec(
+            "fedtools", "fedtools", namespace
+        )
+        self.assertIn(codec, [ArchiveCodec.gzip, ArchiveCodec.zstd])
+        self.assertEqual(
+            self.lib_k8s.get_archive_codec(
+                "fedtools", "fedtools", namespace, "gzip"
+            ),
+            ArchiveCodec.gzip,
+        )
+        self.assertEqual(
+            self.lib_k8s.get_archive_codec(
+                "fedtools", "fedtools", namespace, "none"
+            ),
+            ArchiveCodec.none,
+        )
+        with self.assertRaises(Exception):
+            self.lib_k8s.get_archive_codec(
+                "fedtools", "fedtools", namespace, "does_not_exist"
+            )
+
+        for staged in [True, False]:
+            if staged:
+                archive = self.lib_k8s.archive_and_get_path_from_pod(
+                    "fedtools",
+                    "fedtools",
+                    namespace,
+                    "/tmp",
+                    "/test",
+                    str(uuid.uuid1()),
+                    download_path=test_workdir,
+                    binary=True,
+                    codec=ArchiveCodec.gzip,
+                )
+            else:
+                archive = self.lib_k8s.stream_archive_from_pod(
+                    "fedtools",
+                    "fedtools",
+                    namespace,
+                    "/test",
+                    str(uuid.uuid1()),
+                    download_path=test_workdir,
+                    codec=ArchiveCodec.gzip,
+                )
+            self.assertEqual(len(archive), 1)
+            self.assertTrue(archive[0][1].endswith(".tar.gz"))
+            # the content compresses well
+            self.assertLess(os.stat(archive[0][1]).st_size, 100000)
+            with tarfile.open(archive[0][1], "r:gz") as tar:
+                member = [m for m in tar.getmembers() if m.isfile()][0]
+                self.assertEqual(len(tar.extractfile(member).read()), 1000000)
+        self.pod_delete_queue.put(["fedtools", namespace])
+
+    def test_resume_download_from_pod(self):
+        workdir_basepath = os.getenv("TEST_WORKDIR")
+        test_workdir = os.path.join(
+            workdir_basepath, self.get_random_string(10)
+        )
+        os.mkdir(test_workdir)
+        namespace = "test-" + self.get_random_string(10)
+        self.deploy_namespace(namespace, [])
+        self.deploy_fedtools(namespace=namespace)
+        self.wait_pod("fedtools", namespace)
+        self.lib_k8s.exec_cmd_in_pod(
+            [
+                "mkdir /test && dd if=/dev/urandom of=/test/test.bin "
+                "bs=1024 count=500"
+            ],
+            "fedtools",
+            namespace,
+            "fedtools",
+        )
+        remote_checksum = self.lib_k8s.get_file_checksum_from_pod(
+            "fedtools", "fedtools", namespace, "/test/test.bin"
+        )
+        # simulates a download interrupted after 100KB
+        local_file = os.path.join(test_workdir, "test.bin")
+        with open(local_file, "wb") as file_buffer:
+            for chunk in self.lib_k8s.stream_cmd_output_from_pod(
+                ["head", "-c", "102400", "/test/test.bin"],
+                "fedtools",
+                namespace,
+                "fedtools",
+            ):
+                file_buffer.write(chunk)
+        self.assertEqual(os.stat(local_file).st_size, 102400)
+        with self.assertRaises(FileExistsError):
+            self.lib_k8s.download_file_from_pod(
+                "fedtools",
+                "fedtools",
+                namespace,
+                "/test/test.bin",
+                local_file,
+            )
+        checksum = self.lib_k8s.download_file_from_pod(
+            "fedtools",
+            "fedtools",
+            namespace,
+            "/test/test.bin",
+            local_file,
+            resume=True,
+        )
+        self.assertEqual(checksum, remote_checksum)
+        with open(local_file, "rb") as file_buffer:
+            self.assertEqual(
+                hashlib.sha256(file_buffer.read()).hexdigest(),
+                remote_checksum,
+            )
+
+        # a corrupted partial file is downloaded again from scratch
+        with open(local_file, "r+b") as file_buffer:
+            file_buffer.write(b"corrupted")
+        checksum = self.lib_k8s.download_file_from_pod(
+            "fedtools",
+            "fedtools",
+            namespace,
+            "/test/test.bin",
+            local_file,
+            resume=True,
+            retry_backoff=0,
+        )
+        self.assertEqual(checksum, remote_checksum)
+
+        # a complete binary archive download removes the manifest
+        prefix = str(uuid.uuid1())
+        archive = self.lib_k8s.archive_and_get_path_from_pod(
+            "fedtools",
+            "fedtools",
+            namespace,
+            "/tmp",
+            "/test",
+            prefix,
+            archive_part_size=100,
+            download_path=test_workdir,
+            binary=True,
+            resume=True,
+        )
+        self.assertGreater(len(archive), 1)
+        self.assertFalse(
+            os.path.exists(
+                os.path.join(test_workdir, f"{prefix}-manifest.json")
+            )
+        )
+        with self.assertRaises(Exception):
+            self.lib_k8s.archive_and_get_path_from_pod(
+                "fedtools",
+                "fedtools",
+                namespace,
+                "/tmp",
+                "/test",
+                prefix,
+                download_path=test_workdir,
+                resume=True,
+            )
+        self.pod_delete_queue.put(["fedtools", namespace])
+
     def test_exists_path_in_pod(self):
         namespace = "default"
         pod_name = "alpine-" + self.get_random_string(10)
@@ -194,5 +511,95 @@ class KrknKubernetesTestsExec(BaseTest):
         self.pod_delete_queue.put([pod_name, namespace])
 
 
+class LocalShellKrknKubernetes(KrknKubernetes):
+    """
+    Runs the commands sent to the pods in a local shell, the shard
+    archiving `slow_entry` waits for the first volume notified
+    """
+
+    def __init__(self, slow_entry: str):
+        self.slow_entry = slow_entry
+        self.part_downloaded = threading.Event()
+
+    def __del__(self):
+        pass
+
+    def path_exists_in_pod(self, pod_name, container_name, namespace, path):
+        return os.path.exists(path)
+
+    def exec_cmd_in_pod(self, command, pod_name, namespace, container=None):
+        return subprocess.run(
+            ["sh", "-c", " ".join(command)],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+
+    def stream_cmd_output_from_pod(
+        self, command, pod_name, namespace, container=None
+    ):
+        if f"'{self.slow_entry}'" in command[-1]:
+            self.part_downloaded.wait(5)
+        with subprocess.Popen(command, stdout=subprocess.PIPE) as process:
+            yield from iter(lambda: process.stdout.read(4096), b"")
+        if process.returncode != 0:
+            raise Exception(f"command exited with {process.returncode}")
+
+
+class KrknKubernetesTestsStreamArchive(unittest.TestCase):
+    def test_stream_archive_parts_notified_per_shard(self):
+        target_path = tempfile.mkdtemp()
+        download_path = tempfile.mkdtemp()
+        contents = {}
+        for folder, size in [("a", 300), ("b", 200)]:
+            os.mkdir(os.path.join(target_path, folder))
+            contents[f"{folder}/test.bin"] = os.urandom(size * 1024)
+            with open(
+                os.path.join(target_path, folder, "test.bin"), "wb"
+            ) as file:
+                file.write(contents[f"{folder}/test.bin"])
+        krkn_lib = LocalShellKrknKubernetes(slow_entry="b")
+        notified = []
+
+        def on_part_downloaded(number: int, filename: str):
+            notified.append((number, filename))
+            krkn_lib.part_downloaded.set()
+
+        archive = krkn_lib.stream_archive_from_pod(
+            "pod",
+            "container",
+            "namespace",
+            target_path,
+            "test",
+            download_path=download_path,
+            archive_part_size=100,
+            max_threads=2,
+            on_part_downloaded=on_part_downloaded,
+        )
+        # the volumes of the shard `a` are notified while
+        # the shard `b` is still being downloaded
+        self.assertTrue(krkn_lib.part_downloaded.is_set())
+        self.assertEqual(notified, archive)
+        self.assertEqual(
+            [number for number, _ in archive], list(range(len(archive)))
+        )
+        for _, filename in archive:
+            self.assertTrue(filename.endswith(".shards.tar"))
+        archive_file = os.path.join(download_path, "archive.tar")
+        with open(archive_file, "wb") as archive_buffer:
+            for _, filename in archive:
+                with open(filename, "rb") as part:
+                    archive_buffer.write(part.read())
+        # the volumes contain one tar archive per shard
+        with tarfile.open(archive_file, ignore_zeros=True) as tar:
+            for member in tar.getmembers():
+                if member.isfile():
+                    self.assertEqual(
+                        tar.extractfile(member).read(),
+                        contents.pop(member.name),
+                    )
+        self.assertEqual(len(contents), 0)
+
+
 if __name__ == "__main__":
     unittest.main()
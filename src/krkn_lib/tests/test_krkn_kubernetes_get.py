@@ -1,6 +1,7 @@
 import logging
 import random
 import re
+import tempfile
 import time
 import os
 import unittest
@@ -87,6 +88,51 @@ class KrknKubernetesTestsGet(BaseTest):
         finally:
             self.pod_delete_queue.put([name, namespace])
 
+    def test_collect_pods_logs(self):
+        namespace = "test-cpl-" + self.get_random_string(10)
+        name = "test-name-" + self.get_random_string(10)
+        start = int(time.time()) - 60
+        self.deploy_namespace(namespace, [])
+        self.deploy_fedtools(namespace=namespace, name=name)
+        self.wait_pod(name, namespace)
+        dst_dir = tempfile.mkdtemp()
+        try:
+            stats = self.lib_k8s.collect_pods_logs(
+                [namespace], dst_dir, start, None
+            )
+            self.assertEqual(len(stats), 1)
+            self.assertIsNone(stats[0].error)
+            self.assertEqual(
+                stats[0].source_file, f"{namespace}/{name}/{name}"
+            )
+            self.assertGreater(stats[0].lines_matched, 0)
+            self.assertEqual(
+                os.path.basename(stats[0].filtered_file),
+                f"namespaces.{namespace}.pods.{name}.{name}.{name}"
+                f".logs.current.log",
+            )
+            with open(stats[0].filtered_file) as log_file:
+                self.assertTrue("Linux" in log_file.read())
+
+            # no lines before the pod start
+            stats = self.lib_k8s.collect_pods_logs(
+                [namespace],
+                dst_dir,
+                start - 3600,
+                start - 60,
+                containers=[name],
+            )
+            self.assertEqual(stats[0].lines_matched, 0)
+            self.assertIsNone(stats[0].filtered_file)
+
+            # containers not selected
+            stats = self.lib_k8s.collect_pods_logs(
+                [namespace], dst_dir, start, None, containers=["not-exists"]
+            )
+            self.assertEqual(len(stats), 0)
+        finally:
+            self.pod_delete_queue.put([name, namespace])
+
     def test_get_containers_in_pod(self):
         namespace = "test-cip-" + self.get_random_string(10)
         name = "test-name-" + self.get_random_string(10)
@@ -1,12 +1,16 @@
 import ast
 import datetime
+import json
 import logging
 import random
 import time
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 
 import yaml
+from kubernetes import client, config
 
+from krkn_lib.k8s import KrknKubernetes
 from krkn_lib.models.krkn import HogConfig, HogType
 from krkn_lib.tests import BaseTest
 from tzlocal import get_localzone
@@ -82,6 +86,44 @@ class KrknKubernetesTestsMisc(BaseTest):
         )
         self.assertGreaterEqual(len(events), 0)
 
+        # same events listed one per page and with events.k8s.io/v1
+        paginated_events = self.lib_k8s.collect_and_parse_cluster_events(
+            int(start_now.timestamp()),
+            int(end__time.timestamp()),
+            local_timezone,
+            limit=1,
+            namespace=namespace_with_evt,
+        )
+        self.assertEqual(
+            sorted(e.name for e in paginated_events),
+            sorted(e.name for e in events),
+        )
+        v1_events = self.lib_k8s.collect_and_parse_cluster_events(
+            int(start_now.timestamp()),
+            int(end__time.timestamp()),
+            local_timezone,
+            namespace=namespace_with_evt,
+            events_api=True,
+        )
+        self.assertEqual(
+            sorted(e.name for e in v1_events),
+            sorted(e.name for e in events),
+        )
+
+        # events filtered by reason
+        reason_events = self.lib_k8s.collect_and_parse_cluster_events(
+            int(start_now.timestamp()),
+            int(end__time.timestamp()),
+            local_timezone,
+            namespace=namespace_with_evt,
+            reasons=["Scheduled"],
+        )
+        self.assertEqual(
+            len(reason_events),
+            len([e for e in events if e.reason == "Scheduled"]),
+        )
+        self.assertTrue(all(e.reason == "Scheduled" for e in reason_events))
+
     def test_replace_service_selector(self):
         namespace = "test-" + self.get_random_string(10)
         name = "test-" + self.get_random_string(10)
@@ -326,6 +368,38 @@ class KrknKubernetesTestsMisc(BaseTest):
         self.assertGreaterEqual(disk_delta / 1024 / 1024, 400)
         self.lib_k8s.delete_namespace(namespace)
 
+    def test_deploy_hog_batch(self):
+        nodes = self.lib_k8s.list_nodes()
+        namespace = f"test-hog-batch-{self.get_random_string(5)}"
+        self.deploy_namespace(namespace, labels=[])
+        config = HogConfig()
+        config.duration = 60
+        config.type = HogType.cpu
+        config.cpu_load_percentage = 10
+        config.workers = 1
+        config.namespace = namespace
+        pods_group = self.lib_k8s.deploy_hog_batch(
+            "test-hog-batch", config, node_names=nodes, max_workers=2
+        )
+        self.assertEqual(len(pods_group.pod_names), len(nodes))
+        self.assertEqual(len(pods_group.ready_pods), len(nodes))
+        self.assertTrue(pods_group.is_ready())
+        pods = self.lib_k8s.list_pods(
+            namespace, label_selector=pods_group.label_selector
+        )
+        self.assertEqual(len(pods), len(nodes))
+
+        not_deleted = pods_group.undeploy()
+        self.assertEqual(len(not_deleted), 0)
+        pods = self.lib_k8s.list_pods(
+            namespace, label_selector=pods_group.label_selector
+        )
+        self.assertEqual(len(pods), 0)
+
+        with self.assertRaises(Exception):
+            self.lib_k8s.deploy_hog_batch("test-hog-batch", config)
+        self.lib_k8s.delete_namespace(namespace)
+
     def test_select_services_by_label(self):
         namespace = "test-" + self.get_random_string(10)
         service_name_1 = "krkn-syn-flood-" + self.get_random_string(10)
@@ -345,6 +419,254 @@ class KrknKubernetesTestsMisc(BaseTest):
         self.assertEqual(len(service), 0)
         self.lib_k8s.delete_namespace(namespace)
 
+    def test_connection_pool_options(self):
+        lib_k8s = KrknKubernetes(
+            config.KUBE_CONFIG_DEFAULT_LOCATION,
+            connection_pool_maxsize=8,
+            num_pools=2,
+            pool_block=True,
+            connect_timeout=10,
+            read_timeout=30,
+            retries=1,
+        )
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            namespaces = list(
+                executor.map(lambda _: lib_k8s.list_namespaces(), range(40))
+            )
+        self.assertTrue(all(ns == namespaces[0] for ns in namespaces))
+
+        metrics = lib_k8s.get_connection_pool_metrics()
+        self.assertEqual(metrics.num_pools, 2)
+        self.assertEqual(metrics.maxsize, 8)
+        self.assertTrue(metrics.block)
+        self.assertEqual(len(metrics.pools), 1)
+        host_metrics = metrics.pools[0]
+        self.assertEqual(host_metrics.maxsize, 8)
+        self.assertEqual(host_metrics.in_use, 0)
+        self.assertGreaterEqual(host_metrics.num_requests, 40)
+        # the connections must be reused and never exceed the pool size
+        self.assertLessEqual(host_metrics.num_connections, 8)
+        self.assertLessEqual(host_metrics.idle, 8)
+
+
+class FakePodsApi:
+    """
+    Creates the pods as no-op and serves the readiness watch
+    of a pods batch with a scripted list of pod phases
+    """
+
+    def __init__(self, phases: list[tuple[str, str]]):
+        self.phases = phases
+
+    def create_namespaced_pod(self, body, namespace):
+        return body
+
+    def list_namespaced_pod(self, namespace, **kwargs):
+        """
+        :return: V1PodList
+        """
+        lines = [
+            json.dumps(
+                {
+                    "type": "MODIFIED",
+                    "object": {
+                        "apiVersion": "v1",
+                        "kind": "Pod",
+                        "metadata": {
+                            "name": name,
+                            "namespace": namespace,
+                            "resourceVersion": str(version),
+                        },
+                        "status": {"phase": phase},
+                    },
+                }
+            )
+            + "\n"
+            for version, (name, phase) in enumerate(self.phases)
+        ]
+
+        class Response:
+            def stream(self, amt=None, decode_content=False):
+                for line in lines:
+                    yield line.encode()
+
+            def close(self):
+                pass
+
+            def release_conn(self):
+                pass
+
+        return Response()
+
+
+class KrknKubernetesTestsPodsBatch(unittest.TestCase):
+    def test_deploy_pods_batch_completed_pod(self):
+        krkn_lib = KrknKubernetes.__new__(KrknKubernetes)
+        krkn_lib.cli = FakePodsApi(
+            [
+                ("completed", "Pending"),
+                # exits before any Running event is received
+                ("completed", "Succeeded"),
+                ("running", "Running"),
+                ("failed", "Failed"),
+            ]
+        )
+        pods_group = krkn_lib._KrknKubernetes__deploy_pods_batch(
+            [
+                {"metadata": {"name": name}}
+                for name in ["completed", "running", "failed"]
+            ],
+            "test",
+            "krkn-pods-group=test",
+            2,
+            30,
+        )
+        self.assertEqual(
+            sorted(pods_group.ready_pods), ["completed", "running"]
+        )
+        self.assertEqual(pods_group.failed_pods, ["failed"])
+
+
+class FakeEventsPagesApi:
+    """
+    Lists two pages of events, the continue token
+    expires the first `expired` times it's used
+    """
+
+    def __init__(self, expired: int):
+        self.expired = expired
+        self.calls = 0
+
+    def list_event_for_all_namespaces(self, limit, _continue=None):
+        self.calls += 1
+        if _continue and self.expired > 0:
+            self.expired -= 1
+            raise ApiException(status=410, reason="Expired")
+        now = datetime.datetime.now(datetime.timezone.utc)
+        event = client.CoreV1Event(
+            metadata=client.V1ObjectMeta(
+                name="second" if _continue else "first", namespace="test"
+            ),
+            involved_object=client.V1ObjectReference(
+                kind="Pod", name="pod", namespace="test"
+            ),
+            source=client.V1EventSource(component="kubelet"),
+            reason="Killing",
+            first_timestamp=now,
+            last_timestamp=now,
+        )
+        return client.CoreV1EventList(
+            items=[event],
+            metadata=client.V1ListMeta(
+                _continue=None if _continue else "token"
+            ),
+        )
+
+
+class KrknKubernetesTestsEventsPagination(unittest.TestCase):
+    def test_collect_and_parse_cluster_events_expired(self):
+        now = int(time.time())
+        krkn_lib = KrknKubernetes.__new__(KrknKubernetes)
+        # the listing restarts from the first page
+        krkn_lib.cli = FakeEventsPagesApi(expired=1)
+        events = krkn_lib.collect_and_parse_cluster_events(
+            now - 60, now + 60, "UTC", limit=1
+        )
+        self.assertEqual([e.name for e in events], ["first", "second"])
+        self.assertEqual(krkn_lib.cli.calls, 4)
+
+        # a partial list is never returned
+        krkn_lib.cli = FakeEventsPagesApi(expired=3)
+        events = krkn_lib.collect_and_parse_cluster_events(
+            now - 60, now + 60, "UTC", limit=1, max_list_restarts=3
+        )
+        self.assertEqual(events, [])
+
+
+class BatchCaptureKrknKubernetes(KrknKubernetes):
+    """
+    Captures the pod manifests of the batch deployments
+    instead of creating them
+    """
+
+    def __init__(self):
+        self.pod_bodies = []
+
+    def __del__(self):
+        pass
+
+    def _KrknKubernetes__deploy_pods_batch(
+        self, pod_bodies, namespace, label_selector, max_workers, timeout
+    ):
+        self.pod_bodies = pod_bodies
+
+
+class KrknKubernetesBatchNodeSelectorsTests(unittest.TestCase):
+    def test_batch_node_selectors(self):
+        lib_k8s = BatchCaptureKrknKubernetes()
+        node_selectors = [{"node-role.kubernetes.io/worker": [""]}]
+        config = HogConfig()
+        config.namespace = "default"
+        lib_k8s.deploy_hog_batch(
+            "hog", config, node_selectors=node_selectors, node_names=["n1"]
+        )
+        self.assertEqual(
+            [body["spec"]["nodeSelector"] for body in lib_k8s.pod_bodies],
+            [
+                {"node-role.kubernetes.io/worker": ""},
+                {"kubernetes.io/hostname": "n1"},
+            ],
+        )
+        lib_k8s.deploy_syn_flood_batch(
+            "syn-flood",
+            "default",
+            "quay.io/krkn-chaos/krkn-syn-flood",
+            "target",
+            80,
+            120,
+            64,
+            10,
+            node_selectors=node_selectors,
+            node_names=["n1"],
+        )
+        self.assertEqual(
+            [
+                body["spec"]["affinity"]["nodeAffinity"][
+                    "requiredDuringSchedulingIgnoredDuringExecution"
+                ]["nodeSelectorTerms"][0]["matchExpressions"]
+                for body in lib_k8s.pod_bodies
+            ],
+            [
+                [
+                    {
+                        "key": "node-role.kubernetes.io/worker",
+                        "operator": "In",
+                        "values": [""],
+                    }
+                ],
+                [
+                    {
+                        "key": "kubernetes.io/hostname",
+                        "operator": "In",
+                        "values": ["n1"],
+                    }
+                ],
+            ],
+        )
+        # a hog pod is scheduled with a single label
+        with self.assertRaises(Exception):
+            lib_k8s.deploy_hog_batch(
+                "hog", config, node_selectors=[{"zone": ["a", "b"]}]
+            )
+        for deploy in [
+            lambda: lib_k8s.deploy_hog_batch("hog", config),
+            lambda: lib_k8s.deploy_syn_flood_batch(
+                "syn-flood", "default", "image", "target", 80, 120, 64, 10
+            ),
+        ]:
+            with self.assertRaisesRegex(Exception, "no node selectors"):
+                deploy()
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,8 +1,12 @@
+import os
+import tempfile
+
 from krkn_lib.models.krkn import HogConfig, HogType
 from krkn_lib.models.k8s import (
     AffectedNode,
     AffectedNodeStatus,
     AffectedPod,
+    DownloadManifest,
     PodsStatus,
 )
 from krkn_lib.tests import BaseTest
@@ -157,4 +161,26 @@ class TestKrknKubernetesModels(BaseTest):
         )
         self.assertEqual(
             nodes_status_1.affected_nodes[0].running_time, 0.11
-        )
\ No newline at end of file
+        )
+
+    def test_download_manifest(self):
+        with tempfile.TemporaryDirectory() as test_workdir:
+            manifest_path = os.path.join(test_workdir, "manifest.json")
+            self.assertIsNone(DownloadManifest.load(manifest_path))
+            manifest = DownloadManifest(manifest_path, 3)
+            manifest.save()
+            self.assertEqual(manifest.pending_parts(), [0, 1, 2])
+            manifest.set_part(
+                0, local="/tmp/test-00.tar", status="downloaded"
+            )
+            manifest.set_part(1, local="/tmp/test-01.tar", status="failed")
+
+            loaded = DownloadManifest.load(manifest_path)
+            self.assertEqual(loaded.part_count, 3)
+            self.assertEqual(loaded.pending_parts(), [1, 2])
+            self.assertEqual(loaded.parts[0]["local"], "/tmp/test-00.tar")
+            self.assertEqual(loaded.parts[1]["status"], "failed")
+            loaded.set_part(1, status="downloaded")
+            self.assertEqual(
+                DownloadManifest.load(manifest_path).pending_parts(), [2]
+            )
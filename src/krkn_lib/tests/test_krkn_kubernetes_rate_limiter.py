@@ -0,0 +1,100 @@
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from kubernetes import config
+
+from krkn_lib.k8s import (
+    KrknKubernetes,
+    PriorityRateLimiter,
+    get_request_priority,
+    request_priority,
+)
+from krkn_lib.models.k8s import RequestPriority
+from krkn_lib.tests import BaseTest
+
+
+class KrknKubernetesRateLimiterTests(BaseTest):
+    def test_request_priority(self):
+        self.assertIsNone(get_request_priority())
+        with request_priority(RequestPriority.high):
+            self.assertEqual(get_request_priority(), RequestPriority.high)
+            with request_priority(RequestPriority.low):
+                self.assertEqual(get_request_priority(), RequestPriority.low)
+            self.assertEqual(get_request_priority(), RequestPriority.high)
+            # the priority is thread local
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                self.assertIsNone(
+                    executor.submit(get_request_priority).result()
+                )
+        self.assertIsNone(get_request_priority())
+
+    def test_rate_limit(self):
+        with self.assertRaises(Exception):
+            PriorityRateLimiter(0)
+        with self.assertRaises(Exception):
+            PriorityRateLimiter(10, 0)
+
+        rate_limiter = PriorityRateLimiter(20, burst=5)
+        start_time = time.time()
+        for _ in range(15):
+            rate_limiter.acquire()
+        elapsed = time.time() - start_time
+        # 5 tokens available immediately, 10 refilled at 20 qps
+        self.assertGreaterEqual(elapsed, 0.45)
+        self.assertLess(elapsed, 1.5)
+        metrics = rate_limiter.get_metrics()
+        self.assertEqual(metrics[RequestPriority.normal].requests, 15)
+        self.assertEqual(metrics[RequestPriority.normal].waiting, 0)
+        self.assertGreater(metrics[RequestPriority.normal].max_wait_time, 0)
+        self.assertEqual(metrics[RequestPriority.high].requests, 0)
+        self.assertEqual(metrics[RequestPriority.high].average_wait_time, 0)
+
+    def test_priority_lanes(self):
+        rate_limiter = PriorityRateLimiter(20, burst=1)
+        served = []
+
+        def request(priority: RequestPriority):
+            with request_priority(priority):
+                rate_limiter.acquire()
+            served.append(priority)
+
+        with ThreadPoolExecutor(max_workers=20) as executor:
+            for _ in range(10):
+                executor.submit(request, RequestPriority.low)
+            time.sleep(0.1)
+            for _ in range(5):
+                executor.submit(request, RequestPriority.high)
+
+        # the high priority requests queued after the low priority
+        # ones must be served before the remaining low priority requests
+        last_high = max(
+            i for i, p in enumerate(served) if p == RequestPriority.high
+        )
+        self.assertLess(last_high, 10)
+        self.assertEqual(served[-1], RequestPriority.low)
+        metrics = rate_limiter.get_metrics()
+        self.assertLess(
+            metrics[RequestPriority.high].average_wait_time,
+            metrics[RequestPriority.low].average_wait_time,
+        )
+
+    def test_rate_limited_client(self):
+        self.assertIsNone(self.lib_k8s.get_rate_limiter_metrics())
+        lib_k8s = KrknKubernetes(
+            config.KUBE_CONFIG_DEFAULT_LOCATION, qps=20, burst=5
+        )
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            for _ in range(20):
+                executor.submit(lib_k8s.list_namespaces)
+        with request_priority(RequestPriority.high):
+            lib_k8s.list_nodes()
+        metrics = lib_k8s.get_rate_limiter_metrics()
+        # bulk listing is low priority by default
+        self.assertGreaterEqual(metrics[RequestPriority.low].requests, 20)
+        self.assertGreater(metrics[RequestPriority.low].total_wait_time, 0)
+        self.assertGreaterEqual(metrics[RequestPriority.high].requests, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+import unittest
+
+from krkn_lib.k8s.templates import TemplateRegistry, template_registry
+from krkn_lib.models.krkn import HogType
+from krkn_lib.tests import BaseTest
+
+
+class KrknKubernetesTemplatesTests(BaseTest):
+    hog_params = {
+        "name": "test-hog",
+        "namespace": "default",
+        "labels": {"krkn-pods-group": "hog-test"},
+        "hog_type": HogType.cpu.value,
+        "hog_type_io": HogType.io.value,
+        "has_selector": True,
+        "node_selector_key": "kubernetes.io/hostname",
+        "node_selector_value": "worker-0",
+        "image": "quay.io/krkn-chaos/krkn-hog",
+        "duration": 30,
+        "cpu_load_percentage": 80,
+        "cpu_method": "all",
+        "io_block_size": "1m",
+        "io_write_bytes": "10m",
+        "io_target_pod_volume": {
+            "hostPath": {"path": "/tmp"},
+            "name": "node-volume",
+        },
+        "memory_vm_bytes": "10%",
+        "workers": None,
+        "target_pod_folder": "/hog-data",
+    }
+
+    syn_flood_params = {
+        "name": "test-syn-flood",
+        "namespace": "default",
+        "labels": None,
+        "has_node_selectors": True,
+        "node_selectors": {
+            "kubernetes.io/hostname": ["worker-0", "worker-1"],
+            "topology.kubernetes.io/zone": ["zone-a"],
+        },
+        "image": "quay.io/krkn-chaos/krkn-syn-flood",
+        "target": "nginx-service",
+        "duration": 10,
+        "target_port": 80,
+        "packet_size": 120,
+        "window_size": 64,
+    }
+
+    def test_render_manifest_direct(self):
+        io_hog_params = dict(self.hog_params)
+        io_hog_params["hog_type"] = HogType.io.value
+        io_hog_params["has_selector"] = False
+        io_hog_params["labels"] = None
+        no_selector_syn_flood_params = dict(self.syn_flood_params)
+        no_selector_syn_flood_params["has_node_selectors"] = False
+        no_selector_syn_flood_params["labels"] = {"test": "label"}
+        test_cases = [
+            ("hog_pod.j2", self.hog_params),
+            ("hog_pod.j2", io_hog_params),
+            ("syn_flood_pod.j2", self.syn_flood_params),
+            ("syn_flood_pod.j2", no_selector_syn_flood_params),
+            (
+                "node_exec_pod.j2",
+                {"nodename": "worker-0", "podname": "test-exec"},
+            ),
+            (
+                "service_hijacking_config_map.j2",
+                {
+                    "name": "test-cm",
+                    "namespace": "default",
+                    "plan": [
+                        {
+                            "service_target_port": 80,
+                            "resource": "/list/index.php",
+                            "steps": {"GET": [{"duration": 15}]},
+                        }
+                    ],
+                },
+            ),
+            (
+                "service_hijacking_pod.j2",
+                {
+                    "name": "test-sh",
+                    "namespace": "default",
+                    "selector_key": "service-hijacking",
+                    "selector_value": "sh-test",
+                    "image": "quay.io/krkn-chaos/krkn-service-hijacking",
+                    "port_name": "flask",
+                    "config_map_name": "test-cm",
+                    "port_number": 5000,
+                    "stats_route": "/stats",
+                },
+            ),
+        ]
+        for template_name, params in test_cases:
+            rendered = template_registry.render_manifest(
+                template_name, direct=False, **params
+            )
+            built = template_registry.render_manifest(
+                template_name, direct=True, **params
+            )
+            self.assertEqual(rendered, built, template_name)
+
+    def test_get_template(self):
+        template = template_registry.get_template("hog_pod.j2")
+        self.assertIs(template, template_registry.get_template("hog_pod.j2"))
+        with self.assertRaises(Exception):
+            template_registry.get_template("does_not_exist.j2")
+        with self.assertRaises(Exception):
+            template_registry.register_builder(
+                "does_not_exist.j2", lambda **params: {}
+            )
+        registry = TemplateRegistry()
+        self.assertIsNot(template, registry.get_template("hog_pod.j2"))
+
+
+if __name__ == "__main__":
+    unittest.main()
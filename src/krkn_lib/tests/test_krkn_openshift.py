@@ -1,4 +1,6 @@
 import os
+import tarfile
+import tempfile
 from datetime import datetime
 
 from krkn_lib.tests import BaseTest
@@ -79,6 +81,29 @@ class KrknOpenshiftTest(BaseTest):
         self.assertEqual(test_file_1_lines, 7)
         self.assertEqual(test_file_2_lines, 4)
 
+        # same output filtering with processes
+        processes_dst_dir = f"{dst_dir}.processes"
+        os.mkdir(processes_dst_dir)
+        stats = self.lib_ocp.filter_must_gather_ocp_log_folder(
+            "src/testdata/must-gather",
+            processes_dst_dir,
+            1694473200,
+            1694476200,
+            "*.log",
+            3,
+            filter_patterns,
+            processes=2,
+        )
+        self.assertEqual(
+            sorted(os.listdir(processes_dst_dir)), sorted(os.listdir(dst_dir))
+        )
+        self.assertEqual(len(stats), 2)
+        lines_matched = {
+            os.path.basename(s.filtered_file): s.lines_matched for s in stats
+        }
+        self.assertEqual(lines_matched[os.path.basename(test_file_1)], 7)
+        self.assertEqual(lines_matched[os.path.basename(test_file_2)], 4)
+
     def test_is_openshift(self):
         self.assertFalse(self.lib_ocp.is_openshift())
 
@@ -87,6 +112,108 @@ class KrknOpenshiftTest(BaseTest):
         result = self.lib_ocp.get_clusterversion_string()
         self.assertIsNotNone(result)
 
+    def test_collect_filter_archive_ocp_logs_namespaces(self):
+        filter_patterns = [
+            # 2023-09-15T11:20:36.123425532Z log
+            r"(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d+Z).+",
+        ]
+        base_dir = tempfile.mkdtemp()
+        kubeconfig_path = os.path.join(base_dir, "kubeconfig")
+        with open(kubeconfig_path, "w"):
+            pass
+        namespaces = ["namespace-1", "namespace-2", "namespace-3"]
+        for stream_archive in [False, True]:
+            work_dir = tempfile.mkdtemp(dir=base_dir)
+            dst_dir = tempfile.mkdtemp(dir=base_dir)
+            cwd = os.getcwd()
+            oc_log = os.path.join(base_dir, f"oc-{stream_archive}.log")
+            # the fake oc takes 1 second to collect each namespace
+            # but namespace-3, collected in 4 seconds
+            os.environ["FAKE_OC_DELAY"] = "1"
+            os.environ["FAKE_OC_DELAYS"] = "namespace-3=4"
+            os.environ["FAKE_OC_LOG"] = oc_log
+            try:
+                archive = self.lib_ocp.collect_filter_archive_ocp_logs(
+                    work_dir,
+                    dst_dir,
+                    kubeconfig_path,
+                    1694473200,
+                    1694476200,
+                    filter_patterns,
+                    3,
+                    SafeLogger(),
+                    namespace=namespaces[0],
+                    namespaces=namespaces,
+                    oc_path="src/testdata/fake-oc",
+                    stream_archive=stream_archive,
+                )
+            finally:
+                del os.environ["FAKE_OC_DELAY"]
+                del os.environ["FAKE_OC_DELAYS"]
+                del os.environ["FAKE_OC_LOG"]
+            collections = {}
+            with open(oc_log) as log:
+                for line in log:
+                    event, namespace, timestamp = line.split()
+                    collections.setdefault(namespace, {})[event] = float(
+                        timestamp
+                    )
+            self.assertEqual(sorted(collections.keys()), namespaces)
+            # the namespaces are collected in parallel without
+            # changing the working directory
+            self.assertTrue(
+                all(
+                    collections[first]["start"] < collections[second]["end"]
+                    and collections[second]["start"]
+                    < collections[first]["end"]
+                    for first in namespaces
+                    for second in namespaces
+                )
+            )
+            self.assertEqual(os.getcwd(), cwd)
+            self.assertEqual(sorted(os.listdir(work_dir)), namespaces)
+            namespace_1_log = (
+                "namespace-1.namespaces.namespace-1.pods.prometheus-k8s-0."
+                "prometheus.prometheus.logs.current.log"
+            )
+            with tarfile.open(archive) as tar:
+                lines = {
+                    member.name: len(
+                        tar.extractfile(member).read().splitlines()
+                    )
+                    for member in tar.getmembers()
+                }
+                if stream_archive:
+                    filtered_time = tar.getmember(namespace_1_log).mtime
+                else:
+                    filtered_time = os.stat(
+                        os.path.join(dst_dir, namespace_1_log)
+                    ).st_mtime
+            # the logs of namespace-1 are filtered while
+            # namespace-3 is still being collected (the archive
+            # member mtime is truncated to the second)
+            self.assertLess(
+                filtered_time + 1, collections["namespace-3"]["end"]
+            )
+            self.assertEqual(len(lines), 6)
+            for namespace in namespaces:
+                prefix = f"{namespace}.namespaces.{namespace}.pods."
+                self.assertEqual(
+                    lines[
+                        f"{prefix}openshift-state-metrics-78df59b4d5-mjvhd."
+                        "openshift-state-metrics.openshift-state-metrics."
+                        "logs.current.log"
+                    ],
+                    7,
+                )
+                self.assertEqual(
+                    lines[
+                        f"{prefix}prometheus-k8s-0.prometheus.prometheus."
+                        "logs.current.log"
+                    ],
+                    4,
+                )
+
     def _test_collect_filter_archive_ocp_logs(self):
         ##################################################
         # This test is incomplete and inactive because   #
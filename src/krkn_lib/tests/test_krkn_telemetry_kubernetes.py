@@ -1,16 +1,24 @@
 import base64
+import json
 import os
 import tempfile
+import threading
 import time
 import unittest
 import uuid
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
 
 import boto3
 import yaml
+from moto import mock_aws
 
 from krkn_lib.models.krkn import ChaosRunAlert, ChaosRunAlertSummary
 from krkn_lib.models.telemetry import ChaosRunTelemetry, ScenarioTelemetry
+from krkn_lib.telemetry.k8s import KrknTelemetryKubernetes
 from krkn_lib.tests import BaseTest
+from krkn_lib.utils import SafeLogger
 
 
 class KrknTelemetryKubernetesTests(BaseTest):
@@ -183,9 +191,14 @@ class KrknTelemetryKubernetesTests(BaseTest):
             archive_part_size=100,
             download_path=test_workdir,
         )
-        self.lib_telemetry_k8s.put_prometheus_data(
+        upload_result = self.lib_telemetry_k8s.put_prometheus_data(
             telemetry_config, file_list, bucket_folder
         )
+        self.assertTrue(upload_result.success)
+        self.assertEqual(len(upload_result.files), len(file_list))
+        for file in upload_result.files:
+            self.assertGreaterEqual(file.attempts, 1)
+            self.assertGreater(file.size, 0)
 
         s3 = boto3.client("s3")
         bucket_name = os.getenv("BUCKET_NAME")
@@ -196,6 +209,61 @@ class KrknTelemetryKubernetesTests(BaseTest):
         )
         self.assertEqual(len(remote_files["Contents"]), len(file_list))
 
+    def test_backup_prometheus_data(self):
+        namespace = "test-" + self.get_random_string(10)
+        self.deploy_namespace(namespace, [])
+        self.deploy_fedtools(namespace=namespace)
+        self.wait_pod("fedtools", namespace)
+        self.lib_k8s.exec_cmd_in_pod(
+            [
+                "mkdir /test && dd if=/dev/urandom of=/test/test.bin "
+                "bs=1024 count=1000"
+            ],
+            "fedtools",
+            namespace,
+            "fedtools",
+        )
+        bucket_folder = f"{int(time.time())}"
+        test_workdir = os.path.join(
+            os.getenv("TEST_WORKDIR"), self.get_random_string(10)
+        )
+        os.mkdir(test_workdir)
+        telemetry_config = {
+            "username": os.getenv("API_USER"),
+            "password": os.getenv("API_PASSWORD"),
+            "max_retries": 5,
+            "api_url": "https://9ead3157ti.execute-api.us-west-2.amazonaws.com/dev",  # NOQA
+            "backup_threads": 3,
+            "archive_path": test_workdir,
+            "archive_size": 100,
+            "prometheus_backup": True,
+            "full_prometheus_backup": True,
+            "prometheus_pipeline_queue_size": 1,
+            "telemetry_group": "default",
+        }
+        upload_result = self.lib_telemetry_k8s.backup_prometheus_data(
+            telemetry_config,
+            bucket_folder,
+            "fedtools",
+            "fedtools",
+            namespace,
+            remote_archive_path="/tmp",
+        )
+        self.assertTrue(upload_result.success)
+        # 1000k archive split in 100k volumes
+        self.assertGreaterEqual(len(upload_result.uploaded_files), 10)
+        # volumes are deleted once uploaded
+        self.assertEqual(os.listdir(test_workdir), [])
+        s3 = boto3.client("s3")
+        remote_files = s3.list_objects_v2(
+            Bucket=os.getenv("BUCKET_NAME"),
+            Prefix=f'{telemetry_config["telemetry_group"]}/{bucket_folder}',
+        )
+        self.assertEqual(
+            len(remote_files["Contents"]), len(upload_result.uploaded_files)
+        )
+        self.pod_delete_queue.put(["fedtools", namespace])
+
     def test_collect_cluster_metadata(self):
         chaos_telemetry = ChaosRunTelemetry()
         self.assertEqual(len(chaos_telemetry.node_summary_infos), 0)
@@ -321,6 +389,437 @@ class KrknTelemetryKubernetesTests(BaseTest):
             except Exception as e:
                 self.assertTrue(False, f"test failed with exception: {str(e)}")
 
+    def test_get_bucket_urls_for_filenames(self):
+        test_workdir = f"default/test_folder/{int(time.time())}"
+        api_url = "https://9ead3157ti.execute-api.us-west-2.amazonaws.com/dev"  # NOQA
+        remote_filenames = [f"test-{i:02d}.log" for i in range(5)]
+        urls = self.lib_telemetry_k8s.get_bucket_urls_for_filenames(
+            f"{api_url}/presigned-urls",
+            test_workdir,
+            remote_filenames,
+            os.getenv("API_USER"),
+            os.getenv("API_PASSWORD"),
+            batch_size=2,
+        )
+        # if the batch endpoint is not available the urls
+        # must be requested one by one
+        for filename in remote_filenames:
+            if filename not in urls:
+                urls[filename] = (
+                    self.lib_telemetry_k8s.get_bucket_url_for_filename(
+                        f"{api_url}/presigned-url",
+                        test_workdir,
+                        filename,
+                        os.getenv("API_USER"),
+                        os.getenv("API_PASSWORD"),
+                    )
+                )
+        with tempfile.NamedTemporaryFile() as file:
+            file.write(self.get_random_string(100).encode("utf-8"))
+            file.flush()
+            for filename in remote_filenames:
+                self.lib_telemetry_k8s.put_file_to_url(
+                    urls[filename], file.name
+                )
+        s3 = boto3.client("s3")
+        remote_files = s3.list_objects_v2(
+            Bucket=os.getenv("BUCKET_NAME"), Prefix=test_workdir
+        )
+        self.assertEqual(
+            sorted([f["Key"] for f in remote_files["Contents"]]),
+            [f"{test_workdir}/{filename}" for filename in remote_filenames],
+        )
+        # batch endpoint disabled
+        self.assertEqual(
+            self.lib_telemetry_k8s.get_bucket_urls_for_filenames(
+                f"{api_url}/presigned-urls",
+                test_workdir,
+                remote_filenames,
+                os.getenv("API_USER"),
+                os.getenv("API_PASSWORD"),
+                batch_size=0,
+            ),
+            {},
+        )
+
+    def test_get_http_session(self):
+        session = self.lib_telemetry_k8s.get_http_session()
+        self.assertIs(session, self.lib_telemetry_k8s.get_http_session())
+        # each thread has its own session
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            thread_session = executor.submit(
+                self.lib_telemetry_k8s.get_http_session
+            ).result()
+        self.assertIsNot(session, thread_session)
+
+
+class FakeTelemetryApiHandler(BaseHTTPRequestHandler):
+    """
+    Telemetry API stand-in that presigns the uploads
+    on a moto mocked S3 bucket
+    """
+
+    s3 = None
+    bucket_name = None
+    calls: list[str] = []
+    broken_part = False
+    multipart_supported = True
+    # remote filenames of each batch presigned url request
+    # and number of objects in the bucket when requested
+    presigned_url_batches: list[tuple[list[str], int]] = []
+    # remote filenames requested to the single presigned url endpoint
+    presigned_url_filenames: list[str] = []
+    # remote filenames on which the endpoint fails once
+    failing_filenames: set[str] = set()
+
+    def log_message(self, format, *args):
+        pass
+
+    def __reply(self, body: str, status: int = 200):
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body.encode())
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        self.calls.append(url.path)
+        remote_filename = params["remote_filename"][0]
+        self.presigned_url_filenames.append(remote_filename)
+        if remote_filename in self.failing_filenames:
+            self.failing_filenames.remove(remote_filename)
+            self.__reply("", 500)
+            return
+        self.__reply(
+            self.s3.generate_presigned_url(
+                "put_object",
+                Params={
+                    "Bucket": self.bucket_name,
+                    "Key": f"{params['request_id'][0]}/{remote_filename}",
+                },
+            )
+        )
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.calls.append(self.path)
+        if self.path == "/presigned-urls":
+            self.presigned_url_batches.append(
+                (
+                    body["remote_filenames"],
+                    self.s3.list_objects_v2(Bucket=self.bucket_name)[
+                        "KeyCount"
+                    ],
+                )
+            )
+            self.__reply(
+                json.dumps(
+                    {
+                        filename: self.s3.generate_presigned_url(
+                            "put_object",
+                            Params={
+                                "Bucket": self.bucket_name,
+                                "Key": f"{body['request_id']}/{filename}",
+                            },
+                        )
+                        for filename in body["remote_filenames"]
+                    }
+                )
+            )
+            return
+        key = f"{body['request_id']}/{body['remote_filename']}"
+        if not self.multipart_supported:
+            self.__reply("", 404)
+        elif self.path == "/multipart-upload":
+            upload_id = self.s3.create_multipart_upload(
+                Bucket=self.bucket_name, Key=key
+            )["UploadId"]
+            urls = [
+                self.s3.generate_presigned_url(
+                    "upload_part",
+                    Params={
+                        "Bucket": self.bucket_name,
+                        "Key": key,
+                        "UploadId": (
+                            "does-not-exist"
+                            if self.broken_part and part == body["parts"]
+                            else upload_id
+                        ),
+                        "PartNumber": part,
+                    },
+                )
+                for part in range(1, body["parts"] + 1)
+            ]
+            self.__reply(json.dumps({"upload_id": upload_id, "urls": urls}))
+        elif self.path == "/multipart-upload/complete":
+            self.s3.complete_multipart_upload(
+                Bucket=self.bucket_name,
+                Key=key,
+                UploadId=body["upload_id"],
+                MultipartUpload={
+                    "Parts": [
+                        {
+                            "PartNumber": part["part_number"],
+                            "ETag": part["etag"],
+                        }
+                        for part in body["parts"]
+                    ]
+                },
+            )
+            self.__reply("")
+        elif self.path == "/multipart-upload/abort":
+            self.s3.abort_multipart_upload(
+                Bucket=self.bucket_name, Key=key, UploadId=body["upload_id"]
+            )
+            self.__reply("")
+        else:
+            self.__reply("", 404)
+
+
+@mock_aws
+class KrknTelemetryMultipartUploadTests(unittest.TestCase):
+    def setUp(self):
+        self.s3 = boto3.client("s3", region_name="us-east-1")
+        self.s3.create_bucket(Bucket="krkn-lib-test")
+        FakeTelemetryApiHandler.s3 = self.s3
+        FakeTelemetryApiHandler.bucket_name = "krkn-lib-test"
+        FakeTelemetryApiHandler.calls = []
+        FakeTelemetryApiHandler.broken_part = False
+        FakeTelemetryApiHandler.multipart_supported = True
+        FakeTelemetryApiHandler.presigned_url_batches = []
+        FakeTelemetryApiHandler.presigned_url_filenames = []
+        FakeTelemetryApiHandler.failing_filenames = set()
+        self.server = ThreadingHTTPServer(
+            ("127.0.0.1", 0), FakeTelemetryApiHandler
+        )
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.api_url = f"http://127.0.0.1:{self.server.server_port}"
+        self.lib_telemetry = KrknTelemetryKubernetes(SafeLogger(), None)
+        self.part_size = 5 * 1024 * 1024
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def get_object(self, key: str) -> bytes:
+        return self.s3.get_object(Bucket="krkn-lib-test", Key=key)[
+            "Body"
+        ].read()
+
+    def test_put_file_to_url_multipart(self):
+        with tempfile.NamedTemporaryFile() as file:
+            data = os.urandom(2 * self.part_size + 1024)
+            file.write(data)
+            file.flush()
+            self.lib_telemetry.put_file_to_url_multipart(
+                f"{self.api_url}/multipart-upload",
+                "default",
+                "prometheus-00.tar",
+                file.name,
+                "user",
+                "password",
+                self.part_size,
+                max_threads=3,
+            )
+            self.assertEqual(
+                FakeTelemetryApiHandler.calls,
+                ["/multipart-upload", "/multipart-upload/complete"],
+            )
+            self.assertEqual(
+                self.get_object("default/prometheus-00.tar"), data
+            )
+
+            # a part failing aborts the upload
+            FakeTelemetryApiHandler.calls = []
+            FakeTelemetryApiHandler.broken_part = True
+            with self.assertRaises(Exception):
+                self.lib_telemetry.put_file_to_url_multipart(
+                    f"{self.api_url}/multipart-upload",
+                    "default",
+                    "prometheus-01.tar",
+                    file.name,
+                    "user",
+                    "password",
+                    self.part_size,
+                    max_part_retries=0,
+                )
+            self.assertEqual(
+                FakeTelemetryApiHandler.calls,
+                ["/multipart-upload", "/multipart-upload/abort"],
+            )
+            self.assertEqual(
+                self.s3.list_multipart_uploads(Bucket="krkn-lib-test").get(
+                    "Uploads", []
+                ),
+                [],
+            )
+
+    def test_upload_file_to_bucket(self):
+        with tempfile.NamedTemporaryFile() as small_file:
+            small_data = os.urandom(1024)
+            small_file.write(small_data)
+            small_file.flush()
+            self.lib_telemetry.upload_file_to_bucket(
+                f"{self.api_url}/presigned-url",
+                "default",
+                "small.tar",
+                small_file.name,
+                "user",
+                "password",
+                multipart_api_url=f"{self.api_url}/multipart-upload",
+                multipart_part_size=self.part_size,
+            )
+        self.assertEqual(FakeTelemetryApiHandler.calls, ["/presigned-url"])
+        self.assertEqual(self.get_object("default/small.tar"), small_data)
+
+        FakeTelemetryApiHandler.calls = []
+        with tempfile.NamedTemporaryFile() as big_file:
+            big_data = os.urandom(self.part_size + 1024)
+            big_file.write(big_data)
+            big_file.flush()
+            self.lib_telemetry.upload_file_to_bucket(
+                f"{self.api_url}/presigned-url",
+                "default",
+                "big.tar",
+                big_file.name,
+                "user",
+                "password",
+                multipart_api_url=f"{self.api_url}/multipart-upload",
+                multipart_part_size=self.part_size,
+            )
+        self.assertEqual(
+            FakeTelemetryApiHandler.calls,
+            ["/multipart-upload", "/multipart-upload/complete"],
+        )
+        self.assertEqual(self.get_object("default/big.tar"), big_data)
+
+    def test_put_prometheus_data_presigned_url_batches(self):
+        volumes = []
+        data = {}
+        with tempfile.TemporaryDirectory() as archive_dir:
+            for i in range(5):
+                filename = os.path.join(archive_dir, f"prometheus-{i:02d}.tar")
+                data[i] = os.urandom(1024)
+                with open(filename, "wb") as volume:
+                    volume.write(data[i])
+                volumes.append((i, filename))
+            result = self.lib_telemetry.put_prometheus_data(
+                {
+                    "prometheus_backup": True,
+                    "api_url": self.api_url,
+                    "username": "user",
+                    "password": "password",
+                    "backup_threads": 1,
+                    "max_retries": 0,
+                    "presigned_url_batch_size": 2,
+                },
+                volumes,
+                "request-id",
+            )
+        self.assertTrue(result.success)
+        for i in range(5):
+            self.assertEqual(
+                self.get_object(f"default/request-id/prometheus-{i:02d}.tar"),
+                data[i],
+            )
+        # the urls are requested batch by batch as the volumes
+        # are uploaded, not all at once before the upload
+        self.assertEqual(
+            FakeTelemetryApiHandler.presigned_url_batches,
+            [
+                (["prometheus-00.tar", "prometheus-01.tar"], 0),
+                (["prometheus-02.tar", "prometheus-03.tar"], 2),
+                (["prometheus-04.tar"], 4),
+            ],
+        )
+        self.assertNotIn("/presigned-url", FakeTelemetryApiHandler.calls)
+
+    def test_backup_prometheus_data_retries(self):
+        data = {}
+        with tempfile.TemporaryDirectory() as archive_dir:
+
+            def get_prometheus_pod_data(*args, on_part_downloaded, **kwargs):
+                for i in range(3):
+                    filename = os.path.join(
+                        archive_dir, f"prometheus-{i:02d}.tar"
+                    )
+                    data[i] = os.urandom(1024)
+                    with open(filename, "wb") as volume:
+                        volume.write(data[i])
+                    on_part_downloaded(i, filename)
+
+            self.lib_telemetry.get_prometheus_pod_data = (
+                get_prometheus_pod_data
+            )
+            FakeTelemetryApiHandler.failing_filenames = {"prometheus-00.tar"}
+            result = self.lib_telemetry.backup_prometheus_data(
+                {
+                    "api_url": self.api_url,
+                    "username": "user",
+                    "password": "password",
+                    "backup_threads": 1,
+                    "max_retries": 3,
+                    "prometheus_pipeline_queue_size": 1,
+                },
+                "request-id",
+                "prometheus",
+                "prometheus",
+                "monitoring",
+            )
+            self.assertEqual(os.listdir(archive_dir), [])
+        self.assertTrue(result.success)
+        self.assertEqual(
+            [(f.remote_filename, f.attempts) for f in result.files],
+            [
+                ("prometheus-00.tar", 2),
+                ("prometheus-01.tar", 1),
+                ("prometheus-02.tar", 1),
+            ],
+        )
+        for i in range(3):
+            self.assertEqual(
+                self.get_object(f"default/request-id/prometheus-{i:02d}.tar"),
+                data[i],
+            )
+        # the upload thread didn't wait for the retry of the first volume
+        self.assertEqual(
+            FakeTelemetryApiHandler.presigned_url_filenames,
+            [
+                "prometheus-00.tar",
+                "prometheus-01.tar",
+                "prometheus-02.tar",
+                "prometheus-00.tar",
+            ],
+        )
+
+    def test_upload_file_to_bucket_multipart_not_supported(self):
+        FakeTelemetryApiHandler.multipart_supported = False
+        with tempfile.NamedTemporaryFile() as big_file:
+            big_data = os.urandom(self.part_size + 1024)
+            big_file.write(big_data)
+            big_file.flush()
+            for remote_filename in ["big-00.tar", "big-01.tar"]:
+                self.lib_telemetry.upload_file_to_bucket(
+                    f"{self.api_url}/presigned-url",
+                    "default",
+                    remote_filename,
+                    big_file.name,
+                    "user",
+                    "password",
+                    multipart_api_url=f"{self.api_url}/multipart-upload",
+                    multipart_part_size=self.part_size,
+                )
+                self.assertEqual(
+                    self.get_object(f"default/{remote_filename}"), big_data
+                )
+        # the multipart endpoint is not requested anymore
+        # once the API replied that it's not supported
+        self.assertEqual(
+            FakeTelemetryApiHandler.calls,
+            ["/multipart-upload", "/presigned-url", "/presigned-url"],
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
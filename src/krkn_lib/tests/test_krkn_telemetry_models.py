@@ -422,6 +422,29 @@ class KrknTelemetryModelsTests(unittest.TestCase):
         self.assertEqual(event.involved_object_namespace, "default")
         self.assertEqual(event.type, "Normal")
 
+        events_v1_event = client.EventsV1Event(
+            note=json_dict["message"],
+            reason=json_dict["reason"],
+            type=json_dict["type"],
+            event_time=json_dict["creation"],
+            regarding=v1_object_reference,
+            reporting_controller=json_dict["source_component"],
+            metadata=metadata,
+        )  # EventsV1Event
+
+        event = ClusterEvent(k8s_events_obj=events_v1_event)
+
+        self.assertEqual(event.name, "test")
+        self.assertEqual(event.creation, "2024-09-02T14:00:53Z")
+        self.assertEqual(event.reason, "Failed")
+        self.assertEqual(event.message, "message")
+        self.assertEqual(event.namespace, "default")
+        self.assertEqual(event.source_component, "kubelet")
+        self.assertEqual(event.involved_object_kind, "Pod")
+        self.assertEqual(event.involved_object_name, "test")
+        self.assertEqual(event.involved_object_namespace, "default")
+        self.assertEqual(event.type, "Normal")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -1,24 +1,51 @@
 import base64
 import datetime
+import gzip
+import json
 import os
 import re
+import shutil
+import tarfile
 import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from queue import Queue
 
+import numpy as np
 import yaml
+from dateutil import parser
+from dateutil.parser import ParserError
 from dateutil.tz import tzutc
 
 import krkn_lib.utils as utils
 from krkn_lib.tests import BaseTest
 from krkn_lib.utils import (
+    AdaptiveConcurrencyController,
+    FileSliceReader,
+    LogTimestampMatcher,
+    ParallelGzipWriter,
+    RetryScheduler,
+    TimeWindow,
+    TransferProgressTracker,
     check_date_in_localized_interval,
     deep_set_attribute,
+    exponential_backoff_delay,
     filter_dictionary,
+    filter_log_file_worker,
+    filter_log_files,
+    filter_log_files_to_archive,
     filter_log_line,
     find_executable_in_path,
+    find_log_time_range,
+    get_filtered_log_file_name,
     get_junit_test_case,
     get_random_string,
     get_yaml_item_value,
     is_host_reachable,
+    parse_log_timestamp,
+    split_file_on_lines,
 )
 
 
@@ -45,6 +72,34 @@ class UtilFunctionTests(BaseTest):
                 self.assertEqual(test_string, test_read)
                 self.assertEqual(test_string, test_read)
 
+    def test_gzip_file(self):
+        with tempfile.TemporaryDirectory() as test_workdir:
+            source = os.path.join(test_workdir, "test.tar")
+            destination = os.path.join(test_workdir, "test.tar.gz")
+            content = b"prometheus" * 100000
+            with open(source, "wb") as source_file:
+                source_file.write(content)
+            utils.gzip_file(source, destination)
+            self.assertLess(
+                os.stat(destination).st_size, os.stat(source).st_size
+            )
+            with gzip.open(destination, "rb") as destination_file:
+                self.assertEqual(destination_file.read(), content)
+
+    def test_get_archive_extension(self):
+        self.assertEqual(utils.get_archive_extension("a/b-00.tar"), ".tar")
+        self.assertEqual(
+            utils.get_archive_extension("a/b-00.tar.gz"), ".tar.gz"
+        )
+        self.assertEqual(
+            utils.get_archive_extension("a/b-00.tar.zst.b64"), ".tar.zst"
+        )
+        self.assertEqual(
+            utils.get_archive_extension("a/b-00.shards.tar.gz"),
+            ".shards.tar.gz",
+        )
+        self.assertEqual(utils.get_archive_extension("a/b.json"), ".json")
+
     def test_deep_set_attribute(self):
         deep_yaml = """
             test:
@@ -155,6 +210,75 @@ class UtilFunctionTests(BaseTest):
             )
         )
 
+    def test_time_window(self):
+        now = 1696408614  # Wednesday, October 4, 2023 8:36:54 AM
+        in_ten_minutes = 1696409214  # Wednesday, October 4, 2023 8:46:54 AM
+        ten_minutes_ago = 1696408014  # Wednesday, October 4, 2023 8:26:54 AM
+        yesterday = 1696322214  # Tuesday, October 3, 2023 8:36:54 AM
+        tomorrow = 1696495014  # Thursday, October 5, 2023 8:36:54 AM
+        timestamps = [
+            yesterday,
+            ten_minutes_ago,
+            now,
+            in_ten_minutes,
+            tomorrow,
+        ]
+
+        window = TimeWindow(ten_minutes_ago, in_ten_minutes)
+        self.assertTrue(window.contains(now))
+        # bounds included
+        self.assertTrue(window.contains(ten_minutes_ago))
+        self.assertTrue(window.contains(in_ten_minutes))
+        self.assertFalse(window.contains(yesterday))
+        self.assertFalse(window.contains(tomorrow))
+        self.assertFalse(window.contains(None))
+        self.assertTrue(TimeWindow(None, in_ten_minutes).contains(yesterday))
+        self.assertTrue(TimeWindow(ten_minutes_ago, None).contains(tomorrow))
+        self.assertTrue(TimeWindow().contains(now))
+
+        self.assertTrue(
+            window.contains_date(
+                datetime.datetime.fromtimestamp(now, tz=tzutc())
+            )
+        )
+        self.assertFalse(
+            window.contains_date(
+                datetime.datetime.fromtimestamp(yesterday, tz=tzutc())
+            )
+        )
+        self.assertFalse(window.contains_date(None))
+
+        # vectorized check, missing timestamps never match
+        self.assertEqual(
+            window.contains_all(timestamps + [None, float("nan")]).tolist(),
+            [False, True, True, True, False, False, False],
+        )
+        self.assertEqual(
+            window.contains_all(np.array(timestamps)).tolist(),
+            [False, True, True, True, False],
+        )
+        self.assertEqual(
+            TimeWindow().contains_all([now, None]).tolist(), [True, False]
+        )
+        self.assertEqual(len(window.contains_all([])), 0)
+
+        # same results of check_date_in_localized_interval
+        for start, end in [
+            (ten_minutes_ago, in_ten_minutes),
+            (None, now),
+            (now, None),
+            (None, None),
+        ]:
+            window = TimeWindow(start, end)
+            for timestamp, contained in zip(
+                timestamps, window.contains_all(timestamps)
+            ):
+                expected = check_date_in_localized_interval(
+                    start, end, timestamp, "UTC", "Europe/Rome"
+                )
+                self.assertEqual(window.contains(timestamp), expected)
+                self.assertEqual(bool(contained), expected)
+
     def test_filter_file_log(self):
         pattern = re.compile(r"(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d+Z).+")
         logs = [
@@ -221,6 +345,16 @@ class UtilFunctionTests(BaseTest):
             )
         )
 
+        # the matcher of the patterns is built once for each thread
+        get_matcher = utils.functions._get_log_timestamp_matcher
+        get_matcher.cache_clear()
+        for log in logs:
+            filter_log_line(
+                log, start_timestamp, None, "UTC", "Europe/Rome", [pattern]
+            )
+        self.assertEqual(get_matcher.cache_info().misses, 1)
+        self.assertEqual(get_matcher.cache_info().hits, len(logs) - 1)
+
         # if a pattern do not contains a group will raise an exception
         broken_pattern_no_group = re.compile(
             r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d+Z.+"
@@ -254,6 +388,93 @@ class UtilFunctionTests(BaseTest):
                 )
             )
 
+    def test_log_timestamp_matcher(self):
+        patterns = [
+            # Sep 9 11:20:36.123425532
+            r"(\w{3}\s\d{1,2}\s\d{2}:\d{2}:\d{2}\.\d+).+",
+            # kinit 2023/09/15 11:20:36 log
+            r"kinit (\d+/\d+/\d+\s\d{2}:\d{2}:\d{2})\s+",
+            # 2023-09-15T11:20:36.123425532Z log
+            r"(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d+Z).+",
+        ]
+        lines = [
+            "Sep 9 11:20:36.123425532 log",
+            "kinit 2023/09/15 11:20:36 log",
+            "2023-09-15T11:20:36.123425532Z log",
+            "2023-09-15T11:20:37.123425532Z log",
+            "Sep 9 11:20:37.123425532 log",
+            "no date",
+        ]
+
+        def match_each(line: str):
+            for pattern in map(re.compile, patterns):
+                match = pattern.match(line)
+                if match:
+                    return match.group(1), pattern
+            return None
+
+        matcher = LogTimestampMatcher(patterns)
+        for line in lines:
+            self.assertEqual(matcher.match(line), match_each(line), line)
+        # the previous pattern is tried first
+        ambiguous = [r"(\d+) .+", r"(\d+)"]
+        matcher = LogTimestampMatcher(ambiguous)
+        self.assertEqual(matcher.match("10")[0], "10")
+        self.assertEqual(matcher.match("11 log")[1].pattern, r"(\d+)")
+        matcher.reset()
+        self.assertEqual(matcher.match("11 log")[1].pattern, r"(\d+) .+")
+
+        # patterns that can't be combined are tried one by one
+        matcher = LogTimestampMatcher(
+            [r"(?P<date>\d{4}) a", r"(?P<date>\d{2}) b", r"(?i)(x)(?:\1)"]
+        )
+        self.assertEqual(matcher.match("2023 a")[0], "2023")
+        self.assertEqual(matcher.match("23 b")[0], "23")
+        self.assertEqual(matcher.match("XX")[0], "X")
+        self.assertIsNone(matcher.match("no date"))
+
+        # the patterns are validated when the matcher is built
+        with self.assertRaises(Exception):
+            LogTimestampMatcher([patterns[0], r"(\d+)-(\d+)"])
+        with self.assertRaises(Exception):
+            LogTimestampMatcher([r"\d+"])
+
+    def test_parse_log_timestamp(self):
+        year = datetime.date.today().year
+        dates = [
+            "2023-09-15T11:20:36.123425532Z",
+            "2023-09-15T11:20:36+02:00",
+            "2023-09-15T11:20:36.5-0530",
+            "2023-09-15 11:20:36 +0000",
+            "2023-09-15T11:20:36",
+            "2023/09/15 11:20:36",
+            "Sep 9 11:20:36.123425532",
+            "Sep  9 11:20:36",
+            # dateutil fallback
+            "Friday, September 15, 2023 11:20:36 UTC",
+            "15 Sep 2023 11:20:36 GMT",
+        ]
+        for date in dates:
+            self.assertEqual(
+                parse_log_timestamp(date, "pattern"),
+                int(parser.parse(date).timestamp()),
+                date,
+            )
+        # klog dates are not parsed correctly by dateutil
+        self.assertEqual(
+            parse_log_timestamp("I0915 11:20:36.123456"),
+            int(datetime.datetime(year, 9, 15, 11, 20, 36).timestamp()),
+        )
+        self.assertEqual(
+            parse_log_timestamp("0915 11:20:36"),
+            int(datetime.datetime(year, 9, 15, 11, 20, 36).timestamp()),
+        )
+        # invalid dates and formats are reported as dateutil does
+        with self.assertRaises(ParserError):
+            parse_log_timestamp("2023-02-30T11:20:36Z", "pattern")
+        with self.assertRaises(ParserError):
+            parse_log_timestamp("not a date", "pattern")
+
     def test_filter_dictionary(self):
         event = {
             "apiVersion": "v1",
@@ -410,3 +631,659 @@ class UtilFunctionTests(BaseTest):
             success_output_not_test_version, success_test_not_test_version
         )
         self.assertEqual(failure_output, failure_test)
+
+    def test_adaptive_concurrency_controller(self):
+        with self.assertRaises(Exception):
+            AdaptiveConcurrencyController(max_concurrency=0)
+        with self.assertRaises(Exception):
+            AdaptiveConcurrencyController(
+                max_concurrency=4, multiplicative_decrease=1
+            )
+
+        samples = []
+        controller = AdaptiveConcurrencyController(
+            max_concurrency=8,
+            initial_concurrency=2,
+            sample_interval=0.1,
+            on_sample=samples.append,
+        )
+        self.assertEqual(controller.concurrency, 2)
+        max_in_flight = [0]
+        lock = threading.Lock()
+
+        def task(error: bool):
+            controller.acquire()
+            with lock:
+                max_in_flight[0] = max(max_in_flight[0], controller.in_flight)
+            time.sleep(0.01)
+            controller.release(0 if error else 1024, error=error)
+
+        # saturated without errors: additive increase up to the maximum
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            for _ in range(800):
+                executor.submit(task, False)
+        self.assertEqual(controller.concurrency, 8)
+        self.assertLessEqual(max_in_flight[0], 8)
+        history = controller.get_history()
+        self.assertEqual(history, samples)
+        self.assertEqual(history[0].concurrency, 3)
+        self.assertGreater(history[0].throughput, 0)
+        self.assertEqual(history[0].error_rate, 0)
+
+        # all the tasks failing: multiplicative decrease
+        # down to the minimum
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            for _ in range(200):
+                executor.submit(task, True)
+        self.assertEqual(controller.concurrency, 1)
+        self.assertEqual(controller.in_flight, 0)
+        self.assertEqual(controller.get_history()[-1].error_rate, 1)
+
+    def test_exponential_backoff_delay(self):
+        self.assertEqual(
+            exponential_backoff_delay(0, base_delay=1, jitter=0), 1
+        )
+        self.assertEqual(
+            exponential_backoff_delay(3, base_delay=1, jitter=0), 8
+        )
+        self.assertEqual(
+            exponential_backoff_delay(10, base_delay=1, max_delay=5, jitter=0),
+            5,
+        )
+        for _ in range(100):
+            delay = exponential_backoff_delay(2, base_delay=1, jitter=0.5)
+            self.assertGreaterEqual(delay, 2)
+            self.assertLessEqual(delay, 4)
+
+    def test_retry_scheduler(self):
+        queue = Queue()
+        scheduler = RetryScheduler(queue, base_delay=0.2, jitter=0)
+        queue.put("item")
+        item = queue.get()
+        start = time.time()
+        # scheduled instead of task_done()
+        self.assertEqual(scheduler.schedule(item, 1), 0.4)
+        self.assertEqual(scheduler.pending, 1)
+        self.assertTrue(queue.empty())
+        # the task is still pending until re-enqueued
+        self.assertEqual(queue.unfinished_tasks, 1)
+        self.assertEqual(queue.get(timeout=2), "item")
+        self.assertGreaterEqual(time.time() - start, 0.4)
+        self.assertEqual(scheduler.pending, 0)
+        self.assertEqual(queue.unfinished_tasks, 1)
+        queue.task_done()
+        queue.join()
+
+        # items are re-enqueued by due time
+        for item, retry in [("late", 3), ("early", 0)]:
+            queue.put(item)
+            queue.get()
+            scheduler.schedule(item, retry)
+        self.assertEqual(queue.get(timeout=2), "early")
+        # stop re-enqueues the waiting items immediately
+        scheduler.stop()
+        self.assertEqual(queue.get_nowait(), "late")
+        with self.assertRaises(Exception):
+            scheduler.schedule("item", 0)
+
+        # on a full bounded queue the due items wait for a free
+        # slot without blocking the scheduling of the other items
+        queue = Queue(maxsize=1)
+        scheduler = RetryScheduler(queue, base_delay=0.01, jitter=0)
+        for item in ["first", "second"]:
+            queue.put(item)
+            queue.get()
+        queue.put("full")
+        scheduler.schedule("first", 0)
+        time.sleep(0.1)
+        schedule_thread = threading.Thread(
+            target=scheduler.schedule, args=("second", 0), daemon=True
+        )
+        schedule_thread.start()
+        schedule_thread.join(timeout=1)
+        self.assertFalse(schedule_thread.is_alive())
+        self.assertEqual(
+            [queue.get(timeout=2) for _ in range(3)],
+            ["full", "first", "second"],
+        )
+        for _ in range(3):
+            queue.task_done()
+        queue.join()
+        scheduler.stop()
+
+    def test_transfer_progress_tracker(self):
+        callbacks = []
+        tracker = TransferProgressTracker(
+            on_progress=callbacks.append, callback_interval=60
+        )
+        tracker.set_totals("download", parts=4, total_bytes=400)
+        progress = tracker.get_progress("download")
+        self.assertEqual(progress.parts_total, 4)
+        self.assertEqual(progress.bytes_transferred, 0)
+        self.assertIsNone(progress.eta)
+
+        def download(part: int):
+            tracker.start_part("download", part)
+            time.sleep(0.1)
+            tracker.add_bytes("download", 50)
+            tracker.finish_part("download", part, nbytes=50)
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            list(executor.map(download, range(3)))
+        progress = tracker.get_progress("download")
+        self.assertEqual(progress.parts_completed, 3)
+        self.assertEqual(progress.parts_failed, 0)
+        self.assertEqual(progress.bytes_transferred, 300)
+        self.assertGreater(progress.throughput, 0)
+        self.assertGreater(progress.eta, 0)
+        self.assertEqual(len(progress.thread_throughput), 2)
+        self.assertEqual(len(progress.part_latencies), 3)
+        self.assertGreaterEqual(progress.average_part_latency, 0.1)
+        self.assertGreaterEqual(
+            progress.max_part_latency, progress.average_part_latency
+        )
+        # one callback for the first bytes and one for each part
+        self.assertEqual(len(callbacks), 4)
+        self.assertEqual(callbacks[-1].parts_completed, 3)
+
+        with self.assertRaises(Exception):
+            with tracker.track_part("download", 3):
+                raise Exception("failed")
+        progress = tracker.get_progress("download")
+        self.assertEqual(progress.parts_failed, 1)
+        self.assertEqual(progress.eta, 0)
+
+        with tracker.track_part("decode", 0):
+            tracker.add_bytes("decode", 10)
+        snapshot = json.loads(tracker.to_json())
+        self.assertEqual(set(snapshot.keys()), {"download", "decode"})
+        self.assertEqual(snapshot["decode"]["bytes_transferred"], 10)
+        self.assertEqual(snapshot["decode"]["parts_completed"], 1)
+
+        metrics = tracker.to_prometheus()
+        self.assertIn("# TYPE krkn_transfer_bytes_total counter", metrics)
+        self.assertIn(
+            'krkn_transfer_bytes_total{stage="download"} 300', metrics
+        )
+        self.assertIn(
+            'krkn_transfer_parts_failed_total{stage="download"} 1', metrics
+        )
+        self.assertIn(
+            'krkn_transfer_parts_expected{stage="download"} 4', metrics
+        )
+        self.assertIn(
+            'krkn_transfer_part_latency_seconds{stage="decode",part="0"}',
+            metrics,
+        )
+
+    def create_synthetic_must_gather(
+        self, files: int, lines: int, start_timestamp: int
+    ) -> str:
+        src_dir = tempfile.mkdtemp()
+        for i in range(files):
+            log_dir = os.path.join(
+                src_dir,
+                "namespaces",
+                f"ns-{i % 3}",
+                "pods",
+                f"pod-{i}",
+                "logs",
+            )
+            os.makedirs(log_dir)
+            with open(os.path.join(log_dir, "current.log"), "w") as log:
+                for line in range(lines):
+                    date = datetime.datetime.fromtimestamp(
+                        start_timestamp + line, tz=datetime.timezone.utc
+                    )
+                    log.write(
+                        f"{date.strftime('%Y-%m-%dT%H:%M:%S.%fZ')} "
+                        f'level=info msg="line {line} of pod-{i}"\n'
+                    )
+                    if line % 10 == 0:
+                        log.write("\tcontinuation line without date\n")
+        return src_dir
+
+    def filter_log_files_with_threads(
+        self,
+        src_dir: str,
+        dst_dir: str,
+        start_timestamp: int,
+        end_timestamp: int,
+        patterns: list[str],
+        threads: int,
+    ):
+        queue = Queue()
+        for file in Path(src_dir).rglob("*.log"):
+            queue.put(file)
+        for _ in range(threads):
+            threading.Thread(
+                target=filter_log_file_worker,
+                args=(
+                    start_timestamp,
+                    end_timestamp,
+                    src_dir,
+                    dst_dir,
+                    "UTC",
+                    "UTC",
+                    patterns,
+                    queue,
+                ),
+                daemon=True,
+            ).start()
+        queue.join()
+
+    def test_split_file_on_lines(self):
+        with tempfile.NamedTemporaryFile("w", delete=False) as file:
+            for i in range(100):
+                file.write(f"{i:0{i % 7 + 1}d}\n")
+        size = os.path.getsize(file.name)
+        self.assertEqual(split_file_on_lines(file.name, 0), [(0, size)])
+        self.assertEqual(split_file_on_lines(file.name, size), [(0, size)])
+        ranges = split_file_on_lines(file.name, 50)
+        self.assertGreater(len(ranges), 1)
+        self.assertEqual(ranges[0][0], 0)
+        self.assertEqual(ranges[-1][1], size)
+        with open(file.name, "rb") as read_file:
+            content = read_file.read()
+        lines = []
+        for start, end in ranges:
+            self.assertGreaterEqual(end - start, 50 if end < size else 1)
+            chunk = content[start:end]
+            # every range ends on a line boundary
+            self.assertTrue(chunk.endswith(b"\n"))
+            lines.extend(chunk.splitlines())
+        self.assertEqual(lines, content.splitlines())
+        os.unlink(file.name)
+
+    def test_filter_log_files(self):
+        start_timestamp = 1694777280
+        patterns = [r"(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d+Z).+"]
+        src_dir = self.create_synthetic_must_gather(4, 500, start_timestamp)
+        with open(
+            os.path.join(src_dir, "namespaces", "invalid.log"), "wb"
+        ) as invalid:
+            invalid.write(b"2023-09-15T11:28:00.000000000Z \xff\xfe\n")
+        # the line endings are translated as in text mode
+        with open(
+            os.path.join(src_dir, "namespaces", "crlf.log"), "wb"
+        ) as crlf:
+            crlf.write(
+                b"2023-09-15T11:29:40.000000000Z windows\r\n"
+                b"2023-09-15T11:29:41.000000000Z old mac\r"
+                b"2023-09-15T11:29:42.000000000Z unix\n"
+                b"2023-09-15T11:50:00.000000000Z out of range\r\n"
+            )
+        threads_dir = tempfile.mkdtemp()
+        processes_dir = tempfile.mkdtemp()
+        self.filter_log_files_with_threads(
+            src_dir,
+            threads_dir,
+            start_timestamp + 100,
+            start_timestamp + 199,
+            patterns,
+            2,
+        )
+        stats = filter_log_files(
+            list(Path(src_dir).rglob("*.log")),
+            src_dir,
+            processes_dir,
+            start_timestamp + 100,
+            start_timestamp + 199,
+            "UTC",
+            "UTC",
+            patterns,
+            processes=2,
+            shard_size=4096,
+        )
+        # same file names and content of the threaded filter
+        self.assertEqual(
+            sorted(os.listdir(processes_dir)),
+            sorted(
+                f
+                for f in os.listdir(threads_dir)
+                if f != "namespaces.invalid.log"
+            ),
+        )
+        for filename in os.listdir(processes_dir):
+            with open(os.path.join(processes_dir, filename), "rb") as filtered:
+                content = filtered.read()
+            with open(os.path.join(threads_dir, filename), "rb") as expected:
+                self.assertEqual(content, expected.read())
+            if filename == "namespaces.crlf.log":
+                self.assertEqual(
+                    content,
+                    b"2023-09-15T11:29:40.000000000Z windows\n"
+                    b"2023-09-15T11:29:41.000000000Z old mac\n"
+                    b"2023-09-15T11:29:42.000000000Z unix\n",
+                )
+            else:
+                self.assertEqual(len(content.splitlines()), 100)
+
+        self.assertEqual(len(stats), 6)
+        stats = {os.path.basename(s.source_file): s for s in stats}
+        self.assertIsNotNone(stats["invalid.log"].error)
+        self.assertIsNone(stats["invalid.log"].filtered_file)
+        del stats["invalid.log"]
+        self.assertEqual(stats["crlf.log"].lines_read, 4)
+        self.assertEqual(stats["crlf.log"].lines_matched, 3)
+        del stats["crlf.log"]
+        for file_stats in stats.values():
+            self.assertIsNone(file_stats.error)
+            self.assertGreater(file_stats.shards, 1)
+            self.assertEqual(file_stats.lines_read, 550)
+            self.assertEqual(file_stats.lines_matched, 100)
+            self.assertEqual(
+                file_stats.bytes_read, os.path.getsize(file_stats.source_file)
+            )
+            self.assertTrue(os.path.exists(file_stats.filtered_file))
+
+        with self.assertRaises(Exception):
+            filter_log_files(
+                [],
+                src_dir,
+                processes_dir,
+                None,
+                None,
+                "UTC",
+                "UTC",
+                [r"\d{4}-\d{2}-\d{2}"],
+            )
+        shutil.rmtree(src_dir)
+        shutil.rmtree(threads_dir)
+        shutil.rmtree(processes_dir)
+
+    def test_find_log_time_range(self):
+        start_timestamp = 1694777280
+        pattern = r"(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d+Z).+"
+        patterns = [re.compile(pattern)]
+        src_dir = self.create_synthetic_must_gather(3, 1000, start_timestamp)
+        log_files = list(Path(src_dir).rglob("*.log"))
+        with open(log_files[0], "rb") as log:
+            content = log.read()
+        for start, end in [
+            (start_timestamp + 100, start_timestamp + 199),
+            (None, start_timestamp + 10),
+            (start_timestamp + 990, None),
+            (start_timestamp - 100, start_timestamp - 1),
+            (start_timestamp + 2000, None),
+        ]:
+            time_range = find_log_time_range(
+                str(log_files[0]), start, end, patterns
+            )
+            range_start, range_end = time_range
+            lines = content[range_start:range_end].decode()
+            dated_lines = [
+                line
+                for line in lines.splitlines(keepends=True)
+                if not line.startswith("\t")
+            ]
+            expected = [
+                line
+                for line in content.decode().splitlines(keepends=True)
+                if filter_log_line(line, start, end, "UTC", "UTC", patterns)
+            ]
+            self.assertEqual(dated_lines, expected)
+            # the lines without date within the range are kept
+            self.assertGreaterEqual(
+                lines.count("\n"), len(expected) + len(expected) // 10
+            )
+
+        # not sorted files are not searched
+        with tempfile.NamedTemporaryFile("w", delete=False) as unsorted:
+            unsorted.writelines(
+                [
+                    "2023-09-15T11:28:00.000000Z first\n",
+                    "2023-09-15T11:20:00.000000Z second\n",
+                    "2023-09-15T11:30:00.000000Z third\n",
+                ]
+            )
+        self.assertIsNone(
+            find_log_time_range(unsorted.name, None, None, patterns)
+        )
+
+        # same dated lines filtered line by line
+        threads_dir = tempfile.mkdtemp()
+        binary_search_dir = tempfile.mkdtemp()
+        queue = Queue()
+        for file in log_files + [Path(unsorted.name)]:
+            queue.put(file)
+        filter_log_file_worker(
+            start_timestamp + 100,
+            start_timestamp + 199,
+            "/",
+            binary_search_dir,
+            "UTC",
+            "UTC",
+            [pattern],
+            queue,
+            binary_search=True,
+        )
+        for file in log_files + [Path(unsorted.name)]:
+            queue.put(file)
+        filter_log_file_worker(
+            start_timestamp + 100,
+            start_timestamp + 199,
+            "/",
+            threads_dir,
+            "UTC",
+            "UTC",
+            [pattern],
+            queue,
+        )
+        self.assertEqual(
+            sorted(os.listdir(binary_search_dir)),
+            sorted(os.listdir(threads_dir)),
+        )
+        for filename in os.listdir(threads_dir):
+            with open(os.path.join(binary_search_dir, filename)) as filtered:
+                lines = [
+                    line for line in filtered if not line.startswith("\t")
+                ]
+            with open(os.path.join(threads_dir, filename)) as expected:
+                self.assertEqual(lines, expected.readlines())
+
+        # the lines without date are kept only by the binary search,
+        # a part file left by a previous run is overwritten in both modes
+        filtered_name = get_filtered_log_file_name(log_files[0], src_dir)
+        for binary_search, undated_lines in [(False, 0), (True, 10)]:
+            processes_dir = tempfile.mkdtemp()
+            with open(
+                os.path.join(processes_dir, f".{filtered_name}.0.part"), "w"
+            ) as part:
+                part.write("previous run\n")
+            stats = filter_log_files(
+                [log_files[0]],
+                src_dir,
+                processes_dir,
+                start_timestamp + 100,
+                start_timestamp + 199,
+                "UTC",
+                "UTC",
+                [pattern],
+                processes=1,
+                binary_search=binary_search,
+            )
+            self.assertIsNone(stats[0].error)
+            self.assertEqual(os.listdir(processes_dir), [filtered_name])
+            with open(os.path.join(processes_dir, filtered_name)) as filtered:
+                lines = filtered.readlines()
+            self.assertEqual(
+                len([line for line in lines if line.startswith("\t")]),
+                undated_lines,
+            )
+            self.assertEqual(len(lines), 100 + undated_lines)
+            shutil.rmtree(processes_dir)
+
+        os.unlink(unsorted.name)
+        shutil.rmtree(src_dir)
+        shutil.rmtree(threads_dir)
+        shutil.rmtree(binary_search_dir)
+
+    def test_parallel_gzip_writer(self):
+        data = b"".join(
+            f"{i} {self.get_random_string(i % 50)}\n".encode()
+            for i in range(100000)
+        )
+        with tempfile.NamedTemporaryFile(suffix=".gz") as archive:
+            with ParallelGzipWriter(
+                archive.name, threads=4, block_size=64 * 1024
+            ) as writer:
+                for start in range(0, len(data), 10000):
+                    end = start + 10000
+                    writer.write(data[start:end])
+            with gzip.open(archive.name) as uncompressed:
+                self.assertEqual(uncompressed.read(), data)
+            # the blocks are primed with the previous one
+            self.assertLess(
+                os.path.getsize(archive.name), len(gzip.compress(data)) * 1.05
+            )
+            with self.assertRaises(Exception):
+                writer.write(b"closed")
+
+            with ParallelGzipWriter(archive.name) as writer:
+                pass
+            with gzip.open(archive.name) as uncompressed:
+                self.assertEqual(uncompressed.read(), b"")
+
+    def test_file_slice_reader(self):
+        data = os.urandom(10000)
+        with tempfile.NamedTemporaryFile() as file:
+            file.write(data)
+            file.flush()
+            with FileSliceReader(file.name, 1000, 4000) as part:
+                self.assertEqual(len(part), 4000)
+                chunks = []
+                while chunk := part.read(1500):
+                    chunks.append(chunk)
+                self.assertEqual([len(c) for c in chunks], [1500, 1500, 1000])
+                self.assertEqual(b"".join(chunks), data[1000:5000])
+            # the last slice is truncated to the end of the file
+            with FileSliceReader(file.name, 8000, 4000) as part:
+                self.assertEqual(len(part), 2000)
+                self.assertEqual(part.read(), data[8000:])
+                self.assertEqual(part.read(), b"")
+            with FileSliceReader(file.name, 12000, 4000) as part:
+                self.assertEqual(len(part), 0)
+                self.assertEqual(part.read(), b"")
+
+    def test_filter_log_files_to_archive(self):
+        start_timestamp = 1694777280
+        patterns = [r"(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d+Z).+"]
+        src_dir = self.create_synthetic_must_gather(6, 500, start_timestamp)
+        with open(
+            os.path.join(src_dir, "namespaces", "invalid.log"), "wb"
+        ) as invalid:
+            invalid.write(b"2023-09-15T11:28:00.000000000Z \xff\xfe\n")
+        threads_dir = tempfile.mkdtemp()
+        self.filter_log_files_with_threads(
+            src_dir,
+            threads_dir,
+            start_timestamp + 100,
+            start_timestamp + 199,
+            patterns,
+            2,
+        )
+        os.unlink(os.path.join(threads_dir, "namespaces.invalid.log"))
+        for binary_search in [False, True]:
+            archive_dir = tempfile.mkdtemp()
+            archive_path = os.path.join(archive_dir, "logs.tar.gz")
+            stats = filter_log_files_to_archive(
+                list(Path(src_dir).rglob("*.log")),
+                src_dir,
+                archive_path,
+                start_timestamp + 100,
+                start_timestamp + 199,
+                "UTC",
+                "UTC",
+                patterns,
+                threads=3,
+                compression_threads=2,
+                binary_search=binary_search,
+            )
+            # only the archive is written
+            self.assertEqual(os.listdir(archive_dir), ["logs.tar.gz"])
+            self.assertEqual(len(stats), 7)
+            # the ranges found with the binary search are
+            # copied without being decoded
+            self.assertEqual(
+                len([s for s in stats if s.error]), 0 if binary_search else 1
+            )
+            with tarfile.open(archive_path) as tar:
+                self.assertEqual(
+                    sorted(tar.getnames()), sorted(os.listdir(threads_dir))
+                )
+                for member in tar.getmembers():
+                    lines = [
+                        line
+                        for line in tar.extractfile(member)
+                        .read()
+                        .decode()
+                        .splitlines(keepends=True)
+                        if not line.startswith("\t")
+                    ]
+                    with open(os.path.join(threads_dir, member.name)) as f:
+                        self.assertEqual(lines, f.readlines())
+            shutil.rmtree(archive_dir)
+
+        # the files can be produced while they're filtered and the
+        # errors of the producer are raised once the archive is closed
+        def failing_log_files():
+            yield from Path(src_dir).rglob("*.log")
+            raise Exception("collection failed")
+
+        archive_dir = tempfile.mkdtemp()
+        with self.assertRaisesRegex(Exception, "collection failed"):
+            filter_log_files_to_archive(
+                failing_log_files(),
+                src_dir,
+                os.path.join(archive_dir, "logs.tar.gz"),
+                start_timestamp + 100,
+                start_timestamp + 199,
+                "UTC",
+                "UTC",
+                patterns,
+                threads=3,
+            )
+        shutil.rmtree(archive_dir)
+
+        # the files paired with a timezone are filtered with it
+        archive_dir = tempfile.mkdtemp()
+        log_files = sorted(Path(src_dir).rglob("current.log"))
+        stats = filter_log_files_to_archive(
+            [(log_files[0], "Invalid/Timezone")]
+            + [(file, "Europe/Rome") for file in log_files[1:]],
+            src_dir,
+            os.path.join(archive_dir, "logs.tar.gz"),
+            start_timestamp + 100,
+            start_timestamp + 199,
+            "UTC",
+            "UTC",
+            patterns,
+            threads=2,
+        )
+        errors = {s.source_file: s.error for s in stats}
+        self.assertIsNotNone(errors.pop(str(log_files[0])))
+        self.assertEqual(set(errors.values()), {None})
+        self.assertEqual(len(errors), len(log_files) - 1)
+
+        # no files, empty archive
+        archive_path = os.path.join(archive_dir, "empty.tar.gz")
+        self.assertEqual(
+            filter_log_files_to_archive(
+                iter([]),
+                src_dir,
+                archive_path,
+                None,
+                None,
+                "UTC",
+                "UTC",
+                patterns,
+                threads=2,
+            ),
+            [],
+        )
+        with tarfile.open(archive_path) as tar:
+            self.assertEqual(tar.getnames(), [])
+        shutil.rmtree(archive_dir)
+        shutil.rmtree(src_dir)
+        shutil.rmtree(threads_dir)
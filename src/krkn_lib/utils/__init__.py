@@ -1,2 +1,10 @@
+from .compression import *  # NOQA
+from .concurrency import *  # NOQA
+from .file_slice import *  # NOQA
 from .functions import *  # NOQA
+from .log_filter import *  # NOQA
+from .log_matcher import *  # NOQA
+from .progress import *  # NOQA
+from .retry import *  # NOQA
 from .safe_logger import *  # NOQA
+from .time_window import *  # NOQA
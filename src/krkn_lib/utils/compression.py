@@ -0,0 +1,139 @@
+import os
+import struct
+import time
+import zlib
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# deflate window, the tail of each block primes the next one
+_DICTIONARY_SIZE = 32 * 1024
+# empty final deflate block that terminates the stream
+_FINAL_BLOCK = b"\x03\x00"
+
+
+def _compress_block(block: bytes, dictionary: bytes, level: int) -> bytes:
+    if dictionary:
+        compressor = zlib.compressobj(
+            level, zlib.DEFLATED, -zlib.MAX_WBITS, zdict=dictionary
+        )
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    # the sync flush aligns the block to a byte boundary
+    # so the blocks can be concatenated
+    return compressor.compress(block) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+
+class ParallelGzipWriter:
+    """
+    Writes a gzip file compressing the data on multiple threads, like
+    `pigz` does: the data is split in blocks compressed in parallel
+    (zlib releases the GIL) and primed with the last 32KB of the
+    previous block, the compressed blocks are written in order as a
+    single gzip member readable by any gzip implementation.
+    Can be used as `fileobj` of a `tarfile` opened in stream mode.
+
+    >>> with ParallelGzipWriter("logs.tar.gz") as writer:
+    >>>     with tarfile.open(fileobj=writer, mode="w|") as tar:
+    >>>         tar.add("logs")
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        threads: int = None,
+        block_size: int = 1024 * 1024,
+        compresslevel: int = 6,
+    ):
+        """
+        :param filename: the gzip file that will be written
+        :param threads: the number of compression threads, if None
+            the number of CPUs
+        :param block_size: size in bytes of the blocks compressed
+            in parallel (optional, default 1MB)
+        :param compresslevel: gzip compression level from 1 to 9
+            (optional default 6)
+        """
+        if block_size < _DICTIONARY_SIZE:
+            raise Exception(
+                f"block_size must be at least {_DICTIONARY_SIZE} bytes"
+            )
+        self.__threads = threads or os.cpu_count() or 1
+        self.__block_size = block_size
+        self.__compresslevel = compresslevel
+        self.__buffer = bytearray()
+        self.__dictionary = b""
+        self.__crc = 0
+        self.__size = 0
+        self.__pending: deque[Future] = deque()
+        self.__closed = False
+        self.__file = open(filename, "wb")
+        self.__executor = ThreadPoolExecutor(max_workers=self.__threads)
+        # gzip header: deflate, no flags, mtime, no extra flags, unknown OS
+        self.__file.write(
+            b"\x1f\x8b\x08\x00"
+            + struct.pack("<I", int(time.time()))
+            + b"\x00\xff"
+        )
+
+    def write(self, data: bytes) -> int:
+        """
+        Writes the data in the gzip file
+
+        :param data: the uncompressed data
+        :return: the number of bytes written
+        """
+        if self.__closed:
+            raise Exception("write on a closed ParallelGzipWriter")
+        self.__buffer += data
+        while len(self.__buffer) >= self.__block_size:
+            block = bytes(self.__buffer[: self.__block_size])
+            del self.__buffer[: self.__block_size]
+            self.__submit(block)
+        return len(data)
+
+    def __submit(self, block: bytes):
+        self.__crc = zlib.crc32(block, self.__crc)
+        self.__size += len(block)
+        self.__pending.append(
+            self.__executor.submit(
+                _compress_block,
+                block,
+                self.__dictionary,
+                self.__compresslevel,
+            )
+        )
+        self.__dictionary = block[-_DICTIONARY_SIZE:]
+        # writes the compressed blocks in order, blocking
+        # if too many blocks are waiting to be compressed
+        while self.__pending and (
+            self.__pending[0].done()
+            or len(self.__pending) > 2 * self.__threads
+        ):
+            self.__file.write(self.__pending.popleft().result())
+
+    def close(self):
+        """
+        Compresses the remaining data and closes the file
+        """
+        if self.__closed:
+            return
+        self.__closed = True
+        try:
+            if self.__buffer:
+                self.__submit(bytes(self.__buffer))
+                self.__buffer.clear()
+            while self.__pending:
+                self.__file.write(self.__pending.popleft().result())
+            self.__file.write(_FINAL_BLOCK)
+            self.__file.write(
+                struct.pack("<II", self.__crc, self.__size & 0xFFFFFFFF)
+            )
+        finally:
+            self.__executor.shutdown()
+            self.__file.close()
+
+    def __enter__(self) -> "ParallelGzipWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
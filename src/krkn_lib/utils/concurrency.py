@@ -0,0 +1,220 @@
+import math
+import threading
+import time
+from collections import deque
+from typing import Callable
+
+from krkn_lib.models.krkn import ConcurrencySample
+
+
+class AdaptiveConcurrencyController:
+    """
+    Thread safe AIMD (additive increase, multiplicative decrease)
+    concurrency limiter. The workers are started up to
+    `max_concurrency` and each one calls `acquire` before processing
+    a task and `release` after, the controller lets only `concurrency`
+    tasks run at the same time. At the end of every sampling interval
+    the concurrency is adjusted on the throughput and the error rate
+    measured:
+
+    - if the error rate is above `error_rate_threshold` or the
+      throughput dropped more than `throughput_drop_threshold` after
+      the last increase, the concurrency is multiplied by
+      `multiplicative_decrease`
+    - otherwise, if all the slots have been used in the interval,
+      the concurrency is increased by `additive_increase`
+
+    >>> controller = AdaptiveConcurrencyController(max_concurrency=16)
+    >>> controller.acquire()
+    >>> try:
+    >>>     size = upload(file)
+    >>>     controller.release(size)
+    >>> except Exception:
+    >>>     controller.release(error=True)
+    """
+
+    min_concurrency: int
+    max_concurrency: int
+    sample_interval: float
+    additive_increase: int
+    multiplicative_decrease: float
+    error_rate_threshold: float
+    throughput_drop_threshold: float
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        min_concurrency: int = 1,
+        initial_concurrency: int = None,
+        sample_interval: float = 2.0,
+        additive_increase: int = 1,
+        multiplicative_decrease: float = 0.5,
+        error_rate_threshold: float = 0.1,
+        throughput_drop_threshold: float = 0.2,
+        history_size: int = 1000,
+        on_sample: Callable[[ConcurrencySample], None] = None,
+    ):
+        """
+        :param max_concurrency: maximum number of tasks running at the
+            same time, the number of workers that must be started
+        :param min_concurrency: minimum number of tasks running at the
+            same time (optional, default 1)
+        :param initial_concurrency: concurrency of the first interval
+            (optional, default half of `max_concurrency`)
+        :param sample_interval: length in seconds of the interval on
+            which the throughput is measured (optional, default 2)
+        :param additive_increase: slots added after an interval in which
+            the throughput did not drop (optional, default 1)
+        :param multiplicative_decrease: factor applied to the concurrency
+            on errors or throughput drop (optional, default 0.5)
+        :param error_rate_threshold: failed tasks ratio above which the
+            concurrency is decreased (optional, default 0.1)
+        :param throughput_drop_threshold: throughput loss ratio after an
+            increase above which the concurrency is decreased
+            (optional, default 0.2)
+        :param history_size: number of samples kept in the history
+            (optional, default 1000)
+        :param on_sample: callback invoked with each ConcurrencySample
+            (optional)
+        """
+        if min_concurrency < 1:
+            raise Exception("min_concurrency must be greater than 0")
+        if max_concurrency < min_concurrency:
+            raise Exception(
+                "max_concurrency must be greater or equal "
+                "than min_concurrency"
+            )
+        if not 0 < multiplicative_decrease < 1:
+            raise Exception("multiplicative_decrease must be between 0 and 1")
+        if sample_interval <= 0:
+            raise Exception("sample_interval must be greater than 0")
+        if initial_concurrency is None:
+            initial_concurrency = max_concurrency // 2
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.sample_interval = sample_interval
+        self.additive_increase = additive_increase
+        self.multiplicative_decrease = multiplicative_decrease
+        self.error_rate_threshold = error_rate_threshold
+        self.throughput_drop_threshold = throughput_drop_threshold
+        self.__on_sample = on_sample
+        self.__concurrency = self.__clamp(initial_concurrency)
+        self.__condition = threading.Condition()
+        self.__in_flight = 0
+        self.__history = deque(maxlen=history_size)
+        self.__last_throughput = None
+        self.__last_increased = False
+        self.__reset_interval(time.monotonic())
+
+    @property
+    def concurrency(self) -> int:
+        """
+        The number of tasks allowed to run at the same time
+        """
+        return self.__concurrency
+
+    @property
+    def in_flight(self) -> int:
+        """
+        The number of tasks running
+        """
+        return self.__in_flight
+
+    def __clamp(self, concurrency: int) -> int:
+        return max(
+            self.min_concurrency, min(self.max_concurrency, concurrency)
+        )
+
+    def __reset_interval(self, now: float):
+        self.__interval_start = now
+        self.__interval_bytes = 0
+        self.__interval_completed = 0
+        self.__interval_errors = 0
+        self.__interval_saturated = self.__in_flight >= self.__concurrency
+
+    def acquire(self):
+        """
+        Blocks until the number of running tasks is
+        below the concurrency chosen by the controller
+        """
+        with self.__condition:
+            while self.__in_flight >= self.__concurrency:
+                self.__interval_saturated = True
+                self.__condition.wait()
+            self.__in_flight += 1
+            if self.__in_flight >= self.__concurrency:
+                self.__interval_saturated = True
+
+    def release(self, processed_bytes: int = 0, error: bool = False):
+        """
+        Releases the slot acquired by a task
+
+        :param processed_bytes: bytes transferred by the task, if no
+            task reports the bytes the throughput is measured
+            in tasks per second (optional)
+        :param error: True if the task failed (optional, default False)
+        """
+        sample = None
+        with self.__condition:
+            self.__in_flight = max(0, self.__in_flight - 1)
+            if error:
+                self.__interval_errors += 1
+            else:
+                self.__interval_completed += 1
+                self.__interval_bytes += processed_bytes
+            now = time.monotonic()
+            if now - self.__interval_start >= self.sample_interval:
+                sample = self.__adjust(now)
+            self.__condition.notify_all()
+        if sample and self.__on_sample:
+            self.__on_sample(sample)
+
+    def __adjust(self, now: float) -> ConcurrencySample:
+        elapsed = now - self.__interval_start
+        if self.__interval_bytes > 0:
+            throughput = self.__interval_bytes / elapsed
+        else:
+            throughput = self.__interval_completed / elapsed
+        total = self.__interval_completed + self.__interval_errors
+        error_rate = self.__interval_errors / total if total > 0 else 0
+
+        throughput_dropped = (
+            self.__last_increased
+            and self.__last_throughput is not None
+            and throughput
+            < self.__last_throughput * (1 - self.throughput_drop_threshold)
+        )
+        self.__last_increased = False
+        if error_rate > self.error_rate_threshold or throughput_dropped:
+            self.__concurrency = self.__clamp(
+                math.floor(self.__concurrency * self.multiplicative_decrease)
+            )
+        elif self.__interval_saturated:
+            concurrency = self.__clamp(
+                self.__concurrency + self.additive_increase
+            )
+            self.__last_increased = concurrency > self.__concurrency
+            self.__concurrency = concurrency
+        self.__last_throughput = throughput
+
+        sample = ConcurrencySample(
+            timestamp=time.time(),
+            concurrency=self.__concurrency,
+            in_flight=self.__in_flight,
+            throughput=throughput,
+            completed=self.__interval_completed,
+            errors=self.__interval_errors,
+        )
+        self.__history.append(sample)
+        self.__reset_interval(now)
+        return sample
+
+    def get_history(self) -> list[ConcurrencySample]:
+        """
+        Returns the samples collected at the end of each
+        sampling interval, oldest first
+
+        :return: the list of ConcurrencySample
+        """
+        with self.__condition:
+            return list(self.__history)
@@ -0,0 +1,57 @@
+import os
+
+
+class FileSliceReader:
+    """
+    Read-only binary stream over a byte range of a file, lets an http
+    client stream a part of a file (eg. a multipart upload part)
+    without loading the whole range in memory. The length of the
+    slice is exposed with `len()` so that the client can set the
+    Content-Length of the request.
+
+    >>> with FileSliceReader("prometheus.tar", 5 * 1024 * 1024, 1024) as part:
+    >>>     session.put(url, data=part)
+    """
+
+    def __init__(self, filename: str, offset: int, size: int):
+        """
+        :param filename: the file read
+        :param offset: offset of the first byte of the slice
+        :param size: maximum number of bytes of the slice, truncated
+            to the end of the file
+        """
+        file_size = os.stat(filename).st_size
+        self.__offset = min(offset, file_size)
+        self.__size = max(0, min(size, file_size - self.__offset))
+        self.__remaining = self.__size
+        self.__file = open(filename, "rb")
+        self.__file.seek(self.__offset)
+
+    def __len__(self) -> int:
+        return self.__size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def read(self, size: int = -1) -> bytes:
+        """
+        Reads up to `size` bytes without going past the end of the
+        slice
+
+        :param size: maximum number of bytes read, if negative
+            the rest of the slice is read
+        :return: the bytes read, empty at the end of the slice
+        """
+        if size is None or size < 0 or size > self.__remaining:
+            size = self.__remaining
+        if size == 0:
+            return b""
+        data = self.__file.read(size)
+        self.__remaining -= len(data)
+        return data
+
+    def close(self):
+        self.__file.close()
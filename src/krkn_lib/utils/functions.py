@@ -1,14 +1,20 @@
 import datetime
+import functools
+import gzip
 import logging
+import mmap
 import os
 import random
 import re
+import shutil
 import socket
 import string
 import sys
+import threading
 import xml.etree.cElementTree as ET
+from pathlib import Path
 from queue import Queue
-from typing import Optional
+from typing import BinaryIO, Callable, Optional
 
 import pytz
 from base64io import Base64IO
@@ -16,6 +22,10 @@ from dateutil import parser
 from dateutil.parser import ParserError
 from dateutil.tz import tzutc  # NOQA
 
+from krkn_lib.utils.concurrency import AdaptiveConcurrencyController
+from krkn_lib.utils.log_matcher import LogTimestampMatcher
+from krkn_lib.utils.time_window import TimeWindow
+
 
 def decode_base64_file(source_filename: str, destination_filename: str):
     """
@@ -33,6 +43,41 @@ def decode_base64_file(source_filename: str, destination_filename: str):
                 target.write(line)
 
 
+def gzip_file(
+    source_filename: str, destination_filename: str, compresslevel: int = 6
+):
+    """
+    Compresses a file with gzip while it's read (no memory allocation).
+    Suitable for big file conversion.
+
+    :param source_filename: source file
+    :param destination_filename: destination gzip compressed file
+    :param compresslevel: gzip compression level from 1 to 9
+        (optional default 6)
+    """
+    with open(source_filename, "rb") as source, gzip.open(
+        destination_filename, "wb", compresslevel=compresslevel
+    ) as target:
+        shutil.copyfileobj(source, target, 1024 * 1024)
+
+
+def get_archive_extension(filename: str) -> str:
+    """
+    Returns the archive extension of a file name, including
+    the compression extension if present (eg. `.tar.gz`) and the
+    `.shards` marker of the volumes streamed by
+    `KrknKubernetes.stream_archive_from_pod` (eg. `.shards.tar.gz`)
+
+    :param filename: the file name
+    :return: the archive extension or the last extension
+        if the file is not a tar archive
+    """
+    match = re.search(r"((\.shards)?\.tar(\.gz|\.zst)?)(\.b64)?$", filename)
+    if match:
+        return match.group(1)
+    return os.path.splitext(filename)[1]
+
+
 def log_exception(scenario: str = None):
     """
     Logs an exception printing the file and the line
@@ -116,6 +161,19 @@ def deep_get_attribute(
     return values
 
 
+@functools.lru_cache(maxsize=None)
+def _get_timezone(timezone: str) -> datetime.tzinfo:
+    return pytz.timezone(timezone)
+
+
+@functools.lru_cache(maxsize=128)
+def _get_log_timestamp_matcher(
+    log_filter_patterns: tuple, thread_id: int
+) -> LogTimestampMatcher:
+    # the matcher is not thread safe, each thread gets its own
+    return LogTimestampMatcher(list(log_filter_patterns))
+
+
 def check_date_in_localized_interval(
     start_timestamp: Optional[int],
     end_timestamp: Optional[int],
@@ -136,28 +194,153 @@ def check_date_in_localized_interval(
         timestamps
     """
 
-    start_check = True
-    end_check = True
+    # the timestamps don't depend on the timezone, the timezones
+    # are only validated
+    _get_timezone(check_timezone)
+    _get_timezone(interval_timezone)
+    if check_timestamp is None:
+        # the comparison with a missing date is not valid
+        raise TypeError("check_timestamp must be a timestamp")
+    return TimeWindow(start_timestamp, end_timestamp).contains(check_timestamp)
+
+
+# 2023-09-15T11:20:36.123425532Z, 2023/09/15 11:20:36 +02:00
+_RFC3339_TIMESTAMP = re.compile(
+    r"(\d{4})[-/](\d{2})[-/](\d{2})[T ](\d{2}):(\d{2}):(\d{2})(?:\.\d+)?"
+    r"(?: ?(Z|[+-]\d{2}:?\d{2}))?"
+)
+# I0102 15:04:05.000000
+_KLOG_TIMESTAMP = re.compile(
+    r"[IWEF]?(\d{2})(\d{2}) (\d{2}):(\d{2}):(\d{2})(?:\.\d+)?"
+)
+# Sep 9 11:20:36.123425532
+_SYSLOG_TIMESTAMP = re.compile(
+    r"([A-Za-z]{3}) +(\d{1,2}) (\d{2}):(\d{2}):(\d{2})(?:\.\d+)?"
+)
+_MONTHS = {
+    month: number
+    for number, month in enumerate(
+        "jan feb mar apr may jun jul aug sep oct nov dec".split(), start=1
+    )
+}
+
+
+def _to_timestamp(
+    year: int,
+    month: int,
+    day: int,
+    hour: int,
+    minute: int,
+    second: int,
+    utc_offset: Optional[int] = None,
+) -> int:
+    """
+    Converts a date to a timestamp, if the utc offset (in seconds)
+    is None the date is considered in the local timezone as dateutil
+    does with the dates without timezone
+    """
+    if utc_offset is None:
+        date = datetime.datetime(year, month, day, hour, minute, second)
+        return int(date.timestamp())
+    date = datetime.datetime(
+        year, month, day, hour, minute, second, tzinfo=datetime.timezone.utc
+    )
+    return int(date.timestamp()) - utc_offset
 
-    interval_tz = pytz.timezone(interval_timezone)
-    check_tz = pytz.timezone(check_timezone)
 
-    localized_check_date = datetime.datetime.fromtimestamp(
-        check_timestamp, tz=check_tz
+def _parse_rfc3339_timestamp(date_string: str) -> Optional[int]:
+    match = _RFC3339_TIMESTAMP.fullmatch(date_string)
+    if not match:
+        return None
+    year, month, day, hour, minute, second, offset = match.groups()
+    utc_offset = None
+    if offset == "Z":
+        utc_offset = 0
+    elif offset:
+        utc_offset = int(offset[1:3]) * 3600 + int(offset[-2:]) * 60
+        if offset[0] == "-":
+            utc_offset = -utc_offset
+    return _to_timestamp(
+        int(year),
+        int(month),
+        int(day),
+        int(hour),
+        int(minute),
+        int(second),
+        utc_offset,
     )
 
-    if start_timestamp is not None:
-        start_date = datetime.datetime.fromtimestamp(
-            start_timestamp, tz=interval_tz
-        )
-        start_check = localized_check_date >= start_date
-    if end_timestamp is not None:
-        end_date = datetime.datetime.fromtimestamp(
-            end_timestamp, tz=interval_tz
-        )
-        end_check = localized_check_date <= end_date
 
-    return start_check and end_check
+def _parse_klog_timestamp(date_string: str) -> Optional[int]:
+    match = _KLOG_TIMESTAMP.fullmatch(date_string)
+    if not match:
+        return None
+    # the year is missing, the current one is used like dateutil does
+    return _to_timestamp(
+        datetime.date.today().year, *[int(g) for g in match.groups()]
+    )
+
+
+def _parse_syslog_timestamp(date_string: str) -> Optional[int]:
+    match = _SYSLOG_TIMESTAMP.fullmatch(date_string)
+    if not match:
+        return None
+    month = _MONTHS.get(match.group(1).lower())
+    if month is None:
+        return None
+    return _to_timestamp(
+        datetime.date.today().year,
+        month,
+        *[int(g) for g in match.groups()[1:]],
+    )
+
+
+_LOG_TIMESTAMP_PARSERS = [
+    _parse_rfc3339_timestamp,
+    _parse_klog_timestamp,
+    _parse_syslog_timestamp,
+]
+# index of the parser that matched the last date of each pattern
+_inferred_log_timestamp_parsers: dict[str, int] = {}
+
+
+def parse_log_timestamp(date_string: str, format_key: str = None) -> int:
+    """
+    Parses a date extracted from a log line and returns its timestamp.
+    The most common log formats (RFC3339, klog and syslog) are parsed
+    without dateutil, that is used as fallback for the other formats.
+    The format of the dates extracted with the same `format_key`
+    (eg. the filter pattern) is inferred from the first date parsed and
+    tried first on the following ones.
+    Dates without timezone are considered in the local timezone and
+    dates without year in the current year as dateutil does.
+
+    :param date_string: the date to be parsed
+    :param format_key: the key on which the inferred format is cached,
+        if None the format is not cached (optional)
+    :return: the timestamp of the date
+    """
+    inferred = _inferred_log_timestamp_parsers.get(format_key)
+    if inferred is not None:
+        try:
+            timestamp = _LOG_TIMESTAMP_PARSERS[inferred](date_string)
+            if timestamp is not None:
+                return timestamp
+        except ValueError:
+            pass
+    for index, parse in enumerate(_LOG_TIMESTAMP_PARSERS):
+        if index == inferred:
+            continue
+        try:
+            timestamp = parse(date_string)
+        except ValueError:
+            # invalid date, reported by dateutil
+            break
+        if timestamp is not None:
+            if format_key is not None:
+                _inferred_log_timestamp_parsers[format_key] = index
+            return timestamp
+    return int(parser.parse(date_string).timestamp())
 
 
 def filter_log_line(
@@ -167,6 +350,8 @@ def filter_log_line(
     remote_timezone: str,
     local_timezone: str,
     log_filter_patterns: [re.Pattern[str]],
+    time_window: TimeWindow = None,
+    matcher: LogTimestampMatcher = None,
 ) -> Optional[str]:
     """
     Filters a log line extracting time informations using a set of compiled
@@ -182,49 +367,45 @@ def filter_log_line(
 
     :param log_filter_patterns: a list of regex that will match
         and extract the time info that will be
-        parsed by dateutil.parser (it supports several formats
-        by default but not every date format).
+        parsed by `parse_log_timestamp` (RFC3339, klog and syslog dates
+        are parsed directly, the others by dateutil.parser that
+        supports several formats but not every date format).
         Each pattern *must contain* only 1 group that represent
         the time string that must be extracted
         and parsed
+    :param time_window: the TimeWindow of `start_timestamp` and
+        `end_timestamp`, if set the timestamps are ignored. Callers
+        filtering many lines should build it once (optional)
+    :param matcher: the LogTimestampMatcher of `log_filter_patterns`,
+        if set the patterns are ignored. Callers filtering many lines
+        should build it once, validating the patterns only at setup,
+        and `reset` it for each file. If not set the matcher of the
+        patterns is cached for each thread (optional)
 
     :return: the log line if matches the criteria above otherwise None
     """
     try:
-        if len(log_filter_patterns) == 0:
-            logging.error(
-                "no log filter patterns has been defined in config file,"
-                "unable to filter logfile. Skipping"
-            )
-            return None
-        log_date = None
-        for pattern in log_filter_patterns:
-            if pattern.groups != 1:
+        if matcher is None:
+            if len(log_filter_patterns) == 0:
                 logging.error(
-                    f"{pattern} it's not a valid pattern, "
-                    f"it must contain only one group that "
-                    f"represents the date to be parsed, skipping"
-                )
-                raise Exception(
-                    f"{pattern} it's not a valid pattern, it must "
-                    f"contain only one group that represents "
-                    f"the date to be parsed, skipping"
+                    "no log filter patterns has been defined in config file,"
+                    "unable to filter logfile. Skipping"
                 )
-            if pattern.match(log_line):
-                log_date = parser.parse(pattern.search(log_line).groups()[0])
-                break
-
-        is_in_interval = False
-        if log_date is not None and isinstance(log_date, datetime.datetime):
-            is_in_interval = check_date_in_localized_interval(
-                start_timestamp,
-                end_timestamp,
-                int(log_date.timestamp()),
-                remote_timezone,
-                local_timezone,
+                return None
+            matcher = _get_log_timestamp_matcher(
+                tuple(log_filter_patterns), threading.get_ident()
             )
-
-        if is_in_interval:
+        matched = matcher.match(log_line)
+        if matched is None:
+            return None
+        log_timestamp = parse_log_timestamp(matched[0], matched[1].pattern)
+        # the timezones don't change the comparison between
+        # timestamps, only validated as check_date_in_localized_interval
+        _get_timezone(remote_timezone)
+        _get_timezone(local_timezone)
+        if time_window is None:
+            time_window = TimeWindow(start_timestamp, end_timestamp)
+        if time_window.contains(log_timestamp):
             return log_line
 
         return None
@@ -286,6 +467,176 @@ def filter_dictionary(
         return False
 
 
+def get_filtered_log_file_name(file: Path, src_folder: str) -> str:
+    """
+    Builds the name of the filtered copy of a log file: the
+    file path relative to `src_folder` with the folders
+    separated by a dot, eg.
+    src_folder: /tmp/folder
+    file: /tmp/folder/namespaces/default/pods/nginx/logs/current.log
+    output: namespaces.default.pods.nginx.logs.current.log
+
+    :param file: the log file
+    :param src_folder: the base folder removed from the name
+    :return: the filtered log file name
+    """
+    filtered_log_file_name = str(file)
+    filtered_log_file_name = filtered_log_file_name.replace(src_folder, "")
+    filtered_log_file_name = filtered_log_file_name.replace("/", ".")
+    if filtered_log_file_name.startswith("."):
+        filtered_log_file_name = filtered_log_file_name[1:]
+    return filtered_log_file_name
+
+
+def _get_log_line_timestamp(
+    line: bytes, matcher: LogTimestampMatcher
+) -> Optional[int]:
+    """
+    Extracts the timestamp of a log line as `filter_log_line` does,
+    None if the line has no valid date
+    """
+    matched = matcher.match(line.decode("utf-8", errors="replace"))
+    if matched is None:
+        return None
+    try:
+        return parse_log_timestamp(matched[0], matched[1].pattern)
+    except (ParserError, OverflowError, ValueError, TypeError):
+        return None
+
+
+def find_log_time_range(
+    filename: str,
+    start_timestamp: Optional[int],
+    end_timestamp: Optional[int],
+    log_filter_patterns: list[re.Pattern[str]],
+    samples: int = 32,
+) -> Optional[tuple[int, int]]:
+    """
+    Finds with a binary search the byte range of a time-sorted log file
+    containing the lines between `start_timestamp` and `end_timestamp`.
+    The range starts at the first line dated within the interval
+    and ends before the first line dated after it, so the lines without
+    a date (eg. stack traces) following a line in the interval are
+    included. The file is memory mapped and only the lines probed by
+    the search and `samples` evenly spaced lines are parsed; if their
+    dates are not sorted the file is considered not sorted.
+
+    :param filename: the log file
+    :param start_timestamp: timestamp of the first relevant entry, if None
+        the range starts from the beginning of the file
+    :param end_timestamp: timestamp of the last relevant entry, if None
+        the range ends at the end of the file
+    :param log_filter_patterns: the compiled regex that extract the date
+        of the lines (see `filter_log_line`)
+    :param samples: number of lines sampled to check that the file is
+        sorted (optional, default 32)
+    :return: the (start, end) byte offsets of the range, end excluded,
+        or None if the file is not sorted by time
+    """
+    size = os.path.getsize(filename)
+    if size == 0:
+        return 0, 0
+    matcher = LogTimestampMatcher(log_filter_patterns)
+    with open(filename, "rb") as file, mmap.mmap(
+        file.fileno(), 0, access=mmap.ACCESS_READ
+    ) as content:
+        # line offset -> timestamp of the dated lines parsed
+        probes = dict[int, int]()
+
+        def next_dated_line(position: int) -> tuple[int, Optional[int]]:
+            # the first line dated starting at or after position
+            if position > 0 and content[position - 1] != ord("\n"):
+                position = content.find(b"\n", position) + 1 or size
+            while position < size:
+                line_end = content.find(b"\n", position) + 1 or size
+                timestamp = probes.get(position)
+                if timestamp is None:
+                    timestamp = _get_log_line_timestamp(
+                        content[position:line_end], matcher
+                    )
+                if timestamp is not None:
+                    probes[position] = timestamp
+                    return position, timestamp
+                position = line_end
+            return size, None
+
+        def lower_bound(is_after: Callable[[int], bool]) -> int:
+            # offset of the first dated line for which is_after is True
+            low = 0
+            high = size
+            while low < high:
+                middle = (low + high) // 2
+                line_start, timestamp = next_dated_line(middle)
+                if timestamp is None or is_after(timestamp):
+                    high = middle
+                else:
+                    low = line_start + 1
+            return next_dated_line(low)[0]
+
+        range_end = size
+        if start_timestamp is not None:
+            range_start = lower_bound(lambda t: t >= start_timestamp)
+        else:
+            range_start = next_dated_line(0)[0]
+        if end_timestamp is not None:
+            range_end = max(
+                range_start, lower_bound(lambda t: t > end_timestamp)
+            )
+        for sample in range(samples):
+            next_dated_line(size * sample // samples)
+    timestamps = [probes[offset] for offset in sorted(probes)]
+    if any(a > b for a, b in zip(timestamps, timestamps[1:])):
+        return None
+    return range_start, range_end
+
+
+def copy_file_range(
+    filename: str, start: int, end: int, output_filename: str
+) -> int:
+    """
+    Copies a byte range of a file in a new file
+
+    :param filename: the source file
+    :param start: offset of the first byte copied
+    :param end: offset of the end of the range (excluded)
+    :param output_filename: the file created, must not exist
+    :return: the number of lines copied
+    """
+    with open(output_filename, mode="xb") as write_file:
+        return copy_file_range_to_stream(filename, start, end, write_file)
+
+
+def copy_file_range_to_stream(
+    filename: str, start: int, end: int, output: BinaryIO
+) -> int:
+    """
+    Copies a byte range of a file in a binary stream
+
+    :param filename: the source file
+    :param start: offset of the first byte copied
+    :param end: offset of the end of the range (excluded)
+    :param output: the stream on which the range is written
+    :return: the number of lines copied
+    """
+    lines = 0
+    last_chunk = b""
+    with open(filename, "rb") as read_file:
+        read_file.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            chunk = read_file.read(min(remaining, 1024 * 1024))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            lines += chunk.count(b"\n")
+            output.write(chunk)
+            last_chunk = chunk
+    # last line without line break
+    if last_chunk and not last_chunk.endswith(b"\n"):
+        lines += 1
+    return lines
+
+
 def filter_log_file_worker(
     start_timestamp: Optional[int],
     end_timestamp: Optional[int],
@@ -295,6 +646,8 @@ def filter_log_file_worker(
     local_timezone: str,
     log_filter_patterns: list[str],
     queue: Queue,
+    concurrency_controller: AdaptiveConcurrencyController = None,
+    binary_search: bool = False,
 ):
     """
     Log file filter worker. Filters a file scanning
@@ -319,22 +672,52 @@ def filter_log_file_worker(
         string that must be extracted and parsed
     :param queue: a queue containing `pathlib.Path` objects
         representing the log file to be parsed
+    :param concurrency_controller: if set, the worker waits for
+        a slot of the controller before filtering each file
+    :param binary_search: if True the range of lines within the time
+        range of the files sorted by time is found with a binary search
+        (see `find_log_time_range`) and copied without parsing each
+        line. Unlike the line by line filter, that drops the lines
+        without a date, the lines without a date in the range are kept.
+        The files not sorted are scanned line by line
 
     """
 
     # precompile patterns to speed up the parsing
-    patterns = list(map(re.compile, log_filter_patterns))
+    matcher = LogTimestampMatcher(log_filter_patterns)
+    patterns = matcher.patterns
+    time_window = TimeWindow(start_timestamp, end_timestamp)
 
     while not queue.empty():
         file = queue.get()
+        if concurrency_controller:
+            concurrency_controller.acquire()
+        filtered = False
         try:
-            filtered_log_file_name = str(file)
-            filtered_log_file_name = filtered_log_file_name.replace(
-                src_folder, ""
+            filtered_log_file_name = get_filtered_log_file_name(
+                file, src_folder
             )
-            filtered_log_file_name = filtered_log_file_name.replace("/", ".")
-            if filtered_log_file_name.startswith("."):
-                filtered_log_file_name = filtered_log_file_name[1:]
+            time_range = None
+            if binary_search:
+                time_range = find_log_time_range(
+                    str(file), start_timestamp, end_timestamp, patterns
+                )
+                if time_range is None:
+                    logging.info(
+                        f"file {str(file)} is not sorted by time, "
+                        f"filtering it line by line"
+                    )
+            if time_range is not None:
+                if time_range[1] > time_range[0]:
+                    copy_file_range(
+                        str(file),
+                        time_range[0],
+                        time_range[1],
+                        os.path.join(dst_folder, filtered_log_file_name),
+                    )
+                filtered = True
+                continue
+            matcher.reset()
             with file.open(mode="r") as read_file:
                 with open(
                     os.path.join(dst_folder, filtered_log_file_name),
@@ -349,6 +732,8 @@ def filter_log_file_worker(
                             remote_timezone,
                             local_timezone,
                             patterns,
+                            time_window,
+                            matcher,
                         )
                         if filtered_line is not None:
                             line_count += 1
@@ -357,6 +742,7 @@ def filter_log_file_worker(
                 # if the file is empty is removed
                 if line_count == 0:
                     os.unlink(os.path.join(dst_folder, filtered_log_file_name))
+            filtered = True
         except UnicodeDecodeError:
             logging.error(
                 f"file {str(file)} contains invalid "
@@ -370,6 +756,11 @@ def filter_log_file_worker(
             )
             raise e
         finally:
+            if concurrency_controller:
+                concurrency_controller.release(
+                    file.stat().st_size if filtered else 0,
+                    error=not filtered,
+                )
             queue.task_done()
 
 
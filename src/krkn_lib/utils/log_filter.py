@@ -0,0 +1,655 @@
+import logging
+import os
+import re
+import shutil
+import tarfile
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+from queue import Queue
+from typing import BinaryIO, Iterable, Optional, Union
+
+from krkn_lib.models.krkn import LogFilterFileStats
+from krkn_lib.utils.compression import ParallelGzipWriter
+from krkn_lib.utils.functions import (
+    copy_file_range_to_stream,
+    filter_log_line,
+    find_log_time_range,
+    get_filtered_log_file_name,
+)
+from krkn_lib.utils.log_matcher import LogTimestampMatcher
+from krkn_lib.utils.time_window import TimeWindow
+
+
+def split_file_on_lines(filename: str, shard_size: int) -> list[(int, int)]:
+    """
+    Splits a file in byte ranges of about `shard_size` bytes, each range
+    is extended up to the end of the line on which it would end, so no
+    line is split between two ranges.
+
+    :param filename: the file to be split
+    :param shard_size: the size in bytes of each range, if 0 or bigger
+        than the file, a single range is returned
+    :return: the list of (start, end) byte offsets, end excluded
+    """
+    size = os.path.getsize(filename)
+    if shard_size <= 0 or size <= shard_size:
+        return [(0, size)]
+    ranges = []
+    start = 0
+    with open(filename, "rb") as file:
+        while start < size:
+            end = start + shard_size
+            if end >= size:
+                end = size
+            else:
+                # moves the end after the next line break
+                file.seek(end - 1)
+                file.readline()
+                end = file.tell()
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def _split_universal_newlines(line: str) -> list[str]:
+    # the lines split and translated as a file opened in text mode,
+    # where `\r\n` and `\r` are read as `\n`
+    lines = line.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return [f"{text}\n" for text in lines[:-1]] + (
+        [lines[-1]] if lines[-1] else []
+    )
+
+
+def filter_log_file_range(
+    filename: str,
+    start: int,
+    end: int,
+    output_filename: str,
+    start_timestamp: Optional[int],
+    end_timestamp: Optional[int],
+    remote_timezone: str,
+    local_timezone: str,
+    log_filter_patterns: list[str],
+) -> tuple[int, int, int, float]:
+    """
+    Filters the lines of a byte range of a log file (see
+    `split_file_on_lines`) with `filter_log_line`, writing the lines
+    within the time range in `output_filename`. The line endings are
+    translated as `filter_log_file_worker` does reading the file in
+    text mode (`\r\n` and `\r` are written as `\n`). Runs in the
+    worker processes of `filter_log_files`.
+
+    :param filename: the log file
+    :param start: offset of the first byte of the range
+    :param end: offset of the end of the range (excluded)
+    :param output_filename: the file where the filtered lines are written
+    :param start_timestamp: timestamp of the first relevant entry, if None
+        will start filter starting from the earliest
+    :param end_timestamp: timestamp of the last relevant entry, if None
+        will end filtering until the latest
+    :param remote_timezone: timezone of the system from
+        which the logs have been extracted
+    :param local_timezone: timezone of the client
+    :param log_filter_patterns: the regex that extract the time info
+        (see `filter_log_line`)
+    :return: the number of lines read, the number of lines written,
+        the bytes read and the seconds elapsed
+    """
+    start_time = time.monotonic()
+    matcher = LogTimestampMatcher(log_filter_patterns)
+    time_window = TimeWindow(start_timestamp, end_timestamp)
+    lines_read = 0
+    lines_matched = 0
+    position = start
+    with open(filename, "rb") as read_file, open(
+        output_filename, mode="w"
+    ) as write_file:
+        read_file.seek(start)
+        for line in read_file:
+            if position >= end:
+                break
+            position += len(line)
+            for text_line in _split_universal_newlines(line.decode("utf-8")):
+                lines_read += 1
+                filtered_line = filter_log_line(
+                    text_line,
+                    start_timestamp,
+                    end_timestamp,
+                    remote_timezone,
+                    local_timezone,
+                    matcher.patterns,
+                    time_window,
+                    matcher,
+                )
+                if filtered_line is not None:
+                    lines_matched += 1
+                    write_file.write(filtered_line)
+    return (
+        lines_read,
+        lines_matched,
+        position - start,
+        time.monotonic() - start_time,
+    )
+
+
+def copy_log_file_range(
+    filename: str, start: int, end: int, output_filename: str
+) -> tuple[int, int, int, float]:
+    """
+    Copies a byte range of a log file found by `find_log_time_range`,
+    runs in the worker processes of `filter_log_files`. As in
+    `filter_log_file_range` an existing `output_filename` is
+    overwritten.
+
+    :param filename: the log file
+    :param start: offset of the first byte of the range
+    :param end: offset of the end of the range (excluded)
+    :param output_filename: the file where the range is copied
+    :return: the number of lines copied (as lines read and written),
+        the bytes copied and the seconds elapsed
+    """
+    start_time = time.monotonic()
+    with open(output_filename, mode="wb") as output:
+        lines = copy_file_range_to_stream(filename, start, end, output)
+    return lines, lines, end - start, time.monotonic() - start_time
+
+
+def filter_log_files(
+    log_files: list[Path],
+    src_folder: str,
+    dst_folder: str,
+    start_timestamp: Optional[int],
+    end_timestamp: Optional[int],
+    remote_timezone: str,
+    local_timezone: str,
+    log_filter_patterns: list[str],
+    processes: int = None,
+    shard_size: int = 64 * 1024 * 1024,
+    binary_search: bool = False,
+) -> list[LogFilterFileStats]:
+    """
+    Filters a set of log files on multiple cores with a process pool.
+    The files bigger than `shard_size` are split in byte ranges on line
+    boundaries filtered in parallel, the filtered ranges are then joined
+    in order, so the output is the same of `filter_log_file_worker`:
+    a file named after the source path relative to `src_folder`
+    (see `get_filtered_log_file_name`) containing only the lines within
+    the time range, not created if no line matches. As in
+    `filter_log_file_worker` the filtered lines end with `\n`, while
+    the ranges copied by the binary search keep the original
+    line endings.
+    The files containing invalid unicode characters are skipped.
+
+    :param log_files: the log files to be filtered
+    :param src_folder: the base folder removed from the filtered
+        file names
+    :param dst_folder: output folder where the filtered files
+        will be placed
+    :param start_timestamp: timestamp of the first relevant entry, if None
+        will start filter starting from the earliest
+    :param end_timestamp: timestamp of the last relevant entry, if None
+        will end filtering until the latest
+    :param remote_timezone: timezone of the system from
+        which the logs have been extracted
+    :param local_timezone: timezone of the client
+    :param log_filter_patterns: a list of regex that will match and
+        extract the time info that will be parsed by dateutil.parser.
+        Each pattern *must contain* only 1 group that represent the time
+        string that must be extracted and parsed
+    :param processes: the number of worker processes, if None
+        the number of CPUs
+    :param shard_size: size in bytes above which a file is split
+        (optional, default 64MB)
+    :param binary_search: if True the range of lines within the time
+        range of the files sorted by time is found with a binary search
+        and copied without parsing each line (see
+        `filter_log_file_worker`), the files not sorted are split and
+        filtered line by line (optional, default False). Unlike the
+        line by line filter, the lines without a date (eg. stack
+        traces) within the range are kept
+    :return: the LogFilterFileStats of each file
+    """
+    patterns = LogTimestampMatcher(log_filter_patterns).patterns
+    stats = dict[str, LogFilterFileStats]()
+    # (file, shard number, start, end, part file, copy)
+    shards = []
+    for file in log_files:
+        file_stats = LogFilterFileStats(source_file=str(file))
+        stats[str(file)] = file_stats
+        filtered_log_file_name = get_filtered_log_file_name(file, src_folder)
+        try:
+            time_range = None
+            if binary_search:
+                time_range = find_log_time_range(
+                    str(file), start_timestamp, end_timestamp, patterns
+                )
+            if time_range is not None:
+                # the range is copied without parsing the lines
+                ranges = [time_range]
+            else:
+                ranges = split_file_on_lines(str(file), shard_size)
+        except Exception as e:
+            file_stats.error = str(e)
+            logging.error(f"failed to read file: {str(file)}: {str(e)}")
+            continue
+        file_stats.shards = len(ranges)
+        for number, (start, end) in enumerate(ranges):
+            shards.append(
+                (
+                    str(file),
+                    number,
+                    start,
+                    end,
+                    os.path.join(
+                        dst_folder,
+                        f".{filtered_log_file_name}.{number}.part",
+                    ),
+                    time_range is not None,
+                )
+            )
+    # the biggest shards first to balance the load at the end
+    shards.sort(key=lambda shard: shard[3] - shard[2], reverse=True)
+
+    part_files = dict[str, list[str]]()
+    for file, _, _, _, part_file, _ in sorted(shards, key=lambda s: s[:2]):
+        part_files.setdefault(file, []).append(part_file)
+    pending_shards = {
+        file: len(file_parts) for file, file_parts in part_files.items()
+    }
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = {}
+        for file, _, start, end, part_file, copy in shards:
+            if copy:
+                future = executor.submit(
+                    copy_log_file_range, file, start, end, part_file
+                )
+            else:
+                future = executor.submit(
+                    filter_log_file_range,
+                    file,
+                    start,
+                    end,
+                    part_file,
+                    start_timestamp,
+                    end_timestamp,
+                    remote_timezone,
+                    local_timezone,
+                    log_filter_patterns,
+                )
+            futures[future] = file
+        for future in as_completed(futures):
+            file = futures[future]
+            file_stats = stats[file]
+            try:
+                lines_read, lines_matched, bytes_read, elapsed = (
+                    future.result()
+                )
+                file_stats.lines_read += lines_read
+                file_stats.lines_matched += lines_matched
+                file_stats.bytes_read += bytes_read
+                file_stats.elapsed += elapsed
+            except UnicodeDecodeError:
+                if not file_stats.error:
+                    logging.error(
+                        f"file {file} contains invalid "
+                        f"unicode characters, skipping "
+                    )
+                file_stats.error = "invalid unicode characters"
+            except Exception as e:
+                if not file_stats.error:
+                    logging.error(
+                        f"failed to parse file : {file} "
+                        f"due to exception: {str(e)}"
+                    )
+                file_stats.error = str(e)
+            pending_shards[file] -= 1
+            if pending_shards[file] == 0:
+                _join_part_files(
+                    file_stats,
+                    part_files[file],
+                    os.path.join(
+                        dst_folder,
+                        get_filtered_log_file_name(Path(file), src_folder),
+                    ),
+                )
+    return list(stats.values())
+
+
+def _join_part_files(
+    file_stats: LogFilterFileStats,
+    part_files: list[str],
+    output_filename: str,
+):
+    """
+    Joins in order the filtered ranges of a file and removes them,
+    the filtered file is not created if no line matched or
+    a range failed
+    """
+    try:
+        if file_stats.error is None and file_stats.lines_matched > 0:
+            if os.path.exists(output_filename):
+                raise Exception(f"{output_filename} already exists")
+            if len(part_files) == 1:
+                os.rename(part_files[0], output_filename)
+            else:
+                with open(output_filename, mode="xb") as output_file:
+                    for part_file in part_files:
+                        with open(part_file, mode="rb") as part:
+                            shutil.copyfileobj(part, output_file)
+            file_stats.filtered_file = output_filename
+    except Exception as e:
+        file_stats.error = str(e)
+        logging.error(
+            f"failed to write filtered file {output_filename}: {str(e)}"
+        )
+    finally:
+        for part_file in part_files:
+            if os.path.exists(part_file):
+                os.unlink(part_file)
+
+
+def filter_log_file_to_stream(
+    filename: str,
+    output: BinaryIO,
+    start_timestamp: Optional[int],
+    end_timestamp: Optional[int],
+    remote_timezone: str,
+    local_timezone: str,
+    log_filter_patterns: list[re.Pattern[str]],
+    binary_search: bool = False,
+) -> LogFilterFileStats:
+    """
+    Filters a log file as `filter_log_file_worker` does
+    writing the lines within the time range in a binary stream
+
+    :param filename: the log file
+    :param output: the stream where the filtered lines are written
+    :param start_timestamp: timestamp of the first relevant entry, if None
+        will start filter starting from the earliest
+    :param end_timestamp: timestamp of the last relevant entry, if None
+        will end filtering until the latest
+    :param remote_timezone: timezone of the system from
+        which the logs have been extracted
+    :param local_timezone: timezone of the client
+    :param log_filter_patterns: the compiled regex that extract the
+        time info (see `filter_log_line`)
+    :param binary_search: if True and the file is sorted by time the
+        range of lines within the time range is copied without parsing
+        each line (see `find_log_time_range`)
+    :return: the LogFilterFileStats of the file
+    """
+    start_time = time.monotonic()
+    stats = LogFilterFileStats(source_file=filename, shards=1)
+    time_range = None
+    if binary_search:
+        time_range = find_log_time_range(
+            filename, start_timestamp, end_timestamp, log_filter_patterns
+        )
+    if time_range is not None:
+        lines = copy_file_range_to_stream(
+            filename, time_range[0], time_range[1], output
+        )
+        stats.lines_read = lines
+        stats.lines_matched = lines
+        stats.bytes_read = time_range[1] - time_range[0]
+    else:
+        time_window = TimeWindow(start_timestamp, end_timestamp)
+        matcher = LogTimestampMatcher(log_filter_patterns)
+        with open(filename, "rb") as read_file:
+            for line in read_file:
+                stats.lines_read += 1
+                stats.bytes_read += len(line)
+                if (
+                    filter_log_line(
+                        line.decode("utf-8"),
+                        start_timestamp,
+                        end_timestamp,
+                        remote_timezone,
+                        local_timezone,
+                        log_filter_patterns,
+                        time_window,
+                        matcher,
+                    )
+                    is not None
+                ):
+                    stats.lines_matched += 1
+                    output.write(line)
+    stats.elapsed = time.monotonic() - start_time
+    return stats
+
+
+def filter_log_file(
+    file: Path,
+    src_folder: str,
+    dst_folder: str,
+    start_timestamp: Optional[int],
+    end_timestamp: Optional[int],
+    remote_timezone: str,
+    local_timezone: str,
+    log_filter_patterns: list[re.Pattern[str]],
+    binary_search: bool = False,
+) -> LogFilterFileStats:
+    """
+    Filters a single log file as `filter_log_file_worker` does, writing
+    the filtered file in `dst_folder` (see `get_filtered_log_file_name`).
+    Meant to be submitted to an executor as soon as a file is
+    available, the filter errors are reported in the returned stats
+    and the files without lines within the time range are not written.
+
+    :param file: the log file
+    :param src_folder: the base folder removed from the filtered
+        file name
+    :param dst_folder: the folder where the filtered file is written
+    :param start_timestamp: timestamp of the first relevant entry, if None
+        will start filter starting from the earliest
+    :param end_timestamp: timestamp of the last relevant entry, if None
+        will end filtering until the latest
+    :param remote_timezone: timezone of the system from
+        which the logs have been extracted
+    :param local_timezone: timezone of the client
+    :param log_filter_patterns: the compiled regex that extract the
+        time info (see `filter_log_line`)
+    :param binary_search: if True and the file is sorted by time the
+        range of lines within the time range is copied without parsing
+        each line (see `find_log_time_range`)
+    :return: the LogFilterFileStats of the file
+    """
+    filtered_file = os.path.join(
+        dst_folder, get_filtered_log_file_name(file, src_folder)
+    )
+    try:
+        with open(filtered_file, mode="xb") as output:
+            try:
+                stats = filter_log_file_to_stream(
+                    str(file),
+                    output,
+                    start_timestamp,
+                    end_timestamp,
+                    remote_timezone,
+                    local_timezone,
+                    log_filter_patterns,
+                    binary_search,
+                )
+            except UnicodeDecodeError:
+                logging.error(
+                    f"file {str(file)} contains invalid "
+                    f"unicode characters, skipping "
+                )
+                stats = LogFilterFileStats(
+                    source_file=str(file),
+                    shards=1,
+                    error="invalid unicode characters",
+                )
+            except Exception as e:
+                logging.error(
+                    f"failed to parse file : {str(file)} "
+                    f"due to exception: {str(e)}"
+                )
+                stats = LogFilterFileStats(
+                    source_file=str(file), shards=1, error=str(e)
+                )
+        if stats.error or stats.lines_matched == 0:
+            os.unlink(filtered_file)
+        else:
+            stats.filtered_file = filtered_file
+    except OSError as e:
+        # the filtered file can't be created
+        logging.error(
+            f"failed to parse file : {str(file)} "
+            f"due to exception: {str(e)}"
+        )
+        stats = LogFilterFileStats(
+            source_file=str(file), shards=1, error=str(e)
+        )
+    return stats
+
+
+def filter_log_files_to_archive(
+    log_files: Iterable[Union[Path, tuple[Path, str]]],
+    src_folder: str,
+    archive_path: str,
+    start_timestamp: Optional[int],
+    end_timestamp: Optional[int],
+    remote_timezone: str,
+    local_timezone: str,
+    log_filter_patterns: list[str],
+    threads: int,
+    compression_threads: int = None,
+    binary_search: bool = False,
+    spool_size: int = 16 * 1024 * 1024,
+) -> list[LogFilterFileStats]:
+    """
+    Filters a set of log files and writes the filtered files directly
+    in a `tar.gz` archive, without writing them on disk. The files are
+    filtered by `threads` threads in memory buffers (spooled on disk
+    above `spool_size` bytes) added to the archive as soon as each file
+    is filtered, the archive is compressed in parallel by a
+    ParallelGzipWriter. The archive members have the same names of the
+    files written by `filter_log_file_worker` (see
+    `get_filtered_log_file_name`), the files without lines within
+    the time range and the ones containing invalid unicode
+    characters are not added.
+
+    :param log_files: the log files to be filtered, pulled one at time
+        by the filter threads so they can be produced (eg. by a
+        generator collecting them) while the first ones are filtered.
+        If the iterable raises an exception no more files are filtered
+        and the exception is raised once the archive is closed. A file
+        can be paired with the timezone of the system from which it
+        has been extracted, as a `(file, remote_timezone)` tuple, if
+        the files come from different systems
+    :param src_folder: the base folder removed from the
+        archive member names
+    :param archive_path: the path of the `tar.gz` archive created
+    :param start_timestamp: timestamp of the first relevant entry, if None
+        will start filter starting from the earliest
+    :param end_timestamp: timestamp of the last relevant entry, if None
+        will end filtering until the latest
+    :param remote_timezone: timezone of the system from
+        which the logs have been extracted, used for the files
+        not paired with a timezone
+    :param local_timezone: timezone of the client
+    :param log_filter_patterns: a list of regex that will match and
+        extract the time info (see `filter_log_line`).
+        Each pattern *must contain* only 1 group that represent the time
+        string that must be extracted and parsed
+    :param threads: the number of filter threads
+    :param compression_threads: the number of compression threads, if
+        None the number of CPUs
+    :param binary_search: if True the lines within the time range of
+        the files sorted by time are found with a binary search and
+        copied without parsing each line (see `find_log_time_range`)
+    :param spool_size: size in bytes above which a filtered file is
+        buffered on disk instead of memory (optional, default 16MB)
+    :return: the LogFilterFileStats of each file, `filtered_file` is
+        the name of the archive member
+    """
+    patterns = LogTimestampMatcher(log_filter_patterns).patterns
+    files = iter(log_files)
+    files_lock = threading.Lock()
+    files_errors = []
+    # bounds the filtered files waiting to be archived
+    members = Queue(maxsize=threads)
+
+    def filter_worker():
+        while True:
+            try:
+                with files_lock:
+                    file = next(files, None)
+            except Exception as e:
+                files_errors.append(e)
+                break
+            if file is None:
+                break
+            file_timezone = remote_timezone
+            if isinstance(file, tuple):
+                file, file_timezone = file
+            buffer = tempfile.SpooledTemporaryFile(max_size=spool_size)
+            try:
+                stats = filter_log_file_to_stream(
+                    str(file),
+                    buffer,
+                    start_timestamp,
+                    end_timestamp,
+                    file_timezone,
+                    local_timezone,
+                    patterns,
+                    binary_search,
+                )
+            except UnicodeDecodeError:
+                logging.error(
+                    f"file {str(file)} contains invalid "
+                    f"unicode characters, skipping "
+                )
+                stats = LogFilterFileStats(
+                    source_file=str(file),
+                    shards=1,
+                    error="invalid unicode characters",
+                )
+            except Exception as e:
+                logging.error(
+                    f"failed to parse file : {str(file)} "
+                    f"due to exception: {str(e)}"
+                )
+                stats = LogFilterFileStats(
+                    source_file=str(file), shards=1, error=str(e)
+                )
+            members.put((file, buffer, stats))
+        members.put(None)
+
+    workers = []
+    for _ in range(max(1, threads)):
+        worker = threading.Thread(target=filter_worker, daemon=True)
+        worker.start()
+        workers.append(worker)
+
+    all_stats = []
+    with ParallelGzipWriter(
+        archive_path, compression_threads
+    ) as writer, tarfile.open(fileobj=writer, mode="w|") as tar:
+        finished_workers = 0
+        while finished_workers < len(workers):
+            member = members.get()
+            if member is None:
+                finished_workers += 1
+                continue
+            file, buffer, stats = member
+            try:
+                if stats.error is None and stats.lines_matched > 0:
+                    member_info = tarfile.TarInfo(
+                        get_filtered_log_file_name(file, src_folder)
+                    )
+                    member_info.size = buffer.tell()
+                    member_info.mtime = int(time.time())
+                    buffer.seek(0)
+                    tar.addfile(member_info, buffer)
+                    stats.filtered_file = member_info.name
+            finally:
+                buffer.close()
+            all_stats.append(stats)
+    if files_errors:
+        raise files_errors[0]
+    return all_stats
@@ -0,0 +1,109 @@
+import re
+from typing import Optional, Union
+
+# global inline flags (eg. `(?i)`) and numbered backreferences
+# change their meaning once the patterns are joined
+_NOT_COMBINABLE = re.compile(r"\(\?[aiLmsux]+\)|(?<!\\)\\[1-9]")
+
+
+class LogTimestampMatcher:
+    """
+    Extracts the date of the log lines with a set of patterns containing
+    exactly one group (see `filter_log_line`). The patterns are validated
+    once and compiled in a single alternation of named groups, so the
+    first pattern matching a line is found with a single `match` instead
+    of trying each pattern. Since the lines of a file usually share the
+    same format, the pattern that matched last is tried first, the
+    matcher must be `reset` (or rebuilt) for each file and is not
+    thread safe.
+
+    >>> matcher = LogTimestampMatcher([r"(\\d{4}-\\d{2}-\\d{2}T\\S+Z).+"])
+    >>> date, pattern = matcher.match("2023-09-15T11:20:36.123Z log")
+    """
+
+    patterns: list[re.Pattern[str]]
+    """
+    the compiled patterns in order of priority
+    """
+
+    def __init__(self, log_filter_patterns: list[Union[str, re.Pattern[str]]]):
+        """
+        :param log_filter_patterns: the regex, as strings or compiled,
+            that match and extract the date of the lines. Each pattern
+            *must contain* only 1 group that represent the date,
+            otherwise an Exception is raised
+        """
+        self.patterns = list(map(re.compile, log_filter_patterns))
+        for pattern in self.patterns:
+            if pattern.groups != 1:
+                raise Exception(
+                    f"{pattern.pattern} it's not a valid pattern, it must "
+                    f"contain only one group that represents "
+                    f"the date to be parsed"
+                )
+        self.__last: Optional[int] = None
+        self.__combined: Optional[re.Pattern[str]] = None
+        if len(self.patterns) > 1:
+            self.__combined = self.__combine(self.patterns)
+
+    @staticmethod
+    def __combine(
+        patterns: list[re.Pattern[str]],
+    ) -> Optional[re.Pattern[str]]:
+        # the wrapper group of the pattern n is the group 2n+1 and
+        # the date group of the pattern is the group 2n+2
+        flags = {pattern.flags for pattern in patterns}
+        if len(flags) != 1 or any(
+            _NOT_COMBINABLE.search(pattern.pattern) for pattern in patterns
+        ):
+            return None
+        try:
+            return re.compile(
+                "|".join(
+                    f"(?P<_p{index}>{pattern.pattern})"
+                    for index, pattern in enumerate(patterns)
+                ),
+                flags.pop(),
+            )
+        except re.error:
+            # eg. the same group name used in two patterns,
+            # the patterns are tried one by one
+            return None
+
+    def match(self, line: str) -> Optional[tuple[str, re.Pattern[str]]]:
+        """
+        Matches a line against the patterns, trying first the one
+        that matched the previous line and then the others in order
+
+        :param line: the log line
+        :return: the date extracted and the pattern that matched it,
+            None if no pattern matches the line
+        """
+        if self.__last is not None:
+            pattern = self.patterns[self.__last]
+            match = pattern.match(line)
+            if match:
+                return match.group(1), pattern
+        if self.__combined is not None:
+            match = self.__combined.match(line)
+            if match is None:
+                return None
+            index = int(match.lastgroup[2:])
+            date = match.group(2 * index + 2)
+        else:
+            for index, pattern in enumerate(self.patterns):
+                match = pattern.match(line)
+                if match:
+                    date = match.group(1)
+                    break
+            else:
+                return None
+        self.__last = index
+        return date, self.patterns[index]
+
+    def reset(self):
+        """
+        Forgets the pattern that matched last, to be called
+        before matching the lines of another file
+        """
+        self.__last = None
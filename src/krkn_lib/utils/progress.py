@@ -0,0 +1,332 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, Optional
+
+from krkn_lib.models.krkn import TransferStageProgress
+
+
+class _StageState:
+    def __init__(self):
+        self.parts_total: Optional[int] = None
+        self.bytes_total: Optional[int] = None
+        self.parts_completed = 0
+        self.parts_failed = 0
+        self.bytes_transferred = 0
+        self.start_time: Optional[float] = None
+        self.last_activity: Optional[float] = None
+        self.part_start_times: dict[int, float] = {}
+        self.part_latencies: dict[int, float] = {}
+        # thread name -> [bytes, first seen]
+        self.threads: dict[str, list] = {}
+        self.last_callback: Optional[float] = None
+
+
+class TransferProgressTracker:
+    """
+    Thread safe progress tracker of a multi-part transfer split in
+    stages (eg. `archive`, `download`, `decode`, `upload`). The workers
+    report the parts started and completed and the bytes processed,
+    the tracker computes for each stage the throughput (overall and
+    per thread), the ETA and the latency of each part, so the slowest
+    stage of the transfer can be spotted. The progress can be
+    consumed with a callback or as a JSON or Prometheus exposition
+    format snapshot.
+
+    >>> tracker = TransferProgressTracker(on_progress=print)
+    >>> lib_k8s.archive_and_get_path_from_pod(..., progress=tracker)
+    >>> print(tracker.to_prometheus())
+    """
+
+    def __init__(
+        self,
+        on_progress: Callable[[TransferStageProgress], None] = None,
+        callback_interval: float = 1.0,
+    ):
+        """
+        :param on_progress: callback invoked with the progress of a
+            stage every time a part of the stage is completed and,
+            while the bytes are transferred, at most every
+            `callback_interval` seconds (optional)
+        :param callback_interval: minimum interval in seconds between
+            two callbacks of the same stage triggered by the bytes
+            transferred (optional, default 1)
+        """
+        self.__on_progress = on_progress
+        self.__callback_interval = callback_interval
+        self.__lock = threading.Lock()
+        self.__stages: dict[str, _StageState] = {}
+
+    def __get_stage(self, stage: str) -> _StageState:
+        state = self.__stages.get(stage)
+        if state is None:
+            state = _StageState()
+            self.__stages[stage] = state
+        return state
+
+    def set_totals(
+        self, stage: str, parts: int = None, total_bytes: int = None
+    ):
+        """
+        Sets the number of parts and the bytes that the stage
+        will process, used to compute the ETA
+
+        :param stage: the stage name
+        :param parts: the number of parts, if None is not changed
+        :param total_bytes: the number of bytes, if None is not changed
+        """
+        with self.__lock:
+            state = self.__get_stage(stage)
+            if parts is not None:
+                state.parts_total = parts
+            if total_bytes is not None:
+                state.bytes_total = total_bytes
+
+    def start_part(self, stage: str, part: int):
+        """
+        Marks a part as started, the part latency is
+        measured from this moment
+
+        :param stage: the stage name
+        :param part: the part number
+        """
+        with self.__lock:
+            state = self.__get_stage(stage)
+            now = time.monotonic()
+            if state.start_time is None:
+                state.start_time = now
+            state.part_start_times[part] = now
+            state.threads.setdefault(threading.current_thread().name, [0, now])
+
+    def add_bytes(self, stage: str, nbytes: int):
+        """
+        Adds the bytes processed by the current thread
+
+        :param stage: the stage name
+        :param nbytes: the number of bytes
+        """
+        progress = None
+        with self.__lock:
+            state = self.__get_stage(stage)
+            now = time.monotonic()
+            self.__add_bytes(state, nbytes, now)
+            if self.__on_progress and (
+                state.last_callback is None
+                or now - state.last_callback >= self.__callback_interval
+            ):
+                state.last_callback = now
+                progress = self.__get_progress(stage, state, now)
+        if progress:
+            self.__on_progress(progress)
+
+    def __add_bytes(self, state: _StageState, nbytes: int, now: float):
+        if state.start_time is None:
+            state.start_time = now
+        thread = state.threads.setdefault(
+            threading.current_thread().name, [0, now]
+        )
+        thread[0] += nbytes
+        state.bytes_transferred += nbytes
+        state.last_activity = now
+
+    def finish_part(
+        self, stage: str, part: int, nbytes: int = 0, error: bool = False
+    ):
+        """
+        Marks a part as completed (or failed)
+
+        :param stage: the stage name
+        :param part: the part number
+        :param nbytes: bytes processed not reported with `add_bytes`
+            (optional)
+        :param error: True if the part failed (optional, default False)
+        """
+        with self.__lock:
+            state = self.__get_stage(stage)
+            now = time.monotonic()
+            if nbytes:
+                self.__add_bytes(state, nbytes, now)
+            start_time = state.part_start_times.pop(part, now)
+            state.last_activity = now
+            if error:
+                state.parts_failed += 1
+            else:
+                state.parts_completed += 1
+                state.part_latencies[part] = now - start_time
+            progress = None
+            if self.__on_progress:
+                state.last_callback = now
+                progress = self.__get_progress(stage, state, now)
+        if progress:
+            self.__on_progress(progress)
+
+    @contextmanager
+    def track_part(self, stage: str, part: int) -> Iterator[None]:
+        """
+        Context manager that starts a part and finishes it
+        on exit, as failed if an exception is raised
+
+        >>> with tracker.track_part("decode", 0):
+        >>>     decode(file)
+
+        :param stage: the stage name
+        :param part: the part number
+        """
+        self.start_part(stage, part)
+        try:
+            yield
+        except Exception:
+            self.finish_part(stage, part, error=True)
+            raise
+        self.finish_part(stage, part)
+
+    def __get_progress(
+        self, stage: str, state: _StageState, now: float
+    ) -> TransferStageProgress:
+        # the clock of a stage stops while no part is running
+        if not state.part_start_times and state.last_activity:
+            now = state.last_activity
+        elapsed = now - state.start_time if state.start_time else 0.0
+        throughput = state.bytes_transferred / elapsed if elapsed > 0 else 0
+        processed = state.parts_completed + state.parts_failed
+        eta = None
+        if state.parts_total is not None and processed >= state.parts_total:
+            eta = 0.0
+        elif state.bytes_total is not None and throughput > 0:
+            eta = max(0.0, state.bytes_total - state.bytes_transferred)
+            eta = eta / throughput
+        elif state.parts_total is not None and processed > 0:
+            eta = elapsed / processed * (state.parts_total - processed)
+        thread_throughput = {}
+        for name, (nbytes, first_seen) in state.threads.items():
+            thread_elapsed = now - first_seen
+            thread_throughput[name] = (
+                nbytes / thread_elapsed if thread_elapsed > 0 else 0.0
+            )
+        return TransferStageProgress(
+            stage=stage,
+            parts_total=state.parts_total,
+            parts_completed=state.parts_completed,
+            parts_failed=state.parts_failed,
+            bytes_total=state.bytes_total,
+            bytes_transferred=state.bytes_transferred,
+            elapsed=elapsed,
+            throughput=throughput,
+            eta=eta,
+            thread_throughput=thread_throughput,
+            part_latencies=dict(state.part_latencies),
+        )
+
+    def get_progress(self, stage: str) -> TransferStageProgress:
+        """
+        Returns the progress of a stage
+
+        :param stage: the stage name
+        :return: the TransferStageProgress of the stage
+        """
+        with self.__lock:
+            return self.__get_progress(
+                stage, self.__get_stage(stage), time.monotonic()
+            )
+
+    def snapshot(self) -> dict[str, TransferStageProgress]:
+        """
+        Returns the progress of all the stages tracked
+
+        :return: the TransferStageProgress by stage name
+        """
+        with self.__lock:
+            now = time.monotonic()
+            return {
+                stage: self.__get_progress(stage, state, now)
+                for stage, state in self.__stages.items()
+            }
+
+    def to_json(self) -> str:
+        """
+        Returns the progress of all the stages tracked as JSON
+
+        :return: a JSON object with the progress by stage name
+        """
+        return json.dumps(
+            {
+                stage: progress.__dict__
+                for stage, progress in self.snapshot().items()
+            },
+            indent=4,
+        )
+
+    def to_prometheus(self, prefix: str = "krkn_transfer") -> str:
+        """
+        Returns the progress of all the stages tracked in the
+        Prometheus text exposition format
+
+        :param prefix: prefix of the metric names
+            (optional, default `krkn_transfer`)
+        :return: the metrics in the Prometheus exposition format
+        """
+        metrics = [
+            ("bytes_total", "counter", "Bytes processed by the stage"),
+            ("bytes_expected", "gauge", "Bytes to be processed"),
+            ("parts_completed_total", "counter", "Parts completed"),
+            ("parts_failed_total", "counter", "Parts failed"),
+            ("parts_expected", "gauge", "Parts to be processed"),
+            ("elapsed_seconds", "gauge", "Seconds the stage has been running"),
+            ("throughput_bytes_per_second", "gauge", "Stage throughput"),
+            ("eta_seconds", "gauge", "Estimated seconds to completion"),
+            (
+                "thread_throughput_bytes_per_second",
+                "gauge",
+                "Throughput of each thread",
+            ),
+            (
+                "part_latency_seconds",
+                "gauge",
+                "Seconds spent processing each part",
+            ),
+        ]
+        samples: dict[str, list[str]] = {name: [] for name, _, _ in metrics}
+        for stage, progress in self.snapshot().items():
+            label = f'stage="{stage}"'
+            samples["bytes_total"].append(
+                f"{{{label}}} {progress.bytes_transferred}"
+            )
+            if progress.bytes_total is not None:
+                samples["bytes_expected"].append(
+                    f"{{{label}}} {progress.bytes_total}"
+                )
+            samples["parts_completed_total"].append(
+                f"{{{label}}} {progress.parts_completed}"
+            )
+            samples["parts_failed_total"].append(
+                f"{{{label}}} {progress.parts_failed}"
+            )
+            if progress.parts_total is not None:
+                samples["parts_expected"].append(
+                    f"{{{label}}} {progress.parts_total}"
+                )
+            samples["elapsed_seconds"].append(
+                f"{{{label}}} {progress.elapsed}"
+            )
+            samples["throughput_bytes_per_second"].append(
+                f"{{{label}}} {progress.throughput}"
+            )
+            if progress.eta is not None:
+                samples["eta_seconds"].append(f"{{{label}}} {progress.eta}")
+            for thread, throughput in progress.thread_throughput.items():
+                samples["thread_throughput_bytes_per_second"].append(
+                    f'{{{label},thread="{thread}"}} {throughput}'
+                )
+            for part, latency in sorted(progress.part_latencies.items()):
+                samples["part_latency_seconds"].append(
+                    f'{{{label},part="{part}"}} {latency}'
+                )
+        lines = []
+        for name, metric_type, description in metrics:
+            metric_name = f"{prefix}_{name}"
+            lines.append(f"# HELP {metric_name} {description}")
+            lines.append(f"# TYPE {metric_name} {metric_type}")
+            for sample in samples[name]:
+                lines.append(f"{metric_name}{sample}")
+        return "\n".join(lines) + "\n"
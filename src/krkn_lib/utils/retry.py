@@ -0,0 +1,145 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+from queue import Queue
+
+
+def exponential_backoff_delay(
+    retry: int,
+    base_delay: float = 1.0,
+    max_delay: float = 60.0,
+    jitter: float = 0.5,
+) -> float:
+    """
+    Computes the delay before a retry: `base_delay` doubled at each
+    retry up to `max_delay`, reduced by a random fraction up to `jitter`
+    to avoid that tasks failed at the same time are retried together
+
+    :param retry: the number of retries already done (0 for the first)
+    :param base_delay: delay in seconds of the first retry
+    :param max_delay: maximum delay in seconds
+    :param jitter: maximum fraction of the delay randomly removed,
+        between 0 (no jitter) and 1 (full jitter)
+    :return: the delay in seconds
+    """
+    delay = min(max_delay, base_delay * (2 ** max(0, retry)))
+    return delay * (1 - jitter * random.random())
+
+
+class RetryScheduler:
+    """
+    Re-enqueues the failed tasks of a worker queue after an exponential
+    backoff delay (see `exponential_backoff_delay`) without blocking the
+    workers: the delayed items are kept in a heap by a single timer
+    thread that puts them back in the queue when due.
+    A worker must call `schedule` **instead** of `queue.task_done()` for
+    a failed item, the task is marked as done only once re-enqueued, so
+    `queue.join()` won't return and `queue.unfinished_tasks` won't reach
+    zero while retries are pending. The queue can be bounded: the items
+    are re-enqueued as soon as the workers free a slot.
+
+    >>> scheduler = RetryScheduler(queue)
+    >>> item = queue.get()
+    >>> try:
+    >>>     process(item)
+    >>>     queue.task_done()
+    >>> except Exception:
+    >>>     scheduler.schedule(item, retry)
+    >>> ...
+    >>> queue.join()
+    >>> scheduler.stop()
+    """
+
+    base_delay: float
+    max_delay: float
+    jitter: float
+
+    def __init__(
+        self,
+        queue: Queue,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+        jitter: float = 0.5,
+    ):
+        """
+        :param queue: the queue in which the items are re-enqueued
+        :param base_delay: delay in seconds of the first retry
+            (optional, default 1)
+        :param max_delay: maximum delay in seconds (optional, default 60)
+        :param jitter: maximum fraction of the delay randomly removed
+            (optional, default 0.5)
+        """
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.__queue = queue
+        self.__delayed: list[tuple[float, int, any]] = []
+        self.__sequence = itertools.count()
+        self.__condition = threading.Condition()
+        self.__stopped = False
+        self.__thread = threading.Thread(
+            name="RetryScheduler", target=self.__run, daemon=True
+        )
+        self.__thread.start()
+
+    @property
+    def pending(self) -> int:
+        """
+        The number of items waiting to be re-enqueued
+        """
+        with self.__condition:
+            return len(self.__delayed)
+
+    def schedule(self, item: any, retry: int) -> float:
+        """
+        Schedules an item to be re-enqueued and marks the current
+        task of the item as done once re-enqueued.
+
+        :param item: the item that will be re-enqueued
+        :param retry: the number of retries already done, used to
+            compute the delay
+        :return: the delay in seconds before the item is re-enqueued
+        """
+        delay = exponential_backoff_delay(
+            retry, self.base_delay, self.max_delay, self.jitter
+        )
+        with self.__condition:
+            if self.__stopped:
+                raise Exception("retry scheduler stopped")
+            heapq.heappush(
+                self.__delayed,
+                (time.monotonic() + delay, next(self.__sequence), item),
+            )
+            self.__condition.notify_all()
+        return delay
+
+    def stop(self):
+        """
+        Stops the timer thread, the items still waiting
+        are re-enqueued immediately
+        """
+        with self.__condition:
+            self.__stopped = True
+            self.__condition.notify_all()
+        self.__thread.join()
+
+    def __run(self):
+        while True:
+            with self.__condition:
+                if not self.__delayed:
+                    if self.__stopped:
+                        return
+                    self.__condition.wait()
+                    continue
+                due_time = self.__delayed[0][0]
+                now = time.monotonic()
+                if due_time > now and not self.__stopped:
+                    self.__condition.wait(due_time - now)
+                    continue
+                _, _, item = heapq.heappop(self.__delayed)
+            # outside of the lock, on a full bounded queue the put
+            # waits for the workers without blocking `schedule`
+            self.__queue.put(item)
+            self.__queue.task_done()
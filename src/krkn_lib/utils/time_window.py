@@ -0,0 +1,97 @@
+import datetime
+from typing import Iterable, Optional, Union
+
+import numpy as np
+
+
+class TimeWindow:
+    """
+    Time interval between two epoch timestamps, bounds included.
+    The bounds are compared directly with the epoch timestamps of the
+    dates checked, that don't depend on the timezone, so a window can be
+    built once per filter run and reused on every log line or object.
+
+    >>> window = TimeWindow(start_timestamp, end_timestamp)
+    >>> window.contains(1694777280)
+    >>> window.contains_all([1694777280, 1694777281, float("nan")])
+    """
+
+    start: Optional[float]
+    """
+    epoch timestamp of the start of the window, None if unbounded
+    """
+    end: Optional[float]
+    """
+    epoch timestamp of the end of the window, None if unbounded
+    """
+
+    def __init__(
+        self,
+        start_timestamp: Optional[float] = None,
+        end_timestamp: Optional[float] = None,
+    ):
+        """
+        :param start_timestamp: timestamp of the start of the window,
+            if None no bottom limit is set
+        :param end_timestamp: timestamp of the end of the window,
+            if None no top limit is set
+        """
+        self.start = start_timestamp
+        self.end = end_timestamp
+
+    def contains(self, timestamp: Optional[float]) -> bool:
+        """
+        Checks if a timestamp is within the window
+
+        :param timestamp: the epoch timestamp checked
+        :return: True if the timestamp is within the window,
+            False otherwise or if the timestamp is None
+        """
+        if timestamp is None:
+            return False
+        return (self.start is None or timestamp >= self.start) and (
+            self.end is None or timestamp <= self.end
+        )
+
+    def contains_date(self, date: Optional[datetime.datetime]) -> bool:
+        """
+        Checks if a datetime is within the window, dates without
+        timezone are considered in the local timezone
+
+        :param date: the datetime checked
+        :return: True if the date is within the window,
+            False otherwise or if the date is None
+        """
+        if date is None:
+            return False
+        return self.contains(int(date.timestamp()))
+
+    def contains_all(
+        self, timestamps: Union[np.ndarray, Iterable[Optional[float]]]
+    ) -> np.ndarray:
+        """
+        Checks with a single vectorized comparison which
+        timestamps of an array are within the window
+
+        :param timestamps: the epoch timestamps checked, the missing
+            ones (None or NaN) are never within the window
+        :return: a numpy boolean array, True for each timestamp
+            within the window
+        """
+        timestamps = np.asarray(
+            (
+                [np.nan if t is None else t for t in timestamps]
+                if not isinstance(timestamps, np.ndarray)
+                else timestamps
+            ),
+            dtype=np.float64,
+        )
+        mask = ~np.isnan(timestamps)
+        if self.start is not None:
+            mask &= timestamps >= self.start
+        if self.end is not None:
+            mask &= timestamps <= self.end
+        return mask
+
+    def __repr__(self) -> str:
+        return f"TimeWindow(start={self.start}, end={self.end})"